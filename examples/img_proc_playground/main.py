@@ -119,6 +119,8 @@ ALL_WRAPPERS = [
 
 def main() -> None:
     params = fl.FiatRunParams()
+    # Run the image functions on downscaled proxies while a parameter is being dragged
+    params.image_preview = True
     # params.theme = fl.ImGuiTheme_.white_is_white
     fl.run_graph_composer(functions=ALL_WRAPPERS, params=params)
 
@@ -1,6 +1,7 @@
 """Filter wrappers for the image-processing playground."""
+
 import fiatlight as fl
-from fiatlight.fiat_kits.fiat_image import ImageU8, ImageU8_GRAY
+from fiatlight.fiat_kits.fiat_image import ImageU8, ImageU8_GRAY, tiled_parallel
 
 import cv2
 
@@ -34,6 +35,8 @@ def _bilateral_d_validator(d: int) -> int:
 @fl.with_fiat_attributes(
     sigmaX__range=(0.0, 25.0),
     sigmaY__range=(0.0, 25.0),
+    preview_scaled_params=["sigmaX", "sigmaY"],
+    halo=lambda params: params["ksize"].value // 2,
     fiat_tags=["filter", "cv2.imgproc"],
 )
 def GaussianBlur(
@@ -69,8 +72,10 @@ def GaussianBlur(
     d__validator=_bilateral_d_validator,
     sigmaColor__range=(1.0, 200.0),
     sigmaSpace__range=(1.0, 200.0),
+    preview_scaled_params=["d", "sigmaSpace"],
     fiat_tags=["filter", "cv2.imgproc"],
 )
+@tiled_parallel(halo=lambda params: params["d"] // 2 + 1)
 def bilateralFilter(
     image: ImageU8,
     d: int = 9,
@@ -104,6 +109,7 @@ def bilateralFilter(
     ksize__validator=_odd_int_validator,
     fiat_tags=["filter", "cv2.imgproc"],
 )
+@tiled_parallel(halo=lambda params: params["ksize"] // 2)
 def medianBlur(image: ImageU8, ksize: int = 5) -> ImageU8:
     """Replace each pixel by the median of its `ksize`×`ksize` neighbourhood.
 
@@ -125,6 +131,7 @@ def medianBlur(image: ImageU8, ksize: int = 5) -> ImageU8:
 @fl.with_fiat_attributes(
     ksize__range=(1, 31),
     ksize__validator=_odd_int_validator,
+    halo=lambda params: params["ksize"] // 2,
     fiat_tags=["filter", "cv2.imgproc"],
 )
 def boxFilter(
@@ -160,6 +167,7 @@ def boxFilter(
     delta__range=(-128.0, 128.0),
     fiat_tags=["filter", "edges", "cv2.imgproc"],
 )
+@tiled_parallel(halo=lambda params: max(params["ksize"].value // 2, 1))
 def Sobel(
     image: ImageU8_GRAY,
     dx: int = 1,
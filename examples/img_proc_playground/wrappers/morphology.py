@@ -1,6 +1,6 @@
 """Morphology wrappers for the image-processing playground."""
 import fiatlight as fl
-from fiatlight.fiat_kits.fiat_image import ImageU8, ImageU8_GRAY
+from fiatlight.fiat_kits.fiat_image import ImageU8, ImageU8_GRAY, tiled_parallel
 
 import cv2
 
@@ -72,6 +72,8 @@ def erode(
     iterations__range=(1, 10),
     fiat_tags=["morphology", "cv2.imgproc"],
 )
+# Composite operations apply the kernel twice per iteration
+@tiled_parallel(halo=lambda params: params["kernel_size"] * params["iterations"])
 def morphologyEx(
     image: ImageU8,
     op: MorphOp = MorphOp.MORPH_OPEN,
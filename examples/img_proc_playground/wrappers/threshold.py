@@ -4,7 +4,7 @@ from typing import NamedTuple
 import numpy as np
 
 import fiatlight as fl
-from fiatlight.fiat_kits.fiat_image import ImageU8, ImageU8_GRAY
+from fiatlight.fiat_kits.fiat_image import ImageU8, ImageU8_GRAY, tiled_parallel
 
 import cv2
 
@@ -89,6 +89,7 @@ def threshold(
     C__range=(-50.0, 50.0),
     fiat_tags=["threshold", "cv2.imgproc"],
 )
+@tiled_parallel(halo=lambda params: params["blockSize"] // 2)
 def adaptiveThreshold(
     image: ImageU8_GRAY,
     maxValue: float = 255.0,
@@ -3,6 +3,7 @@
 These adjust the brightness, contrast or color mapping of an image without
 changing its geometry.
 """
+
 import fiatlight as fl
 from fiatlight.fiat_kits.fiat_image import ImageBgr, ImageU8, ImageU8_GRAY
 
@@ -56,7 +57,7 @@ def clahe(
     return r  # type: ignore
 
 
-@fl.with_fiat_attributes(fiat_tags=["color", "tone", "cv2.imgproc"])
+@fl.with_fiat_attributes(halo=0, fiat_tags=["color", "tone", "cv2.imgproc"])
 def applyColorMap(image: ImageU8_GRAY, colormap: ColorMap = ColorMap.VIRIDIS) -> ImageBgr:
     """Map a single-channel image to color via a built-in cv2 color map.
 
@@ -75,6 +76,7 @@ def applyColorMap(image: ImageU8_GRAY, colormap: ColorMap = ColorMap.VIRIDIS) ->
 @fl.with_fiat_attributes(
     alpha__range=(0.0, 4.0),
     beta__range=(-128.0, 128.0),
+    halo=0,
     fiat_tags=["tone", "cv2.core"],
 )
 def convertScaleAbs(image: ImageU8, alpha: float = 1.0, beta: float = 0.0) -> ImageU8:
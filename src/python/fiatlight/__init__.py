@@ -16,7 +16,6 @@ from fiatlight.fiat_runner import (
     fire_once_at_frame_start,
     nb,
 )
-from fiatlight.fiat_kits import fiat_image, fiat_implot
 from fiatlight.fiat_togui import (
     register_type,
     register_dataclass,
@@ -38,9 +37,13 @@ from fiatlight.fiat_utils import (
     is_rendering_in_node,
 )
 from fiatlight.fiat_config import get_fiat_config
-from fiatlight.fiat_kits.fiat_image import imread_rgb
 from fiatlight.fiat_types import Error, Unspecified, Invalid, ErrorValue, UnspecifiedValue, documented_newtype
 from imgui_bundle import hello_imgui
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from fiatlight.fiat_kits import fiat_image, fiat_implot
+    from fiatlight.fiat_kits.fiat_image import imread_rgb
 
 
 ImGuiTheme_ = hello_imgui.ImGuiTheme_
@@ -54,6 +57,17 @@ def fiat_assets_dir() -> str:
     return assets_dir
 
 
+def __getattr__(name: str) -> Any:
+    # The kits are imported lazily (importing them is slow), see fiat_kits/__init__.py
+    if name in ("fiat_image", "fiat_implot"):
+        return getattr(fiat_kits, name)
+    if name == "imread_rgb":
+        from fiatlight.fiat_kits.fiat_image import imread_rgb
+
+        return imread_rgb
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def fiatlight_dir() -> str:
     import os
 
@@ -11,6 +11,8 @@ from .gui_node import GuiNode
 from .markdown_node import MarkdownNode
 from .function_node import FunctionNode, FunctionNodeLink
 from .functions_graph import FunctionsGraph
+from .compiled_functions_graph import CompiledFunctionsGraph, compile_functions_graph
+from .inputs_recorder import InputsRecorder, InputEvent, ReplayReport, replay_input_events, load_input_events_from_json
 from .togui_exception import FiatToGuiException
 
 __all__ = [
@@ -32,6 +34,15 @@ __all__ = [
     "FunctionNodeLink",
     # from functions_graph
     "FunctionsGraph",
+    # from compiled_functions_graph
+    "CompiledFunctionsGraph",
+    "compile_functions_graph",
+    # from inputs_recorder
+    "InputsRecorder",
+    "InputEvent",
+    "ReplayReport",
+    "replay_input_events",
+    "load_input_events_from_json",
     # from possible_fiat_attributes
     "PossibleFiatAttributes",
     # from togui_exception
@@ -1,7 +1,8 @@
-import copy
+import weakref
 from dataclasses import dataclass
 from enum import Enum
 
+import numpy as np
 import pydantic
 
 from fiatlight.fiat_types.base_types import (
@@ -14,6 +15,7 @@ from fiatlight.fiat_types.base_types import FiatAttributes
 from fiatlight.fiat_types import typename_utils
 from .any_data_gui_callbacks import AnyDataGuiCallbacks
 from .possible_fiat_attributes import PossibleFiatAttributes
+from . import binary_sidecar
 from imgui_bundle import imgui, imgui_ctx, ImVec4, hello_imgui, ImVec2
 from fiatlight.fiat_config import get_fiat_config, FiatColorType
 from fiatlight.fiat_widgets.fontawesome6_ctx_utils import icons_fontawesome_6, fontawesome_6_ctx
@@ -80,6 +82,37 @@ class AnyDataWithGuiGenericPossibleFiatAttributes(PossibleFiatAttributes):
 _ANYDATAWITHGUI_GENERIC_POSSIBLE_FIAT_ATTRIBUTES = AnyDataWithGuiGenericPossibleFiatAttributes()
 
 
+# Cache of the merge between the generic possible attributes and those of a descendant type:
+#     descendant possible attributes -> (generic version, descendant version, merged attributes)
+# (weak keys, since some descendants may create a new PossibleFiatAttributes at each call)
+_MergedAttributesCacheEntry = tuple[int, int, PossibleFiatAttributes]
+_MERGED_FIAT_ATTRS_CACHE: weakref.WeakKeyDictionary[PossibleFiatAttributes, _MergedAttributesCacheEntry]
+_MERGED_FIAT_ATTRS_CACHE = weakref.WeakKeyDictionary()
+
+
+def _merged_possible_fiat_attributes(
+    generic_attrs: PossibleFiatAttributes, descendant_attrs: PossibleFiatAttributes | None
+) -> PossibleFiatAttributes:
+    """Returns a PossibleFiatAttributes that holds the generic and the descendant attributes (cached).
+    The result is shared: do not modify it."""
+    if descendant_attrs is None:
+        return generic_attrs
+    cached = _MERGED_FIAT_ATTRS_CACHE.get(descendant_attrs)
+    if cached is not None:
+        generic_version, descendant_version, merged = cached
+        if generic_version == generic_attrs.version and descendant_version == descendant_attrs.version:
+            return merged
+    merged = PossibleFiatAttributes(generic_attrs.parent_name)
+    merged.merge_attributes(generic_attrs)
+    merged.merge_attributes(descendant_attrs)
+    _MERGED_FIAT_ATTRS_CACHE[descendant_attrs] = (
+        generic_attrs.version,
+        descendant_attrs.version,
+        merged,
+    )
+    return merged
+
+
 def _draw_label_with_max_width(
     label: str, color: ImVec4, label_tooltip: str | None, status_tooltip: str | None = None
 ) -> None:
@@ -171,6 +204,18 @@ class AnyDataWithGui(Generic[DataType]):
     @property
     fiat_attributes -> dict[str, Any]
 
+    Values are shared, not copied:
+    ------------------------------
+    The value is referenced (not copied) by the presenters and their caches (e.g. image pyramids, sort
+    permutations, thumbnails), by the autosave snapshots, and by the background file writes.
+      - A function may modify its input in place and return it: setting the value (even to the same object)
+        triggers on_change, so that the caches derived from the value are recomputed.
+        on_change callbacks that cache data derived from a value shall therefore not assume that
+        the same object has the same content.
+      - A value that is modified in place *after* it was set (e.g. by a downstream function that draws
+        on its input without returning it, or by another thread) is not noticed: it may be displayed
+        from stale caches, and the pending snapshots and file writes may save its modified state.
+        User code shall not do this (or work on a copy).
     """
 
     # ------------------------------------------------------------------------------------------------------------------
@@ -371,11 +416,7 @@ class AnyDataWithGui(Generic[DataType]):
             return
         possible_fiat_attrs, _generic_possible_fiat_attrs = self.possible_fiat_attributes_with_generic()
 
-        # Create a version that holds all fiat attributes
-        all_possible_fiat_attrs = copy.deepcopy(_generic_possible_fiat_attrs)
-        if possible_fiat_attrs is not None:
-            all_possible_fiat_attrs.merge_attributes(copy.copy(possible_fiat_attrs))
-
+        all_possible_fiat_attrs = _merged_possible_fiat_attributes(_generic_possible_fiat_attrs, possible_fiat_attrs)
         all_possible_fiat_attrs.raise_exception_if_bad_fiat_attrs(fiat_attrs)
 
         self.fiat_attributes.update(fiat_attrs)
@@ -899,7 +940,8 @@ class AnyDataWithGui(Generic[DataType]):
         """Serialize the value to a dictionary
 
         Will call the save_to_dict callback if set, otherwise will use the default serialization, when available.
-        A default serialization is available for primitive types, tuples, and Pydantic models.
+        A default serialization is available for primitive types, tuples, Pydantic models, and numpy arrays
+        (large arrays are stored in a binary sidecar file when saving from FiatGui, see binary_sidecar.py).
 
         (This is how fiatlight saves the data to a JSON file)
 
@@ -919,6 +961,8 @@ class AnyDataWithGui(Generic[DataType]):
             return {"type": "Tuple", "value": value}
         elif isinstance(value, pydantic.BaseModel):
             return {"type": "Pydantic", "value": value.model_dump(mode="json")}
+        elif isinstance(value, np.ndarray) and not value.dtype.hasobject:
+            return binary_sidecar.save_ndarray_to_dict(value)
         else:
             logging.warning(
                 f"""
@@ -957,6 +1001,8 @@ class AnyDataWithGui(Generic[DataType]):
             r = self._type.model_validate(json_data["value"])
             assert isinstance(r, self._type)
             return r
+        elif json_data["type"] in ("NdArray", "BinaryRef"):
+            return binary_sidecar.load_binary_value_from_dict(json_data)  # type: ignore
         else:
             raise ValueError(f"Cannot deserialize {json_data}")
 
@@ -0,0 +1,158 @@
+"""Autosaver: save the state of an application periodically, without blocking the GUI thread
+
+Saving the user inputs of a large graph (serializing to json, writing binary files) takes time.
+The Autosaver splits this work in two parts:
+    - on the GUI thread, a snapshot of the state is taken as a json dict (this is cheap: large arrays and
+      data frames are only referenced, their files are written later, see BinarySidecar.defer_writes)
+    - on a background thread, the snapshot is serialized and written to a temporary file,
+      which is then atomically renamed to the target file (a crash during the write cannot corrupt it)
+
+Bursts of changes are debounced: a snapshot is taken only once no change was notified for debounce_seconds.
+If the serialized state is identical to the content of the file, nothing is written.
+
+Usage (this is what FiatGui does):
+    autosaver = Autosaver("my_app.fiat_user.json", snapshot_fn=lambda: graph.save_user_inputs_to_json())
+    ...
+    autosaver.notify_changed()   # whenever the user changes something
+    autosaver.heartbeat()        # once per frame, on the GUI thread
+    ...
+    autosaver.stop()             # at exit: writes the pending changes, and stops the background thread
+
+Note: the snapshot references the values of the application (it does not copy them).
+      See "Values are shared, not copied" in AnyDataWithGui.
+"""
+
+from fiatlight.fiat_core.binary_sidecar import BinarySidecar, binary_sidecar_ctx
+from fiatlight.fiat_core.file_writer import write_bytes_file_atomically
+from fiatlight.fiat_types.base_types import JsonDict
+from dataclasses import dataclass
+from typing import Callable
+import json
+import logging
+import os
+import threading
+import time
+
+
+def write_text_file_atomically(filename: str, text: str) -> None:
+    """Write a text file (utf-8) via a temporary file in the same directory, which is then renamed to filename"""
+    write_bytes_file_atomically(filename, text.encode("utf-8"))
+
+
+@dataclass
+class _AutosaveJob:
+    json_data: JsonDict
+    sidecar: BinarySidecar
+
+
+class Autosaver:
+    """Saves snapshots of a state to a json file, on a background thread (see module doc)"""
+
+    filename: str
+    # Delay without any change before a snapshot is taken (in seconds)
+    debounce_seconds: float
+    # Statistics
+    nb_writes: int = 0
+    nb_skipped_writes: int = 0  # snapshots identical to the file content
+
+    _snapshot_fn: Callable[[], JsonDict]
+    # Time of the last change not yet snapshotted (None if there is none)
+    _last_change_time: float | None = None
+    # The latest snapshot, waiting to be written (older snapshots are replaced)
+    _pending_job: _AutosaveJob | None = None
+    _is_writing: bool = False
+    # Content of the file, as written by the last write (None if unknown yet)
+    _last_written_text: str | None = None
+
+    _condition: threading.Condition
+    _thread: threading.Thread | None = None
+    _shall_stop: bool = False
+
+    def __init__(self, filename: str, snapshot_fn: Callable[[], JsonDict], debounce_seconds: float = 2.0) -> None:
+        self.filename = filename
+        self.debounce_seconds = debounce_seconds
+        self._snapshot_fn = snapshot_fn
+        self._condition = threading.Condition()
+
+    def notify_changed(self) -> None:
+        """Signal that the state changed: a snapshot will be taken after debounce_seconds without changes"""
+        self._last_change_time = time.monotonic()
+
+    def has_unsaved_changes(self) -> bool:
+        with self._condition:
+            return self._last_change_time is not None or self._pending_job is not None or self._is_writing
+
+    def heartbeat(self) -> None:
+        """Call this regularly (e.g. once per frame) on the GUI thread"""
+        if self._last_change_time is None:
+            return
+        if time.monotonic() - self._last_change_time >= self.debounce_seconds:
+            self._take_snapshot()
+
+    def flush(self) -> None:
+        """Take a snapshot if there are changes, and wait until all snapshots are written"""
+        if self._last_change_time is not None:
+            self._take_snapshot()
+        with self._condition:
+            while self._pending_job is not None or self._is_writing:
+                self._condition.wait()
+
+    def stop(self) -> None:
+        """Write the pending changes, and stop the background thread"""
+        self.flush()
+        with self._condition:
+            self._shall_stop = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _take_snapshot(self) -> None:
+        self._last_change_time = None
+        sidecar = BinarySidecar(self.filename, defer_writes=True)
+        try:
+            with binary_sidecar_ctx(sidecar):
+                json_data = self._snapshot_fn()
+        except Exception as e:
+            logging.error(f"Autosaver: error while taking a snapshot for {self.filename}: {e}")
+            return
+        with self._condition:
+            self._pending_job = _AutosaveJob(json_data=json_data, sidecar=sidecar)
+            self._shall_stop = False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._background_loop, daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _background_loop(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending_job is None and not self._shall_stop:
+                    self._condition.wait()
+                if self._pending_job is None:
+                    return
+                job = self._pending_job
+                self._pending_job = None
+                self._is_writing = True
+            try:
+                self._write(job)
+            except Exception as e:
+                logging.error(f"Autosaver: error while writing {self.filename}: {e}")
+            finally:
+                with self._condition:
+                    self._is_writing = False
+                    self._condition.notify_all()
+
+    def _write(self, job: _AutosaveJob) -> None:
+        job.sidecar.write_deferred_files()
+        text = json.dumps(job.json_data, indent=4)
+        if self._last_written_text is None and os.path.exists(self.filename):
+            with open(self.filename) as f:
+                self._last_written_text = f.read()
+        if text == self._last_written_text:
+            self.nb_skipped_writes += 1
+            return
+        write_text_file_atomically(self.filename, text)
+        self._last_written_text = text
+        self.nb_writes += 1
+        job.sidecar.remove_unreferenced_files()
@@ -0,0 +1,208 @@
+"""BinarySidecar: store large values (numpy arrays, pandas DataFrames) in binary files next to a json file
+
+When saving the user inputs, fiatlight writes a json file. Large values would bloat this json file
+(or could not be saved at all), so they are stored in a sidecar directory, next to the json file:
+    my_app.fiat_user.json     <- references the binary files by their key
+    my_app.fiat_user.bin/     <- one binary file per value (.npy for arrays, .parquet or .pkl for DataFrames)
+
+The binary files are named after a hash of their content:
+    - saving a value that did not change does not rewrite its file
+    - arrays are loaded lazily, as copy-on-write memory maps (np.load(mmap_mode="c"))
+
+Usage (this is what FiatGui does):
+    sidecar = BinarySidecar(json_filename)
+    with binary_sidecar_ctx(sidecar):
+        json_data = graph.save_user_inputs_to_json()   # large arrays are stored in the sidecar
+    ... # write json_data
+    sidecar.remove_unreferenced_files()
+
+Outside a binary_sidecar_ctx, arrays are stored inline in the json (as base64).
+
+With defer_writes=True, hashing and writing the binary files is postponed until write_deferred_files()
+is called (the returned references are completed at that time). This is used by the Autosaver,
+which takes a snapshot on the GUI thread, and writes it on a background thread.
+"""
+
+from fiatlight.fiat_types.base_types import JsonDict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Tuple
+import base64
+import hashlib
+import os
+
+import numpy as np
+
+
+class BinarySidecar:
+    """A directory of binary files, associated to a json file"""
+
+    directory: str
+    # Arrays smaller than this are stored inline in the json
+    min_size_bytes: int
+    # If True, the files are written by write_deferred_files() (see module doc)
+    defer_writes: bool
+    _referenced_files: set[str]
+    # (reference to complete, function that writes the file and returns its name)
+    _deferred_writes: List[Tuple[JsonDict, Callable[[], str]]]
+
+    _SIDECAR_EXTENSIONS = (".npy", ".parquet", ".pkl")
+
+    def __init__(self, json_filename: str, min_size_bytes: int = 4096, defer_writes: bool = False) -> None:
+        base_filename = json_filename[:-5] if json_filename.endswith(".json") else json_filename
+        self.directory = base_filename + ".bin"
+        self.min_size_bytes = min_size_bytes
+        self.defer_writes = defer_writes
+        self._referenced_files = set()
+        self._deferred_writes = []
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def _write_if_needed(self, filename: str, write_fn: Any) -> None:
+        """Write a file (via a temporary file + rename), unless a file with the same content hash exists"""
+        self._referenced_files.add(filename)
+        path = self._path(filename)
+        if os.path.exists(path):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        write_fn(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _store(self, write_file: Callable[[], str]) -> JsonDict:
+        if self.defer_writes:
+            ref: JsonDict = {"type": "BinaryRef", "file": ""}
+            self._deferred_writes.append((ref, write_file))
+            return ref
+        return {"type": "BinaryRef", "file": write_file()}
+
+    def write_deferred_files(self) -> None:
+        """Write the files whose writing was deferred, and complete their references"""
+        for ref, write_file in self._deferred_writes:
+            ref["file"] = write_file()
+        self._deferred_writes = []
+
+    def store_array(self, array: np.ndarray) -> JsonDict:
+        """Store an array in the sidecar, and return a reference to it"""
+        return self._store(lambda: self._write_array(array))
+
+    def _write_array(self, array: np.ndarray) -> str:
+        array = np.ascontiguousarray(array)
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(f"{array.dtype.str}{array.shape}".encode())
+        hasher.update(array.reshape(-1).view(np.uint8).data)
+        filename = hasher.hexdigest() + ".npy"
+
+        def write(path: str) -> None:
+            with open(path, "wb") as f:
+                np.save(f, array, allow_pickle=False)
+
+        self._write_if_needed(filename, write)
+        return filename
+
+    def store_dataframe(self, df: Any) -> JsonDict:
+        """Store a pandas DataFrame in the sidecar (as parquet if pyarrow is available, otherwise as pickle)"""
+        return self._store(lambda: self._write_dataframe(df))
+
+    def _write_dataframe(self, df: Any) -> str:
+        import pandas as pd
+        import importlib.util
+
+        extension = ".parquet" if importlib.util.find_spec("pyarrow") is not None else ".pkl"
+
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(str(list(df.columns)).encode())
+        hasher.update(str(list(df.dtypes)).encode())
+        try:
+            hasher.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+        except TypeError:  # unhashable cells (lists, dicts, ...)
+            import pickle
+
+            hasher.update(pickle.dumps(df))
+        filename = hasher.hexdigest() + extension
+
+        def write(path: str) -> None:
+            if extension == ".parquet":
+                df.to_parquet(path)
+            else:
+                df.to_pickle(path)
+
+        self._write_if_needed(filename, write)
+        return filename
+
+    def load(self, json_data: JsonDict) -> Any:
+        """Load a value from a reference created by store_array or store_dataframe"""
+        filename = json_data["file"]
+        if os.path.basename(filename) != filename:
+            raise ValueError(f"BinarySidecar: invalid file name {filename}")
+        path = self._path(filename)
+        if filename.endswith(".npy"):
+            return np.load(path, mmap_mode="c", allow_pickle=False)
+        elif filename.endswith(".parquet"):
+            import pandas as pd
+
+            return pd.read_parquet(path)
+        elif filename.endswith(".pkl"):
+            import pandas as pd
+
+            return pd.read_pickle(path)
+        else:
+            raise ValueError(f"BinarySidecar: unknown file type {filename}")
+
+    def remove_unreferenced_files(self) -> None:
+        """Remove the binary files that were not referenced since this sidecar was created"""
+        if not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if filename.endswith(self._SIDECAR_EXTENSIONS) and filename not in self._referenced_files:
+                os.remove(self._path(filename))
+
+
+_CURRENT_SIDECAR: BinarySidecar | None = None
+
+
+@contextmanager
+def binary_sidecar_ctx(sidecar: BinarySidecar) -> Iterator[BinarySidecar]:
+    """Make a sidecar available to the serialization functions, during a save or a load"""
+    global _CURRENT_SIDECAR
+    previous_sidecar = _CURRENT_SIDECAR
+    _CURRENT_SIDECAR = sidecar
+    try:
+        yield sidecar
+    finally:
+        _CURRENT_SIDECAR = previous_sidecar
+
+
+def current_binary_sidecar() -> BinarySidecar | None:
+    """The sidecar in use by the current save or load operation (if any)"""
+    return _CURRENT_SIDECAR
+
+
+def save_ndarray_to_dict(array: np.ndarray) -> JsonDict:
+    """Serialize an array: in the current sidecar if it is large, inline (base64) otherwise"""
+    if array.dtype.hasobject:
+        raise ValueError("Cannot serialize a numpy array of objects")
+    sidecar = current_binary_sidecar()
+    if sidecar is not None and array.nbytes >= sidecar.min_size_bytes:
+        return sidecar.store_array(array)
+    array = np.ascontiguousarray(array)
+    return {
+        "type": "NdArray",
+        "dtype": array.dtype.str,
+        "shape": list(array.shape),
+        "data_base64": base64.b64encode(array.tobytes()).decode("ascii"),
+    }
+
+
+def load_binary_value_from_dict(json_data: JsonDict) -> Any:
+    """Deserialize a value saved by save_ndarray_to_dict, or stored in a sidecar"""
+    if json_data["type"] == "NdArray":
+        data = base64.b64decode(json_data["data_base64"])
+        return np.frombuffer(data, dtype=np.dtype(json_data["dtype"])).reshape(json_data["shape"]).copy()
+    elif json_data["type"] == "BinaryRef":
+        sidecar = current_binary_sidecar()
+        if sidecar is None:
+            raise ValueError("Cannot load a binary value outside of a binary_sidecar_ctx")
+        return sidecar.load(json_data)
+    else:
+        raise ValueError(f"Cannot deserialize binary value {json_data}")
@@ -0,0 +1,256 @@
+"""CompiledFunctionsGraph: a FunctionsGraph compiled into a plain callable pipeline
+
+Once a graph is tuned inside the GUI, it can be compiled into a standalone pipeline that does not use
+any of the interactive machinery (no AnyDataWithGui wrappers, no validators, no dirty flags, no async threads).
+
+    graph = FunctionsGraph.from_function_composition([make_image, blur, canny])
+    ...  # tune the parameters in the GUI, or via load_user_inputs_from_json()
+    pipeline = graph.compile(free_inputs=["make_image.path"])
+    outputs = pipeline({"make_image.path": "my_image.jpg"})
+    edges = outputs["canny"]
+
+How it works:
+    - The current values of the unlinked inputs (the user inputs) are captured as constants,
+      except for the "free inputs", which are passed at each call.
+    - The functions are sorted in topological order, and a flat execution plan is built:
+      each value (input or output) is stored in a slot of a list, and each step reads its arguments
+      from slots and writes its outputs to slots.
+    - Constant folding: the functions that depend only on constants are evaluated once, at compile time
+      (except for the functions that are always dirty, e.g. a camera or a live function).
+"""
+
+from fiatlight.fiat_core.function_node import FunctionNode
+from fiatlight.fiat_core.param_with_gui import ParamKind
+from fiatlight.fiat_types.error_types import Error, Unspecified, Invalid
+from typing import Any, Callable, Dict, List, Sequence, Tuple, TYPE_CHECKING
+from dataclasses import dataclass, field
+
+if TYPE_CHECKING:
+    from fiatlight.fiat_core.functions_graph import FunctionsGraph
+
+
+SlotIndex = int
+
+
+@dataclass
+class _CompiledStep:
+    """One function call inside the compiled plan"""
+
+    function_name: str
+    fn: Callable[..., Any]
+    positional_slots: List[SlotIndex]
+    keyword_slots: Dict[str, SlotIndex]
+    # slots where the outputs are stored (one slot per output)
+    output_slots: List[SlotIndex]
+
+    def run(self, slots: List[Any]) -> None:
+        args = [slots[i] for i in self.positional_slots]
+        kwargs = {name: slots[i] for name, i in self.keyword_slots.items()}
+        fn_output = self.fn(*args, **kwargs)
+        if len(self.output_slots) == 1:
+            slots[self.output_slots[0]] = fn_output
+        elif len(self.output_slots) > 1:
+            assert isinstance(fn_output, tuple) and len(fn_output) == len(self.output_slots)
+            for slot, value in zip(self.output_slots, fn_output):
+                slots[slot] = value
+
+
+@dataclass
+class CompiledFunctionsGraph:
+    """A FunctionsGraph compiled into a plain pipeline. Call it to evaluate the graph.
+
+    Call signature:
+        compiled_graph(free_input_values: dict[str, Any] | None = None) -> dict[str, Any]
+
+        - free_input_values: values for the free inputs, keyed by "function_name.param_name"
+          (missing free inputs use their captured value)
+        - returns the outputs of the functions whose outputs are not linked, keyed by function name.
+          If a function has several outputs, the value is a tuple.
+    """
+
+    # Initial content of the slots (constants and folded values are already filled)
+    _slots_template: List[Any] = field(default_factory=list)
+    # The steps that need to be run at each call, in topological order
+    _steps: List[_CompiledStep] = field(default_factory=list)
+    # "function_name.param_name" -> slot index
+    _free_input_slots: Dict[str, SlotIndex] = field(default_factory=dict)
+    # function_name -> output slots (for the functions whose outputs are not linked)
+    _result_slots: Dict[str, List[SlotIndex]] = field(default_factory=dict)
+    # Names of the functions that were evaluated at compile time
+    folded_functions_names: List[str] = field(default_factory=list)
+
+    def free_inputs_names(self) -> List[str]:
+        """The names of the inputs that can be passed at each call ("function_name.param_name")"""
+        return list(self._free_input_slots.keys())
+
+    def runtime_functions_names(self) -> List[str]:
+        """The names of the functions that are evaluated at each call, in topological order"""
+        return [step.function_name for step in self._steps]
+
+    def __call__(self, free_input_values: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        slots = list(self._slots_template)
+        if free_input_values is not None:
+            for name, value in free_input_values.items():
+                if name not in self._free_input_slots:
+                    raise ValueError(f"{name} is not a free input. Available free inputs: {self.free_inputs_names()}")
+                slots[self._free_input_slots[name]] = value
+
+        for step in self._steps:
+            step.run(slots)
+
+        r: Dict[str, Any] = {}
+        for function_name, output_slots in self._result_slots.items():
+            if len(output_slots) == 1:
+                r[function_name] = slots[output_slots[0]]
+            else:
+                r[function_name] = tuple(slots[i] for i in output_slots)
+        return r
+
+
+def _topological_sort(graph: "FunctionsGraph") -> List[FunctionNode]:
+    """Sort the function nodes so that each node comes after the nodes it depends on"""
+    nb_missing_inputs = {fn: len(fn.input_links) for fn in graph.functions_nodes}
+    ready = [fn for fn in graph.functions_nodes if nb_missing_inputs[fn] == 0]
+    r: List[FunctionNode] = []
+    while len(ready) > 0:
+        fn = ready.pop(0)
+        r.append(fn)
+        for link in fn.output_links:
+            nb_missing_inputs[link.dst_function_node] -= 1
+            if nb_missing_inputs[link.dst_function_node] == 0:
+                ready.append(link.dst_function_node)
+    if len(r) != len(graph.functions_nodes):
+        raise ValueError("Cannot compile a graph that contains a cycle")
+    return r
+
+
+def compile_functions_graph(graph: "FunctionsGraph", free_inputs: Sequence[str] = ()) -> CompiledFunctionsGraph:
+    """Compile a FunctionsGraph into a CompiledFunctionsGraph
+
+    :param graph: the graph to compile. The current values of its unlinked inputs are captured as constants.
+    :param free_inputs: the inputs that shall be passed at each call, as "function_name.param_name".
+                        They must be unlinked inputs.
+
+    GUI only nodes (GuiNode, MarkdownNode) are ignored.
+    Raises a ValueError if a captured input has no usable value (unspecified without default, error, or invalid).
+    """
+    r = CompiledFunctionsGraph()
+    free_inputs_set = set(free_inputs)
+    slots = r._slots_template
+
+    def new_slot(value: Any) -> SlotIndex:
+        slots.append(value)
+        return len(slots) - 1
+
+    # (function_node, output_idx) -> slot index
+    output_slots: Dict[Tuple[FunctionNode, int], SlotIndex] = {}
+    # slots whose value is only known at call time
+    runtime_slots: set[SlotIndex] = set()
+    handled_free_inputs: set[str] = set()
+
+    for fn_node in _topological_sort(graph):
+        fn_with_gui = fn_node.function_with_gui
+        function_name = fn_with_gui.function_name
+        if fn_with_gui.invoke_is_gui_only:
+            continue
+        if fn_with_gui._f_impl is None:
+            raise ValueError(f"Cannot compile function {function_name}: it has no implementation")
+
+        step = _CompiledStep(
+            function_name=function_name,
+            fn=fn_with_gui._f_impl,
+            positional_slots=[],
+            keyword_slots={},
+            output_slots=[],
+        )
+
+        for param in fn_with_gui._inputs_with_gui:
+            input_link = fn_node.input_node_link(param.name)
+            qualified_name = f"{function_name}.{param.name}"
+            if input_link is not None:
+                if qualified_name in free_inputs_set:
+                    raise ValueError(f"Free input {qualified_name} is linked to another function")
+                src_node = input_link.src_function_node
+                if src_node.function_with_gui.invoke_is_gui_only:
+                    raise ValueError(f"{qualified_name} is linked to a GUI only function")
+                slot = output_slots[(src_node, input_link.src_output_idx)]
+            else:
+                value = param.get_value_or_default()
+                if qualified_name in free_inputs_set:
+                    slot = new_slot(value)
+                    runtime_slots.add(slot)
+                    r._free_input_slots[qualified_name] = slot
+                    handled_free_inputs.add(qualified_name)
+                else:
+                    if isinstance(value, (Error, Unspecified, Invalid)):
+                        raise ValueError(f"Cannot compile: input {qualified_name} has no valid value ({value})")
+                    slot = new_slot(value)
+
+            if param.param_kind == ParamKind.PositionalOnly:
+                step.positional_slots.append(slot)
+            else:
+                step.keyword_slots[param.name] = slot
+
+        for output_idx in range(fn_with_gui.nb_outputs()):
+            slot = new_slot(None)
+            output_slots[(fn_node, output_idx)] = slot
+            step.output_slots.append(slot)
+        if fn_node.nb_unlinked_outputs() > 0:
+            r._result_slots[function_name] = step.output_slots
+
+        input_slots = step.positional_slots + list(step.keyword_slots.values())
+        depends_on_runtime = any(slot in runtime_slots for slot in input_slots)
+        if depends_on_runtime or fn_with_gui.invoke_always_dirty:
+            runtime_slots.update(step.output_slots)
+            r._steps.append(step)
+        else:
+            # Constant folding: evaluate the function once, now
+            step.run(slots)
+            r.folded_functions_names.append(function_name)
+
+    unknown_free_inputs = free_inputs_set - handled_free_inputs
+    if len(unknown_free_inputs) > 0:
+        raise ValueError(f"Unknown free inputs: {sorted(unknown_free_inputs)}")
+
+    return r
+
+
+def _benchmark_compiled_vs_interactive() -> None:
+    """Compare the evaluation time of a graph in the interactive engine vs. its compiled version"""
+    import timeit
+    from fiatlight.fiat_core.functions_graph import FunctionsGraph
+
+    def add_one(x: int = 0) -> int:
+        return x + 1
+
+    def double(x: int) -> int:
+        return x * 2
+
+    def minus_three(x: int) -> int:
+        return x - 3
+
+    chain = [add_one] + [double, minus_three] * 10
+    graph = FunctionsGraph.from_function_composition(chain)
+    first_function = graph.functions_nodes[0]
+    compiled = compile_functions_graph(graph, free_inputs=["add_one.x"])
+
+    nb_runs = 1000
+    counter = iter(range(10**9))
+
+    def run_interactive() -> None:
+        first_function.function_with_gui.set_param_value("x", next(counter))
+        first_function.on_inputs_changed()
+
+    def run_compiled() -> None:
+        compiled({"add_one.x": next(counter)})
+
+    duration_interactive = timeit.timeit(run_interactive, number=nb_runs)
+    duration_compiled = timeit.timeit(run_compiled, number=nb_runs)
+    print(f"Graph with {len(chain)} functions, {nb_runs} evaluations")
+    print(f"    interactive engine: {duration_interactive * 1000:.1f} ms")
+    print(f"    compiled graph:     {duration_compiled * 1000:.1f} ms")
+    print(f"    speedup:            x{duration_interactive / duration_compiled:.1f}")
+
+
+if __name__ == "__main__":
+    _benchmark_compiled_vs_interactive()
@@ -0,0 +1,208 @@
+"""BackgroundFileWriter: encode and write files on a background thread, without blocking the GUI thread
+
+Encoding a large image to PNG and writing it takes hundreds of milliseconds: ImageToFileGui and TextToFileGui
+submit their writes to a queue, which is processed by a background thread, in order.
+
+    - the encoding is done on the background thread too: a job is a path and a function that returns the bytes
+      to write (it references the data, without copying it: see "Values are shared, not copied" in AnyDataWithGui)
+    - the files are written via a temporary file in the same directory, which is then renamed to the target file
+    - a job can be submitted with a coalesce_key: if a job with the same key is still waiting in the queue,
+      it is replaced by the new one (e.g. "export on every change": only the latest version is written)
+    - the progress of the current batch (jobs submitted since the queue was last idle), and the throughput,
+      are available for display (see progress(), stats_report())
+
+The application shares one writer (see background_file_writer()), which FiatGui flushes at exit.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Hashable, Tuple
+import logging
+import os
+import tempfile
+import threading
+import time
+
+
+def write_bytes_file_atomically(filename: str, data: bytes) -> None:
+    """Write a binary file via a temporary file in the same directory, which is then renamed to filename"""
+    directory = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_filename = tempfile.mkstemp(dir=directory, prefix=os.path.basename(filename) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+
+
+@dataclass
+class _WriteJob:
+    path: str
+    encode_fn: Callable[[], bytes]
+    coalesce_key: Hashable | None
+    # Called on the background thread, with None on success, or with an error message
+    on_done: Callable[[str | None], None] | None
+
+
+class BackgroundFileWriter:
+    """Encodes and writes files on a background thread, in order (see module doc)"""
+
+    # Statistics
+    nb_writes: int = 0
+    nb_coalesced: int = 0  # jobs replaced by a newer job with the same coalesce_key, before being written
+    nb_errors: int = 0
+    nb_bytes_written: int = 0
+    busy_seconds: float = 0.0  # time spent encoding and writing
+    last_error: str | None = None
+
+    _pending_jobs: Deque[_WriteJob]
+    _current_job: _WriteJob | None = None
+    # Progress of the current batch (jobs submitted since the queue was last idle)
+    _batch_nb_jobs: int = 0
+    _batch_nb_done: int = 0
+
+    _condition: threading.Condition
+    _thread: threading.Thread | None = None
+    _shall_stop: bool = False
+
+    def __init__(self) -> None:
+        self._pending_jobs = deque()
+        self._condition = threading.Condition()
+
+    def submit(
+        self,
+        path: str,
+        encode_fn: Callable[[], bytes],
+        coalesce_key: Hashable | None = None,
+        on_done: Callable[[str | None], None] | None = None,
+    ) -> None:
+        """Add a job to the queue: encode_fn() is called on the background thread, and its result written to path.
+        If a job with the same coalesce_key is waiting in the queue, it is replaced by this one."""
+        job = _WriteJob(path=path, encode_fn=encode_fn, coalesce_key=coalesce_key, on_done=on_done)
+        with self._condition:
+            if not self._is_busy_locked():
+                self._batch_nb_jobs = 0
+                self._batch_nb_done = 0
+            replaced = False
+            if coalesce_key is not None:
+                for i, pending_job in enumerate(self._pending_jobs):
+                    if pending_job.coalesce_key == coalesce_key:
+                        self._pending_jobs[i] = job
+                        self.nb_coalesced += 1
+                        replaced = True
+                        break
+            if not replaced:
+                self._pending_jobs.append(job)
+                self._batch_nb_jobs += 1
+            self._shall_stop = False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._background_loop, daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def is_busy(self) -> bool:
+        with self._condition:
+            return self._is_busy_locked()
+
+    def nb_pending(self) -> int:
+        """The number of jobs waiting in the queue (not including the job being written)"""
+        with self._condition:
+            return len(self._pending_jobs)
+
+    def progress(self) -> Tuple[int, int]:
+        """(nb written, nb submitted) for the current batch, i.e. since the queue was last idle"""
+        with self._condition:
+            return self._batch_nb_done, self._batch_nb_jobs
+
+    def throughput_bytes_per_second(self) -> float:
+        if self.busy_seconds == 0.0:
+            return 0.0
+        return self.nb_bytes_written / self.busy_seconds
+
+    def stats_report(self) -> str:
+        done, total = self.progress()
+        r = f"{self.nb_writes} files written ({self.nb_bytes_written / 1e6:.1f} MB"
+        r += f", {self.throughput_bytes_per_second() / 1e6:.1f} MB/s)"
+        if done < total:
+            r = f"Writing {done}/{total}... " + r
+        if self.nb_coalesced > 0:
+            r += f", {self.nb_coalesced} coalesced"
+        if self.nb_errors > 0:
+            r += f", {self.nb_errors} errors"
+        return r
+
+    def flush(self) -> None:
+        """Wait until all the submitted jobs are written"""
+        with self._condition:
+            while self._is_busy_locked():
+                self._condition.wait()
+
+    def stop(self) -> None:
+        """Write the pending jobs, and stop the background thread"""
+        self.flush()
+        with self._condition:
+            self._shall_stop = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _is_busy_locked(self) -> bool:
+        return len(self._pending_jobs) > 0 or self._current_job is not None
+
+    def _background_loop(self) -> None:
+        while True:
+            with self._condition:
+                while len(self._pending_jobs) == 0 and not self._shall_stop:
+                    self._condition.wait()
+                if len(self._pending_jobs) == 0:
+                    return
+                job = self._pending_jobs.popleft()
+                self._current_job = job
+            error = self._write(job)
+            if job.on_done is not None:
+                job.on_done(error)
+            with self._condition:
+                self._current_job = None
+                self._batch_nb_done += 1
+                self._condition.notify_all()
+
+    def _write(self, job: _WriteJob) -> str | None:
+        start = time.perf_counter()
+        try:
+            data = job.encode_fn()
+            write_bytes_file_atomically(job.path, data)
+            self.nb_writes += 1
+            self.nb_bytes_written += len(data)
+            return None
+        except Exception as e:
+            error = f"Failed to write file {job.path}: {e}"
+            logging.error(f"BackgroundFileWriter: {error}")
+            self.nb_errors += 1
+            self.last_error = error
+            return error
+        finally:
+            self.busy_seconds += time.perf_counter() - start
+
+
+_BACKGROUND_FILE_WRITER: BackgroundFileWriter | None = None
+
+
+def background_file_writer() -> BackgroundFileWriter:
+    """The writer shared by the application"""
+    global _BACKGROUND_FILE_WRITER
+    if _BACKGROUND_FILE_WRITER is None:
+        _BACKGROUND_FILE_WRITER = BackgroundFileWriter()
+    return _BACKGROUND_FILE_WRITER
+
+
+def stop_background_file_writer() -> None:
+    """Write the pending jobs of the shared writer, if any (called by FiatGui at exit)"""
+    if _BACKGROUND_FILE_WRITER is not None:
+        _BACKGROUND_FILE_WRITER.stop()
@@ -8,9 +8,12 @@ from fiatlight.fiat_core.gui_node import GuiNode
 from fiatlight.fiat_core.markdown_node import MarkdownNode
 from fiatlight.fiat_types import Function, JsonDict, GuiFunctionWithInputs
 
-from typing import Sequence, Tuple, Set, List
+from typing import Sequence, Tuple, Set, List, TYPE_CHECKING
 from pydantic import BaseModel
 
+if TYPE_CHECKING:
+    from fiatlight.fiat_core.compiled_functions_graph import CompiledFunctionsGraph
+
 
 class FunctionsGraph:
     """A graph of FunctionNodes
@@ -454,7 +457,9 @@ class FunctionsGraph:
             function_reference = name_or_function
             candidate_nodes = []
             for fn_node in self.functions_nodes:
-                if fn_node.function_with_gui._f_impl is function_reference:
+                f_impl = fn_node.function_with_gui._f_impl
+                # f_impl may be wrapped (with functools.wraps), e.g. by fiat_image.ImagePreviewMode
+                if f_impl is function_reference or getattr(f_impl, "__wrapped__", None) is function_reference:
                     candidate_nodes.append(fn_node)
 
             if len(candidate_nodes) == 0:
@@ -476,6 +481,25 @@ class FunctionsGraph:
         r = any(fn.function_with_gui.shall_display_refresh_needed_label() for fn in self.functions_nodes)
         return r
 
+    class _Compilation_Section:  # Dummy class to create a section in the IDE # noqa
+        """
+        # ================================================================================================================
+        #                                            Compilation
+        # ================================================================================================================
+        """
+
+        pass
+
+    def compile(self, free_inputs: Sequence[str] = ()) -> "CompiledFunctionsGraph":
+        """Compile the graph into a plain callable pipeline, without any GUI machinery.
+        The current user inputs are captured as constants, except for the free_inputs
+        (given as "function_name.param_name"), which can be passed at each call.
+        See compiled_functions_graph.py
+        """
+        from fiatlight.fiat_core.compiled_functions_graph import compile_functions_graph
+
+        return compile_functions_graph(self, free_inputs)
+
     class _Serialization_Section:  # Dummy class to create a section in the IDE # noqa
         """
         # ================================================================================================================
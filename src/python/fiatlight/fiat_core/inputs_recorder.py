@@ -0,0 +1,209 @@
+"""InputsRecorder: record the user inputs changes of a FunctionsGraph, and replay them headlessly
+
+Performance issues are often tied to interactive sequences (drag a slider, switch an enum, load a file)
+that are hard to reproduce. The InputsRecorder logs every value change of the unlinked inputs of a graph,
+with timestamps. The recorded events can then be replayed against a FunctionsGraph (without any GUI),
+in order to measure the latency of each step, and the number of functions calls it triggered.
+
+Usage:
+    recorder = InputsRecorder(graph)
+    recorder.start()
+    ...  # the user interacts with the GUI
+    recorder.stop()
+    json_data = recorder.save_events_to_json()     # may be saved to a file, and attached to a bug report
+
+    # Later, in a test or a benchmark:
+    events = load_input_events_from_json(graph, json_data)
+    report = replay_input_events(graph, events)
+    print(report.summary())
+"""
+
+from fiatlight.fiat_core.functions_graph import FunctionsGraph
+from fiatlight.fiat_core.function_node import FunctionNode
+from fiatlight.fiat_core.any_data_with_gui import AnyDataWithGui
+from fiatlight.fiat_types.base_types import JsonDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple
+import time
+
+
+@dataclass
+class InputEvent:
+    """A change of the value of an unlinked input"""
+
+    # time since the start of the recording, in seconds
+    timestamp: float
+    function_name: str
+    param_name: str
+    value: Any
+
+
+@dataclass
+class ReplayStep:
+    """The result of the replay of one InputEvent"""
+
+    event: InputEvent
+    # time spent to apply the event and to recompute the graph, in seconds
+    latency: float
+    # number of function calls triggered by the event
+    nb_recomputations: int
+
+
+@dataclass
+class ReplayReport:
+    """The result of replay_input_events()"""
+
+    steps: List[ReplayStep] = field(default_factory=list)
+    # number of calls per function name
+    recomputations_per_function: Dict[str, int] = field(default_factory=dict)
+
+    def total_latency(self) -> float:
+        return sum(step.latency for step in self.steps)
+
+    def total_recomputations(self) -> int:
+        return sum(step.nb_recomputations for step in self.steps)
+
+    def max_latency(self) -> float:
+        return max((step.latency for step in self.steps), default=0.0)
+
+    def summary(self) -> str:
+        lines = [
+            f"{len(self.steps)} steps, total latency {self.total_latency() * 1000:.1f} ms, "
+            f"max latency {self.max_latency() * 1000:.1f} ms, {self.total_recomputations()} recomputations"
+        ]
+        for function_name, nb_calls in self.recomputations_per_function.items():
+            lines.append(f"    {function_name}: {nb_calls} calls")
+        return "\n".join(lines)
+
+
+class InputsRecorder:
+    """Records the value changes of the unlinked inputs of a FunctionsGraph.
+
+    It works by chaining a callback to the on_change callback of the inputs, between start() and stop().
+    Note: on_change is not called when a value is reset to Unspecified, or when it is invalid;
+          such changes are not recorded.
+    """
+
+    events: List[InputEvent]
+
+    _graph: FunctionsGraph
+    _start_time: float = 0.0
+    # (data_with_gui, original on_change callback) for each input being recorded
+    _hooked_inputs: List[Tuple[AnyDataWithGui[Any], Callable[[Any], None] | None]]
+
+    def __init__(self, graph: FunctionsGraph) -> None:
+        self._graph = graph
+        self.events = []
+        self._hooked_inputs = []
+
+    def is_recording(self) -> bool:
+        return len(self._hooked_inputs) > 0
+
+    def start(self) -> None:
+        """Start recording (the previous events are cleared)"""
+        if self.is_recording():
+            self.stop()
+        self.events = []
+        self._start_time = time.perf_counter()
+        for function_node in self._graph.functions_nodes:
+            function_name = function_node.function_with_gui.function_name
+            for param in function_node.user_editable_params():
+                self._hook_input(function_name, param.name, param.data_with_gui)
+
+    def stop(self) -> None:
+        """Stop recording, and restore the original callbacks"""
+        for data_with_gui, original_on_change in self._hooked_inputs:
+            data_with_gui.callbacks.on_change = original_on_change
+        self._hooked_inputs = []
+
+    def _hook_input(self, function_name: str, param_name: str, data_with_gui: AnyDataWithGui[Any]) -> None:
+        original_on_change = data_with_gui.callbacks.on_change
+
+        def on_change_recorded(value: Any) -> None:
+            timestamp = time.perf_counter() - self._start_time
+            self.events.append(InputEvent(timestamp, function_name, param_name, value))
+            if original_on_change is not None:
+                original_on_change(value)
+
+        data_with_gui.callbacks.on_change = on_change_recorded
+        self._hooked_inputs.append((data_with_gui, original_on_change))
+
+    def save_events_to_json(self) -> JsonDict:
+        """Save the events to a json dict (the values are serialized by their AnyDataWithGui)"""
+        events_json = []
+        for event in self.events:
+            data_with_gui = self._graph._function_node_with_name(event.function_name).function_with_gui.input(
+                event.param_name
+            )
+            events_json.append(
+                {
+                    "timestamp": event.timestamp,
+                    "function_name": event.function_name,
+                    "param_name": event.param_name,
+                    "value": data_with_gui.call_save_to_dict(event.value),
+                }
+            )
+        return {"input_events": events_json}
+
+
+def load_input_events_from_json(graph: FunctionsGraph, json_data: JsonDict) -> List[InputEvent]:
+    """Load events saved by InputsRecorder.save_events_to_json()
+    (the graph is needed to deserialize the values)"""
+    r = []
+    for event_json in json_data["input_events"]:
+        function_name = event_json["function_name"]
+        param_name = event_json["param_name"]
+        data_with_gui = graph._function_node_with_name(function_name).function_with_gui.input(param_name)
+        value = data_with_gui.call_load_from_dict(event_json["value"])
+        r.append(InputEvent(event_json["timestamp"], function_name, param_name, value))
+    return r
+
+
+def replay_input_events(graph: FunctionsGraph, events: List[InputEvent], respect_timing: bool = False) -> ReplayReport:
+    """Replay the events against a graph, headlessly, and report the latency and recomputations of each step.
+
+    The functions are invoked synchronously during the replay (even those with invoke_async=True),
+    so that the measures are deterministic.
+    If respect_timing is True, the replay waits between the events, as during the recording.
+    """
+    report = ReplayReport()
+    nb_calls: Dict[str, int] = {fn.function_with_gui.function_name: 0 for fn in graph.functions_nodes}
+
+    def counting_f_impl(function_name: str, f_impl: Callable[..., Any]) -> Callable[..., Any]:
+        def f(*args: Any, **kwargs: Any) -> Any:
+            nb_calls[function_name] += 1
+            return f_impl(*args, **kwargs)
+
+        return f
+
+    # Instrument the functions (and disable async invocation)
+    saved_states: List[Tuple[FunctionNode, Callable[..., Any] | None, bool]] = []
+    for fn_node in graph.functions_nodes:
+        fn_with_gui = fn_node.function_with_gui
+        saved_states.append((fn_node, fn_with_gui._f_impl, fn_with_gui.invoke_async))
+        if fn_with_gui._f_impl is not None:
+            fn_with_gui._f_impl = counting_f_impl(fn_with_gui.function_name, fn_with_gui._f_impl)
+        fn_with_gui.invoke_async = False
+
+    try:
+        replay_start = time.perf_counter()
+        for event in events:
+            if respect_timing:
+                delay = event.timestamp - (time.perf_counter() - replay_start)
+                if delay > 0.0:
+                    time.sleep(delay)
+            fn_node = graph._function_node_with_name(event.function_name)
+            nb_calls_before = sum(nb_calls.values())
+            start = time.perf_counter()
+            fn_node.function_with_gui.set_param_value(event.param_name, event.value)
+            fn_node.on_inputs_changed()
+            latency = time.perf_counter() - start
+            nb_recomputations = sum(nb_calls.values()) - nb_calls_before
+            report.steps.append(ReplayStep(event=event, latency=latency, nb_recomputations=nb_recomputations))
+    finally:
+        for fn_node, f_impl, invoke_async in saved_states:
+            fn_node.function_with_gui._f_impl = f_impl
+            fn_node.function_with_gui.invoke_async = invoke_async
+
+    report.recomputations_per_function = nb_calls
+    return report
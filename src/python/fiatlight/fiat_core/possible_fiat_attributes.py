@@ -17,16 +17,27 @@ class PossibleFiatAttributes:
 
     parent_name: str  # name of the AnyDataWithGui descendant type
     _explained_attributes_or_section: list[DetailedVar[Any] | _ExplainedSection]
+    # Incremented at each modification (enables caching of merged attributes, see AnyDataWithGui)
+    version: int
+    # Lookup table name -> attribute (built lazily, reset on modification)
+    _attributes_by_name: dict[str, DetailedVar[Any]] | None
 
     def __init__(self, parent_name: str) -> None:
         self._explained_attributes_or_section = []
         self.parent_name = parent_name
+        self.version = 0
+        self._attributes_by_name = None
+
+    def _on_modified(self) -> None:
+        self.version += 1
+        self._attributes_by_name = None
 
     def _explained_attributes(self) -> list[DetailedVar[Any]]:
         return [attr for attr in self._explained_attributes_or_section if isinstance(attr, DetailedVar)]
 
     def add_explained_section(self, explanation: str) -> None:
         self._explained_attributes_or_section.append(_ExplainedSection(explanation))
+        self._on_modified()
 
     def add_explained_attribute(
         self,
@@ -52,15 +63,19 @@ class PossibleFiatAttributes:
                 data_validation_function=data_validation_function,
             )
         )
+        self._on_modified()
 
     def _get_explained_attribute(self, name: str) -> DetailedVar[Any] | None:
-        for attr in self._explained_attributes():
-            if attr.name == name:
-                return attr
-        return None
+        if self._attributes_by_name is None:
+            self._attributes_by_name = {}
+            for attr in self._explained_attributes():
+                # the first attribute with a given name wins
+                self._attributes_by_name.setdefault(attr.name, attr)
+        return self._attributes_by_name.get(name)
 
     def merge_attributes(self, other: "PossibleFiatAttributes") -> None:
         self._explained_attributes_or_section += other._explained_attributes_or_section
+        self._on_modified()
 
     def validate_fiat_attrs(self, fiat_attrs: dict[str, Any]) -> None:
         unwanted_keys = []
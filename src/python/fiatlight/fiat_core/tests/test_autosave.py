@@ -0,0 +1,72 @@
+import json
+import os
+
+import numpy as np
+
+from fiatlight.fiat_core.autosave import Autosaver
+from fiatlight.fiat_core.functions_graph import FunctionsGraph
+from fiatlight.fiat_kits.fiat_image import ImageU8
+
+
+def process(image: ImageU8, x: int = 0) -> int:
+    return x
+
+
+def test_autosave_debounce_and_skip_unchanged(tmp_path) -> None:  # type: ignore
+    filename = str(tmp_path / "app.fiat_user.json")
+    nb_snapshots = 0
+    state = {"x": 1}
+
+    def snapshot() -> dict:  # type: ignore
+        nonlocal nb_snapshots
+        nb_snapshots += 1
+        return dict(state)
+
+    autosaver = Autosaver(filename, snapshot, debounce_seconds=3600.0)
+    # A burst of changes: nothing is saved before the debounce delay
+    for _ in range(10):
+        autosaver.notify_changed()
+        autosaver.heartbeat()
+    assert nb_snapshots == 0
+    assert autosaver.has_unsaved_changes()
+
+    autosaver.debounce_seconds = 0.0
+    autosaver.heartbeat()
+    autosaver.flush()
+    assert nb_snapshots == 1
+    assert autosaver.nb_writes == 1
+    with open(filename) as f:
+        assert json.load(f) == {"x": 1}
+
+    # Same state: nothing is written
+    autosaver.notify_changed()
+    autosaver.flush()
+    assert autosaver.nb_writes == 1
+    assert autosaver.nb_skipped_writes == 1
+
+    state["x"] = 2
+    autosaver.notify_changed()
+    autosaver.stop()
+    assert autosaver.nb_writes == 2
+    with open(filename) as f:
+        assert json.load(f) == {"x": 2}
+    # No temporary file is left behind
+    assert os.listdir(tmp_path) == ["app.fiat_user.json"]
+
+
+def test_autosave_with_sidecar(tmp_path) -> None:  # type: ignore
+    filename = str(tmp_path / "app.fiat_user.json")
+    graph = FunctionsGraph.from_function(process)
+    fn = graph.function_with_gui_of_name("process")
+    image = np.random.randint(0, 255, (100, 100, 3), dtype=np.uint8)
+    fn.set_param_value("image", image)
+
+    autosaver = Autosaver(filename, graph.save_user_inputs_to_json, debounce_seconds=0.0)
+    autosaver.notify_changed()
+    autosaver.stop()
+
+    with open(filename) as f:
+        json_data = json.load(f)
+    image_json = json_data["functions_nodes"]["process"]["image"]["data"]
+    assert image_json["type"] == "BinaryRef"
+    assert os.listdir(tmp_path / "app.fiat_user.bin") == [image_json["file"]]
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from fiatlight.fiat_core.binary_sidecar import BinarySidecar, binary_sidecar_ctx
+from fiatlight.fiat_core.functions_graph import FunctionsGraph
+from fiatlight.fiat_kits.fiat_dataframe.dataframe_with_gui import DataFrameWithGui
+from fiatlight.fiat_kits.fiat_image import ImageU8
+
+
+def process(image: ImageU8, small: ImageU8) -> int:
+    return 0
+
+
+def test_ndarray_inline_without_sidecar() -> None:
+    graph = FunctionsGraph.from_function(process)
+    fn = graph.function_with_gui_of_name("process")
+    small = np.arange(6, dtype=np.uint8).reshape(2, 3)
+    fn.set_param_value("small", small)
+    json_data = fn.input("small").call_save_to_dict(small)
+    assert json_data["type"] == "NdArray"
+    loaded = fn.input("small").call_load_from_dict(json_data)
+    assert np.array_equal(loaded, small)  # type: ignore
+
+
+def test_ndarray_sidecar(tmp_path) -> None:  # type: ignore
+    json_filename = str(tmp_path / "app.fiat_user.json")
+    graph = FunctionsGraph.from_function(process)
+    fn = graph.function_with_gui_of_name("process")
+    image = np.random.randint(0, 255, (100, 100, 3), dtype=np.uint8)
+    small = np.zeros((2, 2), dtype=np.uint8)
+    fn.set_param_value("image", image)
+    fn.set_param_value("small", small)
+
+    sidecar = BinarySidecar(json_filename)
+    with binary_sidecar_ctx(sidecar):
+        json_data = graph.save_user_inputs_to_json()
+    image_json = json_data["functions_nodes"]["process"]["image"]["data"]
+    assert image_json["type"] == "BinaryRef"
+    assert json_data["functions_nodes"]["process"]["small"]["data"]["type"] == "NdArray"
+    assert os.listdir(sidecar.directory) == [image_json["file"]]
+
+    graph2 = FunctionsGraph.from_function(process)
+    with binary_sidecar_ctx(BinarySidecar(json_filename)):
+        graph2.load_user_inputs_from_json(json_data)
+    loaded = graph2.function_with_gui_of_name("process").input("image").value
+    assert isinstance(loaded, np.memmap)  # loaded lazily
+    assert np.array_equal(loaded, image)
+
+    # A new save without the image removes its file
+    fn.set_param_value("image", small)
+    sidecar2 = BinarySidecar(json_filename)
+    with binary_sidecar_ctx(sidecar2):
+        graph.save_user_inputs_to_json()
+    sidecar2.remove_unreferenced_files()
+    assert os.listdir(sidecar.directory) == []
+
+
+def test_dataframe_sidecar(tmp_path) -> None:  # type: ignore
+    df_gui = DataFrameWithGui()
+    df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+    # Without a sidecar, data frames are not saved
+    assert df_gui.call_save_to_dict(df) == {}
+
+    sidecar = BinarySidecar(str(tmp_path / "app.fiat_user.json"))
+    with binary_sidecar_ctx(sidecar):
+        json_data = df_gui.call_save_to_dict(df)
+        loaded = df_gui.call_load_from_dict(json_data)
+    assert json_data["type"] == "BinaryRef"
+    assert isinstance(loaded, pd.DataFrame)
+    assert loaded.equals(df)
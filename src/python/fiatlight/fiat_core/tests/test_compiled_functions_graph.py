@@ -0,0 +1,59 @@
+import pytest
+
+from fiatlight.fiat_core.functions_graph import FunctionsGraph
+
+
+def add_one(x: int = 0) -> int:
+    return x + 1
+
+
+def double(x: int) -> int:
+    return x * 2
+
+
+def add(a: int, b: int = 10) -> int:
+    return a + b
+
+
+def test_compile_matches_interactive_engine() -> None:
+    g = FunctionsGraph.from_function_composition([add_one, double, add])
+    g.function_with_gui_of_name("add_one").set_param_value("x", 3)
+    g.functions_nodes[0].on_inputs_changed()
+    interactive_result = g.function_with_gui_of_name("add").output().value
+
+    compiled = g.compile()
+    assert compiled() == {"add": interactive_result}
+    # Everything is constant: all functions are folded at compile time
+    assert compiled.folded_functions_names == ["add_one", "double", "add"]
+    assert compiled.runtime_functions_names() == []
+
+
+def test_compile_with_free_inputs() -> None:
+    g = FunctionsGraph.from_function_composition([add_one, double, add])
+    g.function_with_gui_of_name("add").set_param_value("b", 100)
+
+    compiled = g.compile(free_inputs=["add_one.x"])
+    assert compiled.free_inputs_names() == ["add_one.x"]
+    assert compiled.runtime_functions_names() == ["add_one", "double", "add"]
+    # The free input uses the default value when not passed
+    assert compiled() == {"add": (0 + 1) * 2 + 100}
+    assert compiled({"add_one.x": 4}) == {"add": (4 + 1) * 2 + 100}
+
+    compiled_b = g.compile(free_inputs=["add.b"])
+    # add_one and double only depend on constants
+    assert compiled_b.folded_functions_names == ["add_one", "double"]
+    assert compiled_b({"add.b": 1}) == {"add": 3}
+
+
+def test_compile_errors() -> None:
+    g = FunctionsGraph.from_function_composition([add_one, double])
+    with pytest.raises(ValueError):
+        g.compile(free_inputs=["double.x"])  # linked input
+    with pytest.raises(ValueError):
+        g.compile(free_inputs=["add_one.y"])  # unknown input
+    with pytest.raises(ValueError):
+        g.compile()({"double.x": 1})
+
+    g2 = FunctionsGraph.from_function(double)
+    with pytest.raises(ValueError):
+        g2.compile()  # double.x is unspecified
@@ -0,0 +1,49 @@
+import threading
+
+from fiatlight.fiat_core.file_writer import BackgroundFileWriter
+
+
+def test_background_file_writer(tmp_path) -> None:  # type: ignore
+    writer = BackgroundFileWriter()
+    first_job_started = threading.Event()
+    release_first_job = threading.Event()
+
+    def slow_encode() -> bytes:
+        first_job_started.set()
+        release_first_job.wait()
+        return b"first"
+
+    # While the first job is being written, the next ones wait in the queue
+    writer.submit(str(tmp_path / "a.txt"), slow_encode)
+    first_job_started.wait()
+    errors: list[str | None] = []
+    for i in range(5):
+        text = f"version {i}".encode()
+        writer.submit(str(tmp_path / "b.txt"), lambda text=text: text, coalesce_key="b", on_done=errors.append)  # type: ignore
+    writer.submit(str(tmp_path / "c.txt"), lambda: b"c")
+    assert writer.nb_pending() == 2  # the versions of b.txt were coalesced
+    assert writer.progress() == (0, 3)
+    assert "Writing 0/3" in writer.stats_report()
+
+    release_first_job.set()
+    writer.flush()
+    assert not writer.is_busy()
+    assert writer.progress() == (3, 3)
+    assert (tmp_path / "a.txt").read_bytes() == b"first"
+    assert (tmp_path / "b.txt").read_bytes() == b"version 4"
+    assert (tmp_path / "c.txt").read_bytes() == b"c"
+    assert writer.nb_writes == 3
+    assert writer.nb_coalesced == 4
+    assert errors == [None]
+
+    # Errors are reported, and do not stop the writer
+    def failing_encode() -> bytes:
+        raise ValueError("cannot encode")
+
+    writer.submit(str(tmp_path / "d.txt"), failing_encode, on_done=errors.append)
+    writer.submit(str(tmp_path / "e.txt"), lambda: b"e")
+    writer.stop()
+    assert writer.nb_errors == 1
+    assert errors[-1] is not None and "cannot encode" in errors[-1]
+    assert (tmp_path / "e.txt").read_bytes() == b"e"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt", "b.txt", "c.txt", "e.txt"]
@@ -0,0 +1,39 @@
+"""`import fiatlight` shall stay fast: the kits (and cv2, pandas, matplotlib) are imported lazily"""
+
+import subprocess
+import sys
+
+# Budget for the cumulative import time of fiatlight (it is about 0.5s on a typical machine,
+# most of it being spent in imgui_bundle and pydantic). This budget is generous, to avoid flaky tests.
+IMPORT_TIME_BUDGET_SECONDS = 2.5
+
+
+def _import_times_us(statement: str) -> dict[str, int]:
+    """Run a statement with `python -X importtime`, and return the cumulative import time of each module"""
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True)
+    assert r.returncode == 0, r.stderr
+    times = {}
+    for line in r.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, module_name = line[len("import time:") :].split("|")
+        times[module_name.strip()] = int(cumulative_us)
+    return times
+
+
+def test_import_fiatlight_is_lazy() -> None:
+    times = _import_times_us("import fiatlight")
+    for heavy_module in ["cv2", "pandas", "matplotlib", "fiatlight.fiat_kits.fiat_image.image_gui"]:
+        assert heavy_module not in times, f"{heavy_module} should not be imported by `import fiatlight`"
+    assert times["fiatlight"] / 1e6 < IMPORT_TIME_BUDGET_SECONDS
+
+
+def test_kits_are_imported_on_demand() -> None:
+    times = _import_times_us(
+        "import fiatlight as fl; "
+        "import pandas as pd; "
+        "assert type(fl.any_type_to_gui(pd.DataFrame)).__name__ == 'DataFrameWithGui'; "
+        "assert fl.fiat_image.ImageU8 is not None"
+    )
+    assert "fiatlight.fiat_kits.fiat_dataframe.dataframe_with_gui" in times
+    assert "fiatlight.fiat_kits.fiat_image.image_gui" in times
@@ -0,0 +1,43 @@
+from fiatlight.fiat_core.functions_graph import FunctionsGraph
+from fiatlight.fiat_core.inputs_recorder import InputsRecorder, load_input_events_from_json, replay_input_events
+
+
+def add(a: int = 0, b: int = 0) -> int:
+    return a + b
+
+
+def double(x: int) -> int:
+    return x * 2
+
+
+def test_record_and_replay() -> None:
+    graph = FunctionsGraph.from_function_composition([add, double])
+    add_gui = graph.function_with_gui_of_name("add")
+
+    recorder = InputsRecorder(graph)
+    recorder.start()
+    add_gui.set_param_value("a", 1)
+    add_gui.set_param_value("b", 2)
+    add_gui.set_param_value("a", 5)
+    recorder.stop()
+    add_gui.set_param_value("a", 10)  # not recorded
+
+    assert [(e.param_name, e.value) for e in recorder.events] == [("a", 1), ("b", 2), ("a", 5)]
+    timestamps = [e.timestamp for e in recorder.events]
+    assert timestamps == sorted(timestamps)
+    # The original callbacks were restored
+    assert add_gui.input("a").callbacks.on_change is None
+
+    # Replay on a fresh graph, from json
+    json_data = recorder.save_events_to_json()
+    graph2 = FunctionsGraph.from_function_composition([add, double])
+    events = load_input_events_from_json(graph2, json_data)
+    report = replay_input_events(graph2, events)
+
+    assert len(report.steps) == 3
+    # Each step invokes add, then double
+    assert [step.nb_recomputations for step in report.steps] == [2, 2, 2]
+    assert report.total_recomputations() == 6
+    assert report.recomputations_per_function == {"add": 3, "double": 3}
+    assert graph2.function_with_gui_of_name("double").output().value == (5 + 2) * 2
+    assert "6 recomputations" in report.summary()
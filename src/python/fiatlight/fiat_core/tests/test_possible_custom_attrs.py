@@ -122,3 +122,23 @@ def test_possible_fiat_attr_in_function() -> None:
     fiat_attrs = f_gui.param("foo").data_with_gui.fiat_attributes
     assert "xrange" in fiat_attrs
     assert fiat_attrs["xrange"] == (5, 10)
+
+
+def test_merged_possible_fiat_attributes_cache() -> None:
+    from fiatlight.fiat_core.any_data_with_gui import (
+        _merged_possible_fiat_attributes,
+        _ANYDATAWITHGUI_GENERIC_POSSIBLE_FIAT_ATTRIBUTES as generic_attrs,
+    )
+
+    foo_attrs = make_possible_fiat_attributes()
+    merged = _merged_possible_fiat_attributes(generic_attrs, foo_attrs)
+    assert _merged_possible_fiat_attributes(generic_attrs, foo_attrs) is merged
+    assert merged._get_explained_attribute("label") is not None  # generic attribute
+    assert merged._get_explained_attribute("xrange") is not None
+    assert merged._get_explained_attribute("new_attr") is None
+
+    # Modifying the descendant attributes invalidates the cache
+    foo_attrs.add_explained_attribute(name="new_attr", type_=int, explanation="New", default_value=0)
+    merged2 = _merged_possible_fiat_attributes(generic_attrs, foo_attrs)
+    assert merged2 is not merged
+    assert merged2._get_explained_attribute("new_attr") is not None
@@ -1,17 +1,66 @@
-from . import fiat_image, fiat_implot, fiat_ai
+"""fiat_kits: collections of GUI types and functions for specific domains (images, plots, data frames, ...)
 
-__all__ = ["fiat_image", "fiat_implot", "fiat_ai"]
+The kits are imported lazily: importing fiatlight does not import them (nor cv2, pandas, matplotlib, ...).
+A kit is imported when:
+    - one of its modules is imported, e.g. `from fiatlight.fiat_kits.fiat_image import ImageU8`
+    - it is accessed as an attribute, e.g. `fiatlight.fiat_kits.fiat_image`, or `fl.fiat_image`
+    - a GUI is requested for a type that it handles, e.g. pandas.DataFrame (see _register_lazy_kits)
+"""
 
+from typing import TYPE_CHECKING, Any, Callable
+import importlib
 import importlib.util
 
-if importlib.util.find_spec("pandas") is not None:
-    from . import fiat_dataframe  # noqa: F401 - triggers DataFrame GUI registration
+__all__ = ["fiat_image", "fiat_implot", "fiat_ai"]
 
+if importlib.util.find_spec("pandas") is not None:
     __all__.append("fiat_dataframe")
-
 if importlib.util.find_spec("matplotlib") is not None:
     __all__.append("fiat_matplotlib")
-    # from .experimental import fiat_audio_simple
-    from .fiat_matplotlib import _register_figure_with_gui  # noqa
 
-    _register_figure_with_gui()
+if TYPE_CHECKING:
+    from . import fiat_image, fiat_implot, fiat_ai  # noqa: F401
+
+
+def __getattr__(name: str) -> Any:
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _kit_module_matcher(kit_name: str) -> Callable[[str], bool]:
+    """Matches the typenames of the types defined inside a kit (also inside unions, optionals, ...)"""
+    kit_prefix = f"{__name__}.{kit_name}."
+    return lambda typename: kit_prefix in typename
+
+
+def _register_lazy_kits() -> None:
+    from fiatlight.fiat_togui.gui_registry import gui_factories
+
+    def lazy_import(kit_name: str) -> Callable[[], None]:
+        def loader() -> None:
+            # Importing a kit registers its factories
+            importlib.import_module(f"{__name__}.{kit_name}")
+
+        return loader
+
+    def load_fiat_matplotlib() -> None:
+        from .fiat_matplotlib import _register_figure_with_gui
+
+        _register_figure_with_gui()
+
+    # Types defined inside the kits (importing them imports the kit, this is a safety net)
+    for kit_name in ["fiat_image", "fiat_implot", "fiat_ai"]:
+        gui_factories().register_lazy_factories(_kit_module_matcher(kit_name), lazy_import(kit_name))
+    # Types from external libraries
+    if "fiat_dataframe" in __all__:
+        gui_factories().register_lazy_factories(
+            lambda typename: typename == "pandas.DataFrame", lazy_import("fiat_dataframe")
+        )
+    if "fiat_matplotlib" in __all__:
+        gui_factories().register_lazy_factories(
+            lambda typename: typename == "matplotlib.figure.Figure", load_fiat_matplotlib
+        )
+
+
+_register_lazy_kits()
@@ -0,0 +1,134 @@
+"""DataFrameCellFormatter: lazy and cached formatting of the cells of a DataFrame, for DataFramePresenter
+
+DataFramePresenter only displays the visible rows (a page, or the rows visible in the scrolling table).
+Their cells are formatted with vectorized formatters (one call per column, for all the visible rows), and the
+formatted strings are cached per (row, column): a frame only formats the rows that just became visible.
+
+The formatters depend on the column type:
+    - bool: np.where on the values
+    - numeric (int, uint, float): numpy astype(str)
+    - categorical: the categories are formatted once, and taken by code
+    - object: str() on each value (there is no faster way)
+    - others (datetime, extension types): str() on the python values of the selected rows
+The strings are the same as str(value), as displayed before.
+
+A DataFrameCellFormatter is created each time a DataFrame value is set (DataFramePresenter.on_change): its cached
+strings are those of this value, even when the same DataFrame was modified in place and set again.
+"""
+
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+# A function that formats the values of a column at the given row positions
+ColumnFormatter = Callable[[np.ndarray], List[str]]
+
+
+def make_column_formatter(column: pd.Series) -> ColumnFormatter:
+    """A vectorized formatter for the values of a column, depending on its type"""
+    dtype = column.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = [str(category) for category in dtype.categories]
+        formatted_categories = np.array(categories + ["nan"], dtype=object)
+        codes = column.cat.codes.to_numpy()  # -1 for missing values: the last item of formatted_categories
+        return lambda positions: formatted_categories[codes[positions]].tolist()
+    if isinstance(dtype, np.dtype):
+        values = column.to_numpy()
+        if dtype.kind == "b":
+            return lambda positions: np.where(values[positions], "True", "False").tolist()
+        if dtype.kind in "iuf":
+            return lambda positions: values[positions].astype(str).tolist()
+        if dtype.kind == "O":
+            return lambda positions: [str(value) for value in values[positions]]
+    return lambda positions: [str(value) for value in column.take(positions).tolist()]
+
+
+class DataFrameCellFormatter:
+    """Formats the cells of a DataFrame when they are first displayed, and caches them (see module doc)"""
+
+    dataframe: pd.DataFrame
+    # When the number of cached cells exceeds this, the cache is cleared
+    max_cached_cells: int
+
+    # column index -> (row position -> formatted cell)
+    _cells: Dict[int, Dict[int, str]]
+    # column index -> formatter (created when the column is first displayed)
+    _column_formatters: Dict[int, ColumnFormatter]
+    _nb_cached_cells: int = 0
+
+    def __init__(self, dataframe: pd.DataFrame, max_cached_cells: int = 2_000_000) -> None:
+        self.dataframe = dataframe
+        self.max_cached_cells = max_cached_cells
+        self._cells = {}
+        self._column_formatters = {}
+
+    def formatted_column(self, column_index: int, row_positions: np.ndarray) -> List[str]:
+        """The formatted cells of a column, for the given row positions"""
+        cells = self._cells.setdefault(column_index, {})
+        missing_positions = [position for position in row_positions.tolist() if position not in cells]
+        if len(missing_positions) > 0:
+            if self._nb_cached_cells + len(missing_positions) > self.max_cached_cells:
+                self.clear()
+                cells = self._cells.setdefault(column_index, {})
+                missing_positions = row_positions.tolist()
+            formatted_cells = self._column_formatter(column_index)(np.array(missing_positions, dtype=np.int64))
+            cells.update(zip(missing_positions, formatted_cells))
+            self._nb_cached_cells += len(missing_positions)
+        return [cells[position] for position in row_positions.tolist()]
+
+    def nb_cached_cells(self) -> int:
+        return self._nb_cached_cells
+
+    def _column_formatter(self, column_index: int) -> ColumnFormatter:
+        formatter = self._column_formatters.get(column_index)
+        if formatter is None:
+            formatter = make_column_formatter(self.dataframe.iloc[:, column_index])
+            self._column_formatters[column_index] = formatter
+        return formatter
+
+    def clear(self) -> None:
+        self._cells = {}
+        self._nb_cached_cells = 0
+
+
+def _benchmark_cell_formatting() -> None:
+    """Format the visible cells of a DataFrame with a million rows, while scrolling"""
+    import timeit
+
+    nb_rows = 1_000_000
+    dataframe = pd.DataFrame(
+        {
+            "int": np.random.randint(0, 1000, nb_rows),
+            "float": np.random.rand(nb_rows),
+            "str": np.random.choice(["alpha", "beta", "gamma", "delta"], nb_rows),
+            "category": pd.Categorical(np.random.choice(["x", "y", "z"], nb_rows)),
+        }
+    )
+    nb_visible_rows = 40
+
+    def format_naive(start: int) -> None:
+        for _, row in dataframe.iloc[start : start + nb_visible_rows].iterrows():
+            for col in dataframe.columns:
+                str(row[col])
+
+    formatter = DataFrameCellFormatter(dataframe)
+
+    def format_cached(start: int) -> None:
+        positions = np.arange(start, start + nb_visible_rows)
+        for column_index in range(len(dataframe.columns)):
+            formatter.formatted_column(column_index, positions)
+
+    nb_runs = 100
+    duration = timeit.timeit(lambda: format_naive(500_000), number=nb_runs) / nb_runs
+    print(f"iterrows + str, {nb_visible_rows} rows: {duration * 1000:.3f} ms")
+    duration = timeit.timeit(lambda: format_cached(500_000), number=nb_runs) / nb_runs
+    print(f"DataFrameCellFormatter, {nb_visible_rows} rows (cached): {duration * 1000:.3f} ms")
+    starts = iter(range(0, nb_rows, nb_visible_rows))
+    duration = timeit.timeit(lambda: format_cached(next(starts)), number=nb_runs) / nb_runs
+    print(f"DataFrameCellFormatter, {nb_visible_rows} new rows: {duration * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    _benchmark_cell_formatting()
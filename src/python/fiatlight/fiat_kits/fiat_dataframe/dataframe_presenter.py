@@ -1,6 +1,8 @@
 import copy
+from dataclasses import dataclass
 
 from pydantic import BaseModel, Field
+import numpy as np
 import pandas as pd
 from fiatlight.fiat_core.possible_fiat_attributes import PossibleFiatAttributes
 from fiatlight.fiat_types import FiatAttributes, JsonDict
@@ -8,6 +10,8 @@ from fiatlight.fiat_widgets.fontawesome6_ctx_utils import fontawesome_6_ctx, ico
 from imgui_bundle import imgui, imgui_ctx, hello_imgui, immapp
 from fiatlight.fiat_utils.str_utils import memory_readable_str
 from fiatlight.fiat_utils import is_rendering_in_node
+from fiatlight.fiat_kits.fiat_dataframe.dataframe_formatting import DataFrameCellFormatter
+from fiatlight.fiat_kits.fiat_dataframe.dataframe_sorting import DataFrameSorting
 
 
 class DataFramePossibleFiatAttributes(PossibleFiatAttributes):
@@ -43,6 +47,12 @@ class DataFramePossibleFiatAttributes(PossibleFiatAttributes):
             type_=int,
             default_value=20,
         )
+        self.add_explained_attribute(
+            name="scroll_all_rows",
+            explanation="Display all the rows in a scrolling table (only the visible rows are formatted), instead of pages",
+            type_=bool,
+            default_value=False,
+        )
         self.add_explained_attribute(
             name="current_page_start_idx",
             explanation="Index of the first row on the current page, used for pagination",
@@ -74,6 +84,10 @@ class DataFramePresenterParams(BaseModel):
     # Number of rows to display per page (when displayed elsewhere)
     rows_per_page_classic: int = 20
 
+    # Display all the rows in a scrolling table, instead of pages
+    # (only the visible rows are formatted, see dataframe_formatting.py)
+    scroll_all_rows: bool = False
+
     # Index of the first row on the current page, used for pagination.
     current_page_start_idx: int = 0
 
@@ -120,39 +134,69 @@ class DataFramePresenterParams(BaseModel):
             self.rows_per_page_classic = value
 
 
+@dataclass
+class DataFrameStats:
+    # Statistics about a DataFrame, computed once per value
+    # (memory_usage(deep=True) is linear in the number of rows for object columns)
+    num_rows: int
+    num_columns: int
+    memory_usage: int
+    column_info: str
+
+    @staticmethod
+    def compute(dataframe: pd.DataFrame) -> "DataFrameStats":
+        num_rows, num_columns = dataframe.shape
+        return DataFrameStats(
+            num_rows=num_rows,
+            num_columns=num_columns,
+            memory_usage=int(dataframe.memory_usage(deep=True).sum()),
+            column_info=", ".join([f"{col} ({dtype})" for col, dtype in zip(dataframe.columns, dataframe.dtypes)]),
+        )
+
+
 class DataFramePresenter:
     # class responsible for presenting a DataFrame as table,
     # with resizing columns, etc.
     params: DataFramePresenterParams
 
-    # A cached version of the DataFrame to present
-    # (I'm not sure that we need this cache, since present receives the DataFrame as an argument)
+    # The DataFrame to present: it is never modified (nor copied).
+    # It is displayed sorted through a permutation of its rows (see dataframe_sorting.py)
     dataframe: pd.DataFrame
-    dataframe_original: pd.DataFrame  # unsorted, unfiltered, etc.
+    sorting: DataFrameSorting
+    # The cells are formatted when first displayed, and cached
+    cell_formatter: DataFrameCellFormatter
+    # Statistics about the DataFrame, computed when first needed
+    _stats: DataFrameStats | None = None
 
     def __init__(self) -> None:
         self.params = DataFramePresenterParams()
 
-    @staticmethod
-    def present_str(value: pd.DataFrame) -> str:
+    def stats(self, value: pd.DataFrame) -> DataFrameStats:
+        if value is not getattr(self, "dataframe", None):
+            return DataFrameStats.compute(value)
+        if self._stats is None:
+            self._stats = DataFrameStats.compute(value)
+        return self._stats
+
+    def present_str(self, value: pd.DataFrame) -> str:
         if value.empty:
             return "DataFrame: Empty"
 
-        num_rows, num_columns = value.shape
-        column_info = ", ".join([f"{col} ({dtype})" for col, dtype in zip(value.columns, value.dtypes)])
-        memory_usage = value.memory_usage(deep=True).sum()
-
+        stats = self.stats(value)
         return (
-            f"DataFrame: {num_rows} rows, {num_columns} cols\n"
-            f"Columns: {column_info}\n"
-            f"Memory Usage: {memory_readable_str(memory_usage)}"
+            f"DataFrame: {stats.num_rows} rows, {stats.num_columns} cols\n"
+            f"Columns: {stats.column_info}\n"
+            f"Memory Usage: {memory_readable_str(stats.memory_usage)}"
         )
 
     def on_change(self, value: pd.DataFrame) -> None:
-        # Remember the original data frame (this one won't be modified)
-        self.dataframe_original = value
-        # We create a copy because we might change settings in the data frame (ordering, filtering, etc.)
-        self.dataframe = copy.copy(self.dataframe_original)
+        # Remember the data frame (it won't be modified: sorting is done via a permutation of its rows)
+        self.dataframe = value
+        # The params (e.g. sort_by) may refer to the columns of a previous DataFrame
+        self.params.validate_params(value)
+        self.sorting = DataFrameSorting(value)
+        self.cell_formatter = DataFrameCellFormatter(value)
+        self._stats = None
 
     def on_fiat_attributes_changes(self, fiat_attrs: FiatAttributes) -> None:
         # Update the params with the fiat attributes
@@ -160,13 +204,12 @@ class DataFramePresenter:
             if hasattr(self.params, key):
                 setattr(self.params, key, value)
 
-    def _paginated_dataframe(self) -> pd.DataFrame:
-        if self.params.current_page_start_idx > len(self.dataframe):
+    def _current_page_rows_positions(self) -> np.ndarray:
+        if not 0 <= self.params.current_page_start_idx <= len(self.dataframe):
             self.params.current_page_start_idx = 0
         start_idx = self.params.current_page_start_idx
         end_idx = start_idx + self.params.rows_per_page
-        paginated_dataframe = self.dataframe.iloc[start_idx:end_idx]
-        return paginated_dataframe
+        return self.sorting.positions(self.params.sort_by, start_idx, end_idx)
 
     # Add pagination controls
     def _show_pagination_controls(self) -> None:
@@ -185,48 +228,54 @@ class DataFramePresenter:
 
                     imgui.push_item_flag(imgui.ItemFlags_.button_repeat.value, True)
 
-                    # Backward buttons
-                    previous_button_enabled = start_idx > 0
-                    imgui.begin_disabled(not previous_button_enabled)
-                    # first page button
-                    if imgui.button(icons_fontawesome_6.ICON_FA_BACKWARD_FAST) and start_idx > 0:
-                        self.params.current_page_start_idx = 0
-                    # previous page button
-                    if imgui.button(icons_fontawesome_6.ICON_FA_CARET_LEFT) and start_idx > 0:
-                        self.params.current_page_start_idx = max(0, start_idx - self.params.rows_per_page)
-                    imgui.end_disabled()
-
-                    # Page label
-                    imgui.text(page_label)
-
-                    # Forward buttons
-                    next_button_enabled = end_idx < total_rows
-                    imgui.begin_disabled(not next_button_enabled)
-                    if imgui.button(icons_fontawesome_6.ICON_FA_CARET_RIGHT) and end_idx < total_rows:
-                        self.params.current_page_start_idx = min(
-                            total_rows - self.params.rows_per_page, start_idx + self.params.rows_per_page
-                        )
-                    if imgui.button(icons_fontawesome_6.ICON_FA_FORWARD_FAST) and end_idx < total_rows:
-                        self.params.current_page_start_idx = total_rows - self.params.rows_per_page
-                    imgui.end_disabled()
+                    if not self.params.scroll_all_rows:
+                        # Backward buttons
+                        previous_button_enabled = start_idx > 0
+                        imgui.begin_disabled(not previous_button_enabled)
+                        # first page button
+                        if imgui.button(icons_fontawesome_6.ICON_FA_BACKWARD_FAST) and start_idx > 0:
+                            self.params.current_page_start_idx = 0
+                        # previous page button
+                        if imgui.button(icons_fontawesome_6.ICON_FA_CARET_LEFT) and start_idx > 0:
+                            self.params.current_page_start_idx = max(0, start_idx - self.params.rows_per_page)
+                        imgui.end_disabled()
+
+                        # Page label
+                        imgui.text(page_label)
+
+                        # Forward buttons
+                        next_button_enabled = end_idx < total_rows
+                        imgui.begin_disabled(not next_button_enabled)
+                        if imgui.button(icons_fontawesome_6.ICON_FA_CARET_RIGHT) and end_idx < total_rows:
+                            self.params.current_page_start_idx = min(
+                                total_rows - self.params.rows_per_page, start_idx + self.params.rows_per_page
+                            )
+                        if imgui.button(icons_fontawesome_6.ICON_FA_FORWARD_FAST) and end_idx < total_rows:
+                            self.params.current_page_start_idx = total_rows - self.params.rows_per_page
+                        imgui.end_disabled()
 
                     # Info
                     def info_string() -> str:
-                        num_rows, num_columns = self.dataframe.shape
-                        memory_usage = memory_readable_str(self.dataframe.memory_usage(deep=True).sum())
-                        return f"{num_rows} rows, {num_columns} cols, Memory: {memory_usage}"
+                        stats = self.stats(self.dataframe)
+                        memory_usage = memory_readable_str(stats.memory_usage)
+                        return f"{stats.num_rows} rows, {stats.num_columns} cols, Memory: {memory_usage}"
 
                     imgui.spring()
                     imgui.text(info_string())
 
-                    # Rows per page
+                    # Rows per page (or visible rows, when scrolling)
                     imgui.spring()
-                    imgui.text("Rows per page:")
+                    imgui.text("Visible rows:" if self.params.scroll_all_rows else "Rows per page:")
                     imgui.set_next_item_width(hello_imgui.em_size(6.0))
                     _, self.params.rows_per_page = imgui.slider_int("##Rows per page", self.params.rows_per_page, 5, 70)
 
                     imgui.pop_item_flag()
 
+                    # Scroll all rows, or display pages
+                    imgui.spring()
+                    _, self.params.scroll_all_rows = imgui.checkbox("Scroll", self.params.scroll_all_rows)
+                    imgui.set_item_tooltip("Display all the rows in a scrolling table, instead of pages")
+
     def _handle_table_sorting(self) -> None:
         # Get the sort specs
         sort_specs = imgui.table_get_sort_specs()
@@ -242,17 +291,9 @@ class DataFramePresenter:
                     no_sort = spec.get_sort_direction() == imgui.SortDirection.none
                     if not no_sort:
                         sort_order.append((col_name, ascending))
+                # The rows will be displayed through the (cached) permutation for this sort order
                 self.params.sort_by = sort_order
 
-                # Sort the dataframe
-                if len(sort_order) > 0:
-                    self.dataframe.sort_values(
-                        by=[col for col, _ in sort_order], ascending=[asc for _, asc in sort_order], inplace=True
-                    )
-                else:
-                    # go back to the original order
-                    self.dataframe = copy.copy(self.dataframe_original)
-
                 sort_specs.specs_dirty = False
 
     def _show_table(self) -> None:
@@ -270,6 +311,10 @@ class DataFramePresenter:
             | imgui.TableFlags_.sortable.value
         )
         # | imgui.TableFlags_.sortable | imgui.TableFlags_.reorderable.value
+        if self.params.scroll_all_rows:
+            # The table height is set to display rows_per_page rows (and the headers)
+            table_flags |= imgui.TableFlags_.scroll_y.value
+            table_outer_size.y = imgui.get_text_line_height_with_spacing() * (self.params.rows_per_page + 1.5)
         table_inner_width = 0.0  # Use the full width of the table
         if imgui.begin_table(
             str_id="DataFrameTable",
@@ -290,15 +335,20 @@ class DataFramePresenter:
                 imgui.table_setup_column(column_label, column_flags, column_width)
 
             # Create headers
+            if self.params.scroll_all_rows:
+                imgui.table_setup_scroll_freeze(0, 1)
             imgui.table_headers_row()
 
             # Populate rows and cells
-            paginated_dataframe = self._paginated_dataframe()
-            for idx, row in paginated_dataframe.iterrows():
-                imgui.table_next_row()
-                for col in displayed_columns:
-                    imgui.table_next_column()
-                    imgui.text(str(row[col]))
+            if self.params.scroll_all_rows:
+                # Only the visible rows are displayed (and formatted)
+                clipper = imgui.ListClipper()
+                clipper.begin(len(self.dataframe))
+                while clipper.step():
+                    positions = self.sorting.positions(self.params.sort_by, clipper.display_start, clipper.display_end)
+                    self._show_rows(positions)
+            else:
+                self._show_rows(self._current_page_rows_positions())
 
             # Extract column order and sizes from the ImGui Table, and save them to params
             # column_order = []
@@ -323,6 +373,18 @@ class DataFramePresenter:
             # if imgui.is_item_hovered():
             #     ed.disable_user_input_this_frame()
 
+    def _show_rows(self, rows_positions: np.ndarray) -> None:
+        # The cells are formatted column by column (and cached), then displayed row by row
+        columns_cells = [
+            self.cell_formatter.formatted_column(column_index, rows_positions)
+            for column_index in range(len(self.dataframe.columns))
+        ]
+        for row_idx in range(len(rows_positions)):
+            imgui.table_next_row()
+            for column_cells in columns_cells:
+                imgui.table_next_column()
+                imgui.text(column_cells[row_idx])
+
     def _show_resizable_table(self) -> None:
         # Draw the table lambda, with a resize handle
         new_table_size_em = immapp.widget_with_resize_handle_in_node_editor_em(  # type: ignore  #  noqa
@@ -349,5 +411,5 @@ class DataFramePresenter:
 
     def clipboard_copy_str(self, _value: pd.DataFrame) -> str:
         # We ignore the value parameter since the data frame is cached inside self.dataframe
-        # (and potentially reordered by the user)
-        return self.dataframe.to_csv(index=False, sep="\t")
+        # (and potentially sorted by the user)
+        return self.sorting.sorted_dataframe(self.params.sort_by).to_csv(index=False, sep="\t")
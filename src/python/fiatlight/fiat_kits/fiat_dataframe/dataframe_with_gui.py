@@ -1,5 +1,6 @@
 from fiatlight.fiat_types import FiatAttributes, JsonDict
 from fiatlight.fiat_core.any_data_with_gui import AnyDataWithGui
+from fiatlight.fiat_core import binary_sidecar
 from fiatlight.fiat_core.possible_fiat_attributes import PossibleFiatAttributes
 from fiatlight.fiat_kits.fiat_dataframe.dataframe_presenter import _DATAFRAME_POSSIBLE_FIAT_ATTRIBUTES
 import pandas as pd
@@ -129,13 +130,18 @@ class DataFrameWithGui(AnyDataWithGui[pd.DataFrame]):
         self.dataframe_presenter.load_gui_options_from_json(json_dict)
 
     def _save_to_dict(self, value: pd.DataFrame) -> JsonDict:
-        # Here we could save the data frame to a JSON dict,
-        # But this is probably a bad idea, so we will probably dump this method or return an empty dict
-        return {}
+        # Data frames are only saved inside a binary sidecar (see fiat_core/binary_sidecar.py)
+        # Saving them inside the JSON would be a bad idea
+        sidecar = binary_sidecar.current_binary_sidecar()
+        if sidecar is None:
+            return {}
+        return sidecar.store_dataframe(value)
 
     def _load_from_dict(self, json_dict: JsonDict) -> pd.DataFrame:
-        # Here we could load the data frame from a JSON dict,
-        # But this is probably a bad idea, so we will probably dump this method or return an empty data frame
+        if json_dict.get("type") == "BinaryRef":
+            r = binary_sidecar.load_binary_value_from_dict(json_dict)
+            assert isinstance(r, pd.DataFrame)
+            return r
         return pd.DataFrame()
 
     class _ClipboardSection:
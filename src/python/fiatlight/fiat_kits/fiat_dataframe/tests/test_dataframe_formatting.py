@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from fiatlight.fiat_kits.fiat_dataframe.dataframe_formatting import DataFrameCellFormatter
+
+
+def test_cell_formatter() -> None:
+    dataframe = pd.DataFrame(
+        {
+            "int": [1, 2, 3],
+            "float": [0.1, np.nan, 2.5],
+            "bool": [True, False, True],
+            "str": ["a", None, "c"],
+            "category": pd.Categorical(["x", None, "y"]),
+            "date": pd.to_datetime(["2024-01-01", "2024-01-02", "NaT"]),
+        }
+    )
+    formatter = DataFrameCellFormatter(dataframe)
+    positions = np.array([2, 0, 1])
+    for column_index, column_name in enumerate(dataframe.columns):
+        expected = [str(dataframe[column_name].iloc[position]) for position in positions]
+        assert formatter.formatted_column(column_index, positions) == expected
+
+    # The cells are cached: formatting them again does not add cells
+    nb_cached_cells = formatter.nb_cached_cells()
+    assert nb_cached_cells == 3 * len(dataframe.columns)
+    formatter.formatted_column(0, np.array([0, 1]))
+    assert formatter.nb_cached_cells() == nb_cached_cells
+
+
+def test_cell_formatter_max_cached_cells() -> None:
+    dataframe = pd.DataFrame({"int": np.arange(100)})
+    formatter = DataFrameCellFormatter(dataframe, max_cached_cells=30)
+    for start in range(0, 100, 20):
+        positions = np.arange(start, start + 20)
+        assert formatter.formatted_column(0, positions) == [str(i) for i in positions]
+        assert formatter.nb_cached_cells() <= 30
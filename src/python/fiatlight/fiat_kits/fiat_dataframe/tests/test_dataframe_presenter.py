@@ -0,0 +1,15 @@
+import pandas as pd
+
+from fiatlight.fiat_kits.fiat_dataframe.dataframe_presenter import DataFramePresenter
+
+
+def test_presenter_ignores_sort_by_unknown_columns() -> None:
+    presenter = DataFramePresenter()
+    presenter.on_change(pd.DataFrame({"gone": [2, 1], "a": [3, 4]}))
+    presenter.params.sort_by = [("gone", True)]
+    assert presenter._current_page_rows_positions().tolist() == [1, 0]
+
+    # A new DataFrame without the sorted column: its rows are displayed unsorted
+    presenter.on_change(pd.DataFrame({"a": [5, 3, 4]}))
+    assert presenter.params.sort_by == []
+    assert presenter._current_page_rows_positions().tolist() == [0, 1, 2]
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from fiatlight.fiat_kits.fiat_dataframe.dataframe_sorting import DataFrameSorting
+
+
+def test_dataframe_sorting() -> None:
+    dataframe = pd.DataFrame(
+        {
+            "name": ["d", "b", None, "a", "b", "c"],
+            "age": [30.0, np.nan, 25.0, 40.0, 20.0, 25.0],
+        },
+        index=[10, 11, 12, 13, 14, 15],
+    )
+    sorting = DataFrameSorting(dataframe)
+    assert sorting.permutation([]) is None
+    assert sorting.rows([], 1, 3).equals(dataframe.iloc[1:3])
+
+    for sort_keys in (
+        [("name", True)],
+        [("name", False)],
+        [("age", False)],
+        [("name", True), ("age", False)],
+        [("age", True), ("name", False)],
+    ):
+        expected = dataframe.sort_values(
+            by=[col for col, _ in sort_keys], ascending=[asc for _, asc in sort_keys], kind="stable"
+        )
+        assert sorting.sorted_dataframe(sort_keys).equals(expected)
+        assert sorting.rows(sort_keys, 2, 4).equals(expected.iloc[2:4])
+
+    # The permutations are cached per sort keys
+    assert sorting.permutation([("name", True)]) is sorting.permutation([("name", True)])
+
+
+def test_dataframe_sorting_mixed_types() -> None:
+    dataframe = pd.DataFrame({"mixed": [3, "a", 1.5, None]})
+    sorting = DataFrameSorting(dataframe)
+    permutation = sorting.permutation([("mixed", True)])
+    assert permutation is not None
+    assert sorted(permutation.tolist()) == [0, 1, 2, 3]
+    assert permutation[-1] == 3  # missing values are last
+
+
+def test_presenter_stats_and_clipboard() -> None:
+    from fiatlight.fiat_kits.fiat_dataframe.dataframe_presenter import DataFramePresenter
+
+    dataframe = pd.DataFrame({"name": ["b", "a", "c"], "age": [2, 1, 3]})
+    presenter = DataFramePresenter()
+    presenter.on_change(dataframe)
+    assert "3 rows, 2 cols" in presenter.present_str(dataframe)
+    # The stats are computed once per value
+    assert presenter.stats(dataframe) is presenter.stats(dataframe)
+
+    presenter.params.sort_by = [("age", False)]
+    assert presenter.clipboard_copy_str(dataframe).splitlines()[1:] == ["c\t3", "b\t2", "a\t1"]
+    # The DataFrame itself is not reordered
+    assert dataframe["age"].tolist() == [2, 1, 3]
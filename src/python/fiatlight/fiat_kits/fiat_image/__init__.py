@@ -14,16 +14,19 @@ from .image_types import (
 )
 from .image_gui import ImageWithGui, ImagePresenterParams, image_source
 from .overlay_alpha_image import overlay_alpha_image
-from .image_to_from_file_gui import image_from_file, ImageToFileGui
+from .image_to_from_file_gui import image_from_file, ImageToFileGui, ImageEncodingParams
 from .contours_types import Contours, ContoursHierarchy
 from .contours_gui import _register as _register_contours
 from .points2d_types import Points2D
 from .points2d_gui import _register as _register_points2d
+from .frame_stream import FrameStreamPipeline, VideoCaptureReader, video_capture_reader, stages_from_functions_graph
+from .tiled_image import TiledImage, process_tile_by_tile, tiled_image_function
+from .tiled_image_gui import TiledImageWithGui, _register as _register_tiled_image
 
 # Most of the features of fiatlight.fiat_image require OpenCV
 try:
     HAS_OPENCV = True
-    from .cv_color_type import ColorType, ColorConversion
+    from .cv_color_type import ColorType, ColorConversion, convert_color_chain
     from .lut_functions import (
         lut_with_params,
         lut_channels_with_params,
@@ -32,7 +35,11 @@ try:
     from .lut_types import LutParams, LutTable
     from .lut_gui import LutParamsWithGui
     from .camera_image_provider import CameraImageProvider, CameraImageProviderGui
-    from .imread_rgb import imread_rgb
+    from .imread_rgb import imread_rgb, prefetch_images, prefetch_next_images_in_folder
+    from .preview_mode import ImagePreviewMode
+    from .tiled_parallel import tiled_parallel, process_in_parallel_strips
+    from .roi_mode import ImageRoiMode
+    from .image_stats import image_stats, ImageStats, ChannelStats
 except ImportError:
     HAS_OPENCV = False
     pass
@@ -45,6 +52,7 @@ def _register_factories() -> None:
     _register_image_type_factories()
     _register_contours()
     _register_points2d()
+    _register_tiled_image()
     if HAS_OPENCV:
         register_type(LutParams, LutParamsWithGui)
 
@@ -79,6 +87,7 @@ __all__ = [
     # from cv_color_type
     "ColorConversion",
     "ColorType",
+    "convert_color_chain",
     # from cv_color_type_gui
     # "ColorConversionWithGui",
     # from lut
@@ -94,14 +103,39 @@ __all__ = [
     # from image_to_from_file_gui
     "image_from_file",
     "ImageToFileGui",
+    "ImageEncodingParams",
     # from camera_image_provider
     "CameraImageProvider",
     "CameraImageProviderGui",
     # from imread_rgb
     "imread_rgb",
+    "prefetch_images",
+    "prefetch_next_images_in_folder",
+    # from preview_mode
+    "ImagePreviewMode",
+    # from tiled_parallel
+    "tiled_parallel",
+    "process_in_parallel_strips",
+    # from roi_mode
+    "ImageRoiMode",
+    # from image_stats
+    "image_stats",
+    "ImageStats",
+    "ChannelStats",
     # from contours_types
     "Contours",
     "ContoursHierarchy",
     # from points2d_types
     "Points2D",
+    # from frame_stream
+    "FrameStreamPipeline",
+    "VideoCaptureReader",
+    "video_capture_reader",
+    "stages_from_functions_graph",
+    # from tiled_image
+    "TiledImage",
+    "process_tile_by_tile",
+    "tiled_image_function",
+    # from tiled_image_gui
+    "TiledImageWithGui",
 ]
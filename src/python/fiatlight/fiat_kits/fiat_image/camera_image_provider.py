@@ -1,19 +1,32 @@
+"""CameraImageProvider: provides images from a camera
+
+The frames are grabbed by a capture thread (CameraCaptureThread), into a fixed-size ring of preallocated frames:
+get_image() returns the newest frame without waiting for the camera, so that the GUI and the processing graph
+are not limited by the camera cadence (and vice versa). The frames never leave the ring: each new frame is copied
+once when it is delivered, so that the consumers may keep references to the delivered frames for as long as they
+want (e.g. in caches).
+"""
+
 import copy
 import logging
+import threading
+import time
 import cv2
+import numpy as np
 import os  # noqa
 from pydantic import BaseModel
 
 from fiatlight.fiat_togui.gui_registry import base_model_with_gui_registration
 from fiatlight.fiat_types import JsonDict
 from fiatlight.fiat_kits.fiat_image import ImageRgb
+from fiatlight.fiat_kits.fiat_image.frame_stream import StageStats
 from fiatlight.fiat_core.function_with_gui import FunctionWithGui
 from fiatlight.fiat_core.any_data_with_gui import AnyDataWithGui
 from fiatlight.fiat_utils import add_fiat_attributes
 from fiatlight.fiat_widgets import fontawesome_6_ctx, icons_fontawesome_6
 from enum import Enum
 from imgui_bundle import imgui, imgui_ctx, hello_imgui
-from typing import Optional
+from typing import Any, List, Optional
 
 # hack, used when building documentation: we replace the camera image with a static image or video
 _HACK_IMAGE: ImageRgb | None = None
@@ -75,12 +88,179 @@ class CameraParams(BaseModel):
     camera_resolution: CameraResolution = CameraResolution.VGA_640_480
 
 
+class _FrameRingBuffer:
+    """A fixed-size ring of preallocated RGB frames, written by the capture thread.
+
+    The frames never leave the ring: copy_newest() returns a copy of the newest frame. While it is being copied,
+    its slot is leased, so that the capture thread never writes into the newest frame, nor into a frame being copied.
+    When all the slots are in use (newest or leased), the captured frame is dropped.
+    """
+
+    _slots: List[np.ndarray]
+    _nb_slots: int
+    _nb_leases: List[int]  # number of copies in progress, per slot
+    _newest_idx: int = -1
+    _newest_capture_time: float = 0.0
+    _newest_sequence: int = 0  # number of frames published so far
+    _lock: threading.Lock
+
+    def __init__(self, nb_slots: int) -> None:
+        assert nb_slots >= 3
+        self._nb_slots = nb_slots
+        self._slots = []
+        self._nb_leases = [0] * nb_slots
+        self._lock = threading.Lock()
+
+    def acquire_free_slot(self, shape: tuple[int, ...]) -> np.ndarray | None:
+        """A slot to write the next frame into (not the newest frame, and not being copied), or None"""
+        with self._lock:
+            if len(self._slots) == 0 or self._slots[0].shape != shape:
+                # First frame, or the resolution changed: (re)allocate the slots
+                # (a copy in progress keeps its own reference to the previous slot)
+                self._slots = [np.empty(shape, dtype=np.uint8) for _ in range(self._nb_slots)]
+                self._nb_leases = [0] * self._nb_slots
+                self._newest_idx = -1
+            for i in range(1, self._nb_slots + 1):
+                idx = (self._newest_idx + i) % self._nb_slots
+                if idx != self._newest_idx and self._nb_leases[idx] == 0:
+                    return self._slots[idx]
+            return None
+
+    def publish(self, slot: np.ndarray, capture_time: float) -> None:
+        with self._lock:
+            self._newest_idx = next(i for i, s in enumerate(self._slots) if s is slot)
+            self._newest_capture_time = capture_time
+            self._newest_sequence += 1
+
+    def newest_sequence(self) -> int:
+        """The sequence number of the newest frame (0 if no frame was published yet)"""
+        with self._lock:
+            return self._newest_sequence
+
+    def copy_newest(self) -> tuple[np.ndarray | None, float, int]:
+        """(a copy of the newest frame, its capture time, its sequence number)"""
+        with self._lock:
+            if self._newest_idx < 0:
+                return None, 0.0, 0
+            idx, slots = self._newest_idx, self._slots
+            capture_time, sequence = self._newest_capture_time, self._newest_sequence
+            self._nb_leases[idx] += 1
+        try:
+            frame = slots[idx].copy()
+        finally:
+            with self._lock:
+                if slots is self._slots:
+                    self._nb_leases[idx] -= 1
+        return frame, capture_time, sequence
+
+
+class CameraCaptureThread:
+    """Grabs frames from a cv2.VideoCapture (or any object with grab() and retrieve()) in a background thread,
+    converts them to RGB into a _FrameRingBuffer, and publishes statistics:
+        - capture_stats: capture FPS, and capture duration (grab + retrieve + conversion)
+        - delivery_stats: FPS and latency (delay between the capture and newest_frame()) of the delivered frames
+        - nb_dropped: number of captured frames that were never delivered
+    """
+
+    capture_stats: StageStats
+    delivery_stats: StageStats
+    nb_dropped: int = 0
+    # If not None, the capture will not be faster than this (e.g. for video files)
+    max_fps: float | None
+
+    _cv_cap: Any
+    _ring_buffer: _FrameRingBuffer
+    _bgr_buffer: np.ndarray | None = None
+    _thread: threading.Thread | None = None
+    _shall_stop: threading.Event
+    _delivered_sequence: int = 0
+    _delivered_frame: ImageRgb | None = None
+
+    def __init__(self, cv_cap: Any, nb_slots: int = 4, max_fps: float | None = None) -> None:
+        self._cv_cap = cv_cap
+        self._ring_buffer = _FrameRingBuffer(nb_slots)
+        self.max_fps = max_fps
+        self._shall_stop = threading.Event()
+        self.capture_stats = StageStats("capture")
+        self.delivery_stats = StageStats("delivery")
+
+    def start(self) -> None:
+        if self.is_running():
+            return
+        self._shall_stop.clear()
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._shall_stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def newest_frame(self) -> ImageRgb | None:
+        """The newest frame, or None if no frame was captured yet.
+        Each new frame is copied once out of the ring buffer: the same array is returned until a new frame
+        is captured, and the caller may keep it for as long as it wants."""
+        if self._ring_buffer.newest_sequence() == self._delivered_sequence:
+            return self._delivered_frame
+        frame, capture_time, sequence = self._ring_buffer.copy_newest()
+        if frame is not None:
+            now = time.perf_counter()
+            self.delivery_stats.on_frame_done(now, now, capture_time)
+            self._delivered_sequence = sequence
+            self._delivered_frame = frame  # type: ignore
+        return self._delivered_frame
+
+    def stats_report(self) -> str:
+        return (
+            f"Capture: {self.capture_stats.fps():.1f} FPS, {self.capture_stats.processing_time * 1000:.1f} ms\n"
+            f"Delivered: {self.delivery_stats.fps():.1f} FPS, latency {self.delivery_stats.latency * 1000:.1f} ms\n"
+            f"Dropped: {self.nb_dropped}"
+        )
+
+    def _capture_loop(self) -> None:
+        while not self._shall_stop.is_set():
+            start_time = time.perf_counter()
+            if not self._cv_cap.grab():
+                # No frame available (camera disconnected, or end of video)
+                self._shall_stop.wait(0.01)
+                continue
+            capture_time = time.perf_counter()
+            if self._capture_frame(capture_time):
+                self.capture_stats.on_frame_done(start_time, time.perf_counter(), capture_time)
+            if self.max_fps is not None:
+                remaining = 1.0 / self.max_fps - (time.perf_counter() - start_time)
+                if remaining > 0.0:
+                    self._shall_stop.wait(remaining)
+
+    def _capture_frame(self, capture_time: float) -> bool:
+        """Retrieve the grabbed frame, and publish it to the ring buffer (returns False if it was dropped)"""
+        ok, frame_bgr = self._cv_cap.retrieve(self._bgr_buffer)
+        if not ok or frame_bgr is None or frame_bgr.shape[0] == 0 or frame_bgr.shape[1] == 0:
+            return False
+        # retrieve() writes into _bgr_buffer when its shape is correct (and reallocates it otherwise)
+        self._bgr_buffer = frame_bgr
+        slot = self._ring_buffer.acquire_free_slot(frame_bgr.shape)
+        if slot is None:
+            self.nb_dropped += 1
+            return False
+        cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB, dst=slot)
+        if self._ring_buffer.newest_sequence() > self._delivered_sequence:
+            self.nb_dropped += 1  # the previous frame was replaced before being delivered
+        self._ring_buffer.publish(slot, capture_time)
+        return True
+
+
 class CameraImageProvider:
-    """A class to provide images from a camera"""
+    """A class to provide images from a camera (see CameraCaptureThread)"""
 
     camera_params: CameraParams
     previous_camera_params: Optional[CameraParams] = None
     cv_cap: cv2.VideoCapture | None = None
+    capture_thread: CameraCaptureThread | None = None
 
     def __init__(self, params: Optional[CameraParams] = None):
         if params is None:
@@ -90,15 +270,9 @@ class CameraImageProvider:
     def get_image(self) -> ImageRgb | None:
         if _HACK_IMAGE is not None:
             return _HACK_IMAGE
-        if self.cv_cap is None:
-            return None
-        ret, frame = self.cv_cap.read()
-        if frame is None:
+        if self.capture_thread is None:
             return None
-        if frame.shape[0] == 0 or frame.shape[1] == 0:
-            return None
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        return frame_rgb  # type: ignore
+        return self.capture_thread.newest_frame()
 
     def apply_params(self, params: CameraParams) -> None:
         if self.previous_camera_params is not None and params == self.previous_camera_params:
@@ -114,8 +288,10 @@ class CameraImageProvider:
     def start(self) -> None:
         logging.info(f"CameraImageProvider start: {self.camera_params}")
         self.cv_cap = cv2.VideoCapture()
+        max_fps = None
         if _HACK_MOVIE is not None and os.path.exists(_HACK_MOVIE):
             self.cv_cap.open(_HACK_MOVIE)
+            max_fps = self.cv_cap.get(cv2.CAP_PROP_FPS) or None  # play the movie at its normal speed
         else:
             _raise_if_incorrect_windows_opencv_capture_env_config()
             self.cv_cap.open(self.camera_params.device_number)
@@ -126,17 +302,27 @@ class CameraImageProvider:
             logging.warning("This camera does not support setting frame width and height")
 
         self.previous_camera_params = copy.deepcopy(self.camera_params)
+        self.capture_thread = CameraCaptureThread(self.cv_cap, max_fps=max_fps)
+        self.capture_thread.start()
 
     def stop(self) -> None:
         logging.info("CameraImageProvider stop")
         if self.cv_cap is None:
             return
+        if self.capture_thread is not None:
+            self.capture_thread.stop()
+            self.capture_thread = None
         self.cv_cap.release()
         self.cv_cap = None
 
     def started(self) -> bool:
         return self.cv_cap is not None
 
+    def stats_report(self) -> str:
+        if self.capture_thread is None:
+            return ""
+        return self.capture_thread.stats_report()
+
 
 class CameraImageProviderGui(FunctionWithGui):
     """A Gui for the camera image provider"""
@@ -195,5 +381,7 @@ class CameraImageProviderGui(FunctionWithGui):
                     self._camera_provider.apply_params(self._camera_params_gui.value)
                 imgui.text("Start/Stop Camera")
                 self._show_cam_button()
+                if self._camera_provider.started():
+                    imgui.text(self._camera_provider.stats_report())
 
         return False
@@ -1,33 +1,46 @@
 """GUI registrations for the `Contours` and `ContoursHierarchy` types.
 
-Text-only summaries; visualization on top of an image is the job of a
-`drawContours` node. We use `register_callbacks` so the per-type
+Summaries, plus a thumbnail of the contours (simplified at the thumbnail
+resolution, see geometry_lod.py); visualization on top of an image is the
+job of a `drawContours` node. We use `register_callbacks` so the per-type
 boilerplate stays minimal — see _plans/anydatawithgui_ergonomics__spec.md.
 """
 
-from imgui_bundle import imgui
+from imgui_bundle import imgui, ImVec2
 
 from fiatlight.fiat_togui.simple_gui import register_callbacks
 
 from .contours_types import Contours, ContoursHierarchy
+from .geometry_lod import cached_for_value, forget_value, gui_thumbnail, render_contours
+
+
+# Display size of the thumbnails (shared by the contours presenters, resizable by the user)
+_THUMBNAIL_SIZE = ImVec2(200, 0)
+
+
+def _total_points(contours: Contours) -> int:
+    return cached_for_value(contours, "total_points", lambda: sum(int(c.shape[0]) for c in contours))
 
 
 def _present_contours(contours: Contours) -> None:
     n = len(contours)
-    total_points = sum(int(c.shape[0]) for c in contours)
-    imgui.text(f"{n} contour(s), {total_points} total point(s)")
+    imgui.text(f"{n} contour(s), {_total_points(contours)} total point(s)")
     if n == 0:
         return
+    gui_thumbnail("##contours", contours, render_contours, _THUMBNAIL_SIZE)
     if imgui.tree_node("Per-contour point counts"):
-        for i, c in enumerate(contours):
-            imgui.text(f"#{i}: {int(c.shape[0])} points")
+        # Only the visible lines are drawn
+        clipper = imgui.ListClipper()
+        clipper.begin(n)
+        while clipper.step():
+            for i in range(clipper.display_start, clipper.display_end):
+                imgui.text(f"#{i}: {int(contours[i].shape[0])} points")
         imgui.tree_pop()
 
 
 def _present_str_contours(contours: Contours) -> str:
     n = len(contours)
-    total_points = sum(int(c.shape[0]) for c in contours)
-    return f"Contours[n={n}, points={total_points}]"
+    return f"Contours[n={n}, points={_total_points(contours)}]"
 
 
 def _present_hierarchy(hierarchy: ContoursHierarchy) -> None:
@@ -52,6 +65,7 @@ def _register() -> None:
         present=_present_contours,
         present_str=_present_str_contours,
         default=lambda: Contours([]),
+        on_change=forget_value,
     )
     register_callbacks(
         ContoursHierarchy,
@@ -1,4 +1,11 @@
-from typing import List, Optional, Dict
+"""Color types (ColorType) and color conversions (ColorConversion) for images, using OpenCV
+
+The cv2 conversion codes between all the color types are computed once, at import (see _CONVERSION_CODES).
+convert_color_chain() converts an image along a chain of color types, with the minimal number of conversions
+(e.g. RGB -> BGR -> Gray is done in one conversion RGB -> Gray).
+"""
+
+from typing import List, Optional, Dict, Sequence, Tuple
 import enum
 import cv2
 from typing import TypeAlias, Any
@@ -74,12 +81,7 @@ class ColorType(enum.Enum):
             return []
 
     def available_conversion_outputs(self) -> List["ColorType"]:
-        r = []
-        for color_type2 in ColorType:
-            if color_type2 != self:
-                if _optional_cv_color_conversion_code_between(self, color_type2) is not None:
-                    r.append(color_type2)
-        return r
+        return list(_CONVERSION_OUTPUTS[self])
 
     def conversion_code(self, dst_color: "ColorType") -> Optional[CvColorConversionCode]:
         return _optional_cv_color_conversion_code_between(self, dst_color)
@@ -115,10 +117,69 @@ def color_convert(image: ImageU8, color_conversion: ColorConversion) -> ImageU8:
     return color_conversion.convert_image(image)
 
 
+def convert_color_chain(image: ImageU8, color_types: Sequence[ColorType], exact: bool = True) -> ImageU8:
+    """Convert an image along a chain of color types (color_types[0] is the color type of the image),
+    with the minimal number of cv2.cvtColor calls (see simplify_color_chain).
+    Raises a ValueError if a conversion of the chain is not available.
+    """
+    for src, dst in zip(color_types, color_types[1:]):
+        if (src, dst) not in _CONVERSION_CODES:
+            raise ValueError(f"Conversion from {src} to {dst} is not available")
+    chain = simplify_color_chain(color_types, exact)
+    for src, dst in zip(chain, chain[1:]):
+        image = cv2.cvtColor(image, _CONVERSION_CODES[(src, dst)])  # type: ignore
+    return image
+
+
+def simplify_color_chain(color_types: Sequence[ColorType], exact: bool = True) -> List[ColorType]:
+    """The shortest chain of color types that gives the same result as converting along color_types.
+
+    For example, [RGB, BGR, Gray] => [RGB, Gray] and [BGR, RGB, BGR] => [BGR].
+    If exact is False, round trips through HSV, HLS, Lab, Luv or XYZ are also removed
+    (e.g. [BGR, HSV, BGR] => [BGR]): the result may then differ by rounding errors.
+    """
+    r: List[ColorType] = []
+    for color_type in color_types:
+        while len(r) >= 2 and _can_skip_intermediate_color(r[-2], r[-1], color_type, exact):
+            r.pop()
+        if len(r) == 0 or r[-1] != color_type:
+            r.append(color_type)
+    return r
+
+
+# Conversions that keep all the information of the image, and whose result can be computed directly
+# from their source (reordering of channels, addition of an alpha channel): X => Y => Z gives the same result as X => Z
+_LOSSLESS_CONVERSIONS = {
+    (ColorType.BGR, ColorType.RGB),
+    (ColorType.RGB, ColorType.BGR),
+    (ColorType.BGRA, ColorType.RGBA),
+    (ColorType.RGBA, ColorType.BGRA),
+    (ColorType.BGR, ColorType.BGRA),
+    (ColorType.BGR, ColorType.RGBA),
+    (ColorType.RGB, ColorType.RGBA),
+    (ColorType.RGB, ColorType.BGRA),
+}
+# Color spaces that can be converted back to BGR or RGB (with rounding errors)
+_APPROXIMATELY_INVERTIBLE_COLOR_TYPES = {ColorType.HSV, ColorType.HLS, ColorType.Lab, ColorType.Luv, ColorType.XYZ}
+
+
+def _can_skip_intermediate_color(x: ColorType, y: ColorType, z: ColorType, exact: bool) -> bool:
+    """Can X => Y => Z be replaced by X => Z?"""
+    if (x, z) not in _CONVERSION_CODES:
+        return False
+    if (x, y) in _LOSSLESS_CONVERSIONS:
+        return True
+    if not exact and y in _APPROXIMATELY_INVERTIBLE_COLOR_TYPES:
+        return x in (ColorType.BGR, ColorType.RGB) and z in (ColorType.BGR, ColorType.RGB)
+    return False
+
+
 def _optional_cv_color_conversion_code_between(type1: ColorType, type2: ColorType) -> CvColorConversionCode | None:
+    return _CONVERSION_CODES.get((type1, type2))
+
+
+def _conversion_codes_from(type1: ColorType) -> Dict[ColorType, CvColorConversionCode]:
     conversions: Dict[ColorType, CvColorConversionCode]
-    if type1 == type2:
-        return NO_COLOR_CONVERSION_CODE
     if type1 == ColorType.BGR:
         conversions = {
             ColorType.BGRA: cv2.COLOR_BGR2BGRA,
@@ -200,11 +261,25 @@ def _optional_cv_color_conversion_code_between(type1: ColorType, type2: ColorTyp
         }
     else:
         conversions = {}
+    return conversions
+
+
+def _make_conversion_codes() -> Dict[Tuple[ColorType, ColorType], CvColorConversionCode]:
+    r: Dict[Tuple[ColorType, ColorType], CvColorConversionCode] = {}
+    for type1 in ColorType:
+        r[(type1, type1)] = NO_COLOR_CONVERSION_CODE
+        for type2, code in _conversion_codes_from(type1).items():
+            r[(type1, type2)] = code
+    return r
 
-    if type2 in conversions:
-        return conversions[type2]
 
-    return None
+# (src, dst) -> cv2 conversion code, for all the available conversions
+_CONVERSION_CODES = _make_conversion_codes()
+# color type -> the other color types it can be converted to
+_CONVERSION_OUTPUTS: Dict[ColorType, List[ColorType]] = {
+    type1: [type2 for type2 in ColorType if type2 != type1 and (type1, type2) in _CONVERSION_CODES]
+    for type1 in ColorType
+}
 
 
 def sandbox() -> None:
@@ -0,0 +1,367 @@
+"""Frame-stream processing for image pipelines (video files and cameras)
+
+In the standard mode, a camera node provides one frame per heartbeat, and the graph processes it fully
+before the next frame is grabbed: the frame rate is limited by the sum of the durations of all the stages.
+
+In streaming mode, a source thread reads frames into a bounded queue, and each stage of the pipeline
+runs in its own worker thread, reading from its input queue and writing to the input queue of the next stage.
+Successive frames are thus processed in a pipelined fashion, and the throughput approaches the speed
+of the slowest stage (OpenCV releases the GIL during most of its computations).
+
+When a stage is slower than its producer, its input queue is full: the oldest frame is dropped
+(drop-oldest backpressure), so that the pipeline always works on recent frames.
+
+Usage:
+    pipeline = FrameStreamPipeline(
+        read_frame=video_capture_reader("my_video.mp4"),
+        stages=[("blur", my_blur_function), ("canny", my_canny_function)],
+    )
+    pipeline.start()
+    ...
+    frame = pipeline.latest_frame()   # newest output of the last stage
+    print(pipeline.stats_report())    # per-stage FPS / latency
+    pipeline.stop()                   # also closes the source (e.g. releases the camera)
+
+The stages can also be extracted from a linear chain of functions inside a FunctionsGraph,
+see stages_from_functions_graph().
+"""
+
+from fiatlight.fiat_kits.fiat_image.image_types import Image
+from fiatlight.fiat_core.functions_graph import FunctionsGraph
+from fiatlight.fiat_core.function_node import FunctionNode
+from fiatlight.fiat_core.param_with_gui import ParamKind
+from fiatlight.fiat_types.error_types import Error, Unspecified, Invalid
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, List, Optional, Tuple
+from collections import deque
+import logging
+import threading
+import time
+
+
+FrameReader = Callable[[], Optional[Image]]
+FrameProcessor = Callable[[Image], Image]
+
+
+@dataclass
+class _StampedFrame:
+    """A frame, together with the time when it was read by the source"""
+
+    frame: Image
+    source_time: float
+
+
+class DropOldestQueue:
+    """A bounded, thread-safe FIFO queue. When full, put() drops the oldest item."""
+
+    _items: Deque[_StampedFrame]
+    _condition: threading.Condition
+    nb_dropped: int = 0
+    _closed: bool = False
+
+    def __init__(self, max_size: int) -> None:
+        assert max_size >= 1
+        self._items = deque(maxlen=max_size)
+        self._condition = threading.Condition()
+        self.nb_dropped = 0
+        self._closed = False
+
+    def put(self, item: _StampedFrame) -> None:
+        with self._condition:
+            if len(self._items) == self._items.maxlen:
+                self.nb_dropped += 1  # deque(maxlen) drops the oldest item
+            self._items.append(item)
+            self._condition.notify()
+
+    def get(self, timeout: float) -> _StampedFrame | None:
+        """Return the oldest item, or None if no item arrived before the timeout or if the queue is closed"""
+        with self._condition:
+            if len(self._items) == 0 and not self._closed:
+                self._condition.wait(timeout)
+            if len(self._items) == 0:
+                return None
+            return self._items.popleft()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class StageStats:
+    """Statistics of a pipeline stage (the source is also considered as a stage)"""
+
+    name: str
+    nb_frames: int = 0
+    # Sliding window of the last frames end times, to compute the FPS
+    _end_times: Deque[float]
+    # Exponential moving averages (in seconds)
+    processing_time: float = 0.0
+    latency: float = 0.0  # delay between the frame acquisition and the end of this stage
+
+    _EMA_ALPHA = 0.1
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._end_times = deque(maxlen=30)
+        self._lock = threading.Lock()
+
+    def on_frame_done(self, start_time: float, end_time: float, source_time: float) -> None:
+        with self._lock:
+            alpha = self._EMA_ALPHA if self.nb_frames > 0 else 1.0
+            self.processing_time += alpha * ((end_time - start_time) - self.processing_time)
+            self.latency += alpha * ((end_time - source_time) - self.latency)
+            self.nb_frames += 1
+            self._end_times.append(end_time)
+
+    def fps(self) -> float:
+        with self._lock:
+            if len(self._end_times) < 2:
+                return 0.0
+            duration = self._end_times[-1] - self._end_times[0]
+            if duration <= 0.0:
+                return 0.0
+            return (len(self._end_times) - 1) / duration
+
+
+class VideoCaptureReader:
+    """A FrameReader that reads a video file, or a camera device (uses cv2.VideoCapture).
+    It returns None when the video is finished. close() releases the device
+    (FrameStreamPipeline.stop() calls it).
+    """
+
+    convert_bgr_to_rgb: bool
+    _cv_cap: Any  # cv2.VideoCapture | None (None once closed)
+    _lock: threading.Lock
+
+    def __init__(self, video_file_or_device: str | int, convert_bgr_to_rgb: bool = True) -> None:
+        import cv2
+
+        self.convert_bgr_to_rgb = convert_bgr_to_rgb
+        self._lock = threading.Lock()
+        self._cv_cap = cv2.VideoCapture(video_file_or_device)
+        if not self._cv_cap.isOpened():
+            raise ValueError(f"Cannot open video source {video_file_or_device}")
+
+    def __call__(self) -> Optional[Image]:
+        import cv2
+
+        with self._lock:
+            if self._cv_cap is None:
+                return None
+            ret, frame = self._cv_cap.read()
+        if not ret or frame is None:
+            self.close()
+            return None
+        if self.convert_bgr_to_rgb and len(frame.shape) == 3 and frame.shape[2] == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return frame  # type: ignore
+
+    def close(self) -> None:
+        with self._lock:
+            if self._cv_cap is not None:
+                self._cv_cap.release()
+                self._cv_cap = None
+
+    def is_closed(self) -> bool:
+        return self._cv_cap is None
+
+
+def video_capture_reader(video_file_or_device: str | int, convert_bgr_to_rgb: bool = True) -> VideoCaptureReader:
+    """Create a FrameReader from a video file, or from a camera device number (uses cv2.VideoCapture).
+    The reader returns None when the video is finished, and is closed by FrameStreamPipeline.stop().
+    """
+    return VideoCaptureReader(video_file_or_device, convert_bgr_to_rgb)
+
+
+class FrameStreamPipeline:
+    """A pipeline of image stages, each running in its own worker thread,
+    fed by a source thread that reads frames into a bounded queue."""
+
+    source_stats: StageStats
+    stages_stats: List[StageStats]
+
+    _read_frame: FrameReader
+    _stages: List[Tuple[str, FrameProcessor]]
+    _queues: List[DropOldestQueue]  # _queues[i] is the input queue of stage i
+    _threads: List[threading.Thread]
+    _shall_stop: threading.Event
+    _source_finished: bool = False
+
+    _latest: _StampedFrame | None = None
+    _latest_lock: threading.Lock
+
+    # If not None, the source thread will not read frames faster than this
+    max_source_fps: float | None
+
+    def __init__(
+        self,
+        read_frame: FrameReader,
+        stages: List[Tuple[str, FrameProcessor]],
+        queue_size: int = 2,
+        max_source_fps: float | None = None,
+    ) -> None:
+        self._read_frame = read_frame
+        self._stages = list(stages)
+        self.max_source_fps = max_source_fps
+        self._queues = [DropOldestQueue(queue_size) for _ in self._stages]
+        self._threads = []
+        self._shall_stop = threading.Event()
+        self._latest_lock = threading.Lock()
+        self.source_stats = StageStats("source")
+        self.stages_stats = [StageStats(name) for name, _ in self._stages]
+
+    def start(self) -> None:
+        if self.is_running():
+            return
+        self._shall_stop.clear()
+        self._source_finished = False
+        self._queues = [DropOldestQueue(q._items.maxlen or 1) for q in self._queues]
+        self._threads = [threading.Thread(target=self._source_loop, daemon=True)]
+        for i in range(len(self._stages)):
+            self._threads.append(threading.Thread(target=self._stage_loop, args=(i,), daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Stop the threads, and close the source (if the FrameReader has a close() method,
+        e.g. VideoCaptureReader: the camera device is released)"""
+        self._shall_stop.set()
+        for q in self._queues:
+            q.close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        close_source = getattr(self._read_frame, "close", None)
+        if close_source is not None:
+            close_source()
+
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def is_source_finished(self) -> bool:
+        return self._source_finished
+
+    def latest_frame(self) -> Image | None:
+        """The newest frame that went through all the stages (or None if no frame is available yet)"""
+        with self._latest_lock:
+            return self._latest.frame if self._latest is not None else None
+
+    def nb_dropped_frames(self) -> List[int]:
+        """The number of frames dropped at the input of each stage"""
+        return [q.nb_dropped for q in self._queues]
+
+    def stats_report(self) -> str:
+        lines = []
+        all_stats = [self.source_stats] + self.stages_stats
+        nb_dropped = [0] + self.nb_dropped_frames()
+        for stats, dropped in zip(all_stats, nb_dropped):
+            lines.append(
+                f"{stats.name}: {stats.fps():.1f} FPS, "
+                f"processing {stats.processing_time * 1000:.1f} ms, "
+                f"latency {stats.latency * 1000:.1f} ms, "
+                f"dropped {dropped}"
+            )
+        return "\n".join(lines)
+
+    def _publish(self, stage_idx: int, stamped_frame: _StampedFrame) -> None:
+        """Send a frame to the next stage, or publish it as the latest frame"""
+        next_idx = stage_idx + 1
+        if next_idx < len(self._queues):
+            self._queues[next_idx].put(stamped_frame)
+        else:
+            with self._latest_lock:
+                self._latest = stamped_frame
+
+    def _source_loop(self) -> None:
+        while not self._shall_stop.is_set():
+            start_time = time.perf_counter()
+            frame = self._read_frame()
+            if frame is None:
+                self._source_finished = True
+                break
+            end_time = time.perf_counter()
+            self.source_stats.on_frame_done(start_time, end_time, start_time)
+            self._publish(-1, _StampedFrame(frame=frame, source_time=start_time))
+            if self.max_source_fps is not None:
+                remaining = 1.0 / self.max_source_fps - (time.perf_counter() - start_time)
+                if remaining > 0.0:
+                    self._shall_stop.wait(remaining)
+
+    def _stage_loop(self, stage_idx: int) -> None:
+        name, processor = self._stages[stage_idx]
+        stats = self.stages_stats[stage_idx]
+        input_queue = self._queues[stage_idx]
+        while not self._shall_stop.is_set():
+            stamped_frame = input_queue.get(timeout=0.1)
+            if stamped_frame is None:
+                if self._source_finished and self._upstream_is_empty(stage_idx):
+                    break
+                continue
+            start_time = time.perf_counter()
+            try:
+                output = processor(stamped_frame.frame)
+            except Exception as e:
+                logging.warning(f"FrameStreamPipeline: stage {name} raised an exception: {e}")
+                continue
+            end_time = time.perf_counter()
+            stats.on_frame_done(start_time, end_time, stamped_frame.source_time)
+            self._publish(stage_idx, _StampedFrame(frame=output, source_time=stamped_frame.source_time))
+
+    def _upstream_is_empty(self, stage_idx: int) -> bool:
+        """True if there are no more frames waiting in this stage queue or before it"""
+        # The upstream threads are checked first: a thread may publish its last frame just before exiting
+        upstream_threads = self._threads[: stage_idx + 1]  # source + previous stages
+        if any(thread.is_alive() for thread in upstream_threads):
+            return False
+        return len(self._queues[stage_idx]) == 0
+
+
+def _function_node_processor(function_node: FunctionNode, frame_input_name: str) -> FrameProcessor:
+    """Create a FrameProcessor that calls the function of a node, with the frame as input `frame_input_name`.
+    The other inputs use the values currently set in the GUI (they are read at each frame).
+    """
+    fn_with_gui = function_node.function_with_gui
+    f_impl = fn_with_gui._f_impl
+    assert f_impl is not None
+
+    def process(frame: Image) -> Image:
+        args: List[Any] = []
+        kwargs = {}
+        for param in fn_with_gui._inputs_with_gui:
+            value = frame if param.name == frame_input_name else param.get_value_or_default()
+            if isinstance(value, (Error, Unspecified, Invalid)):
+                raise ValueError(f"{fn_with_gui.function_name}: input {param.name} has no valid value")
+            if param.param_kind == ParamKind.PositionalOnly:
+                args.append(value)
+            else:
+                kwargs[param.name] = value
+        r: Image = f_impl(*args, **kwargs)
+        return r
+
+    return process
+
+
+def stages_from_functions_graph(graph: FunctionsGraph, source_function_name: str) -> List[Tuple[str, FrameProcessor]]:
+    """Extract the stages of a linear chain of functions, that follows the output 0 of the source function.
+    The source function itself is not included (it is replaced by the FrameReader of the pipeline).
+    The chain stops at the first function whose output 0 is not linked to exactly one input.
+    """
+    r: List[Tuple[str, FrameProcessor]] = []
+    current_node = graph._function_node_with_name(source_function_name)
+    while True:
+        links = current_node.output_links_for_idx(0)
+        if len(links) != 1:
+            break
+        link = links[0]
+        next_node = link.dst_function_node
+        if next_node.function_with_gui.invoke_is_gui_only:
+            break
+        r.append((next_node.function_with_gui.function_name, _function_node_processor(next_node, link.dst_input_name)))
+        if next_node.function_with_gui.nb_outputs() == 0:
+            break
+        current_node = next_node
+    return r
@@ -0,0 +1,227 @@
+"""Level of detail (LOD) rendering of Contours and Points2D, for their presenters
+
+The output of findContours or goodFeaturesToTrack on a noisy high resolution image can contain hundreds of
+thousands of points: the presenters cannot afford to draw (or even to iterate on) them at each frame.
+Instead, they display a thumbnail, rendered once per value and per display width:
+    - the contours are simplified with the Douglas-Peucker algorithm (cv2.approxPolyDP), with a tolerance of
+      half a thumbnail pixel, and drawn with a single cv2.polylines call
+    - the points are binned into the thumbnail pixels (at most one point per pixel), and drawn with numpy
+The cost of a frame is then independent of the number of points (the thumbnail is a texture), and the cost of
+a new value is linear in the number of points, with vectorized code.
+
+The thumbnails and the statistics of the values are cached per identity of the value (see cached_for_value).
+A value that was modified in place is set again (see "Values are shared, not copied" in AnyDataWithGui):
+the presenters then call forget_value (on_change), so that its thumbnails are rendered again.
+"""
+
+from fiatlight.fiat_kits.fiat_image.image_types import ImageU8_3
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Sequence, Tuple, TypeVar
+import threading
+
+import numpy as np
+
+
+T = TypeVar("T")
+
+CONTOURS_COLOR = (80, 255, 80)
+POINTS_COLOR = (255, 80, 80)
+
+
+class _LodCache:
+    """An LRU cache of values computed from a (large) value, keyed by the identity of this value"""
+
+    max_entries: int
+    # (id(value), key) -> (value, result): the value is kept, so that its id is not reused
+    _entries: OrderedDict[Tuple[int, Hashable], Tuple[Any, Any]]
+    _lock: threading.Lock
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, value: Any, key: Hashable, compute: Callable[[], T]) -> T:
+        cache_key = (id(value), key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] is value:
+                self._entries.move_to_end(cache_key)
+                return entry[1]  # type: ignore
+        result = compute()
+        with self._lock:
+            self._entries[cache_key] = (value, result)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def forget(self, value: Any) -> None:
+        """Remove the entries computed from value"""
+        with self._lock:
+            for cache_key in [k for k, entry in self._entries.items() if entry[0] is value]:
+                del self._entries[cache_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_LOD_CACHE = _LodCache(max_entries=64)
+
+
+def cached_for_value(value: Any, key: Hashable, compute: Callable[[], T]) -> T:
+    """compute(), cached per identity of value and key"""
+    return _LOD_CACHE.get_or_compute(value, key, compute)
+
+
+def forget_value(value: Any) -> None:
+    """Forget what was cached for value (to be called when a value is set, since it may have been modified in place)"""
+    _LOD_CACHE.forget(value)
+    # A new thumbnail may reuse the id of a released one: refresh the displayed textures
+    _DISPLAYED_THUMBNAILS.clear()
+
+
+def simplify_contours(contours: Sequence[np.ndarray], epsilon: float) -> List[np.ndarray]:
+    """Douglas-Peucker simplification of the contours (cv2.approxPolyDP), with a tolerance of epsilon pixels.
+    The contours whose bounding box is smaller than epsilon are reduced to a single point."""
+    import cv2
+
+    if len(contours) == 0:
+        return []
+    bbox_min, bbox_max = _contours_bboxes(*_concatenate_contours(contours))
+    is_small = (bbox_max - bbox_min <= epsilon).all(axis=1)
+    return [c[:1] if is_small[i] else cv2.approxPolyDP(c, epsilon, closed=True) for i, c in enumerate(contours)]
+
+
+def _concatenate_contours(contours: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """(all the points, as an (N, 2) array, index of the first point of each contour)"""
+    lengths = np.fromiter((c.shape[0] for c in contours), dtype=np.int64, count=len(contours))
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    return np.concatenate([c.reshape(-1, 2) for c in contours]), starts
+
+
+def _contours_bboxes(all_points: np.ndarray, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(min, max) of the points of each (non-empty) contour, as (nb_contours, 2) arrays"""
+    return np.minimum.reduceat(all_points, starts, axis=0), np.maximum.reduceat(all_points, starts, axis=0)
+
+
+def bin_points(points: np.ndarray, scale: float) -> np.ndarray:
+    """The distinct bins (of size 1 / scale) that contain points: an (M, 2) int32 array, in scaled coordinates"""
+    if points.shape[0] == 0:
+        return np.empty((0, 2), dtype=np.int32)
+    binned = np.floor(points.reshape(-1, 2) * scale).astype(np.int64)
+    origin = binned.min(axis=0)
+    binned -= origin
+    width = int(binned[:, 0].max()) + 1
+    keys = np.unique(binned[:, 1] * width + binned[:, 0])
+    return (np.stack([keys % width, keys // width], axis=1) + origin).astype(np.int32)  # type: ignore
+
+
+def _thumbnail_size(extent: Tuple[int, int], width: int) -> Tuple[float, int]:
+    """(scale, height) of a thumbnail of the given width, for points within [0, extent)"""
+    scale = width / max(extent[0], 1)
+    height = max(min(round(extent[1] * scale), 4 * width), 1)
+    return scale, height
+
+
+def render_contours(contours: Sequence[np.ndarray], width: int) -> ImageU8_3:
+    """A thumbnail of the contours, of the given width (the contours coordinates start at (0, 0))"""
+    import cv2
+
+    contours = [c for c in contours if c.size > 0]
+    if len(contours) == 0:
+        return np.zeros((1, width, 3), dtype=np.uint8)  # type: ignore
+    all_points, starts = _concatenate_contours(contours)
+    bbox_min, bbox_max = _contours_bboxes(all_points, starts)
+    scale, height = _thumbnail_size(_points_extent(bbox_max), width)
+    thumbnail = np.zeros((height, width, 3), dtype=np.uint8)
+
+    # The contours smaller than a thumbnail pixel are drawn as points
+    epsilon = 0.5 / scale
+    is_small = (bbox_max - bbox_min <= epsilon).all(axis=1)
+    small_points = np.floor(all_points[starts[is_small]] * scale).astype(np.int64)
+    small_points = small_points[(small_points[:, 0] < width) & (small_points[:, 1] < height)]
+    thumbnail[small_points[:, 1], small_points[:, 0]] = CONTOURS_COLOR
+
+    # The others are simplified, and drawn with sub-pixel coordinates (4 fractional bits)
+    large_contours = [cv2.approxPolyDP(contours[i], epsilon, closed=True) for i in np.flatnonzero(~is_small)]
+    if len(large_contours) > 0:
+        shift = 4
+        large_points, large_starts = _concatenate_contours(large_contours)
+        large_points = np.round(large_points * (scale * (1 << shift))).astype(np.int32)
+        polylines = np.split(large_points.reshape(-1, 1, 2), large_starts[1:])
+        cv2.polylines(thumbnail, polylines, isClosed=True, color=CONTOURS_COLOR, thickness=1, shift=shift)
+    return thumbnail  # type: ignore
+
+
+def render_points(points: np.ndarray, width: int) -> ImageU8_3:
+    """A thumbnail of the points, of the given width (the points coordinates start at (0, 0))"""
+    import cv2
+
+    points = points.reshape(-1, 2)
+    if points.shape[0] == 0:
+        return np.zeros((1, width, 3), dtype=np.uint8)  # type: ignore
+    extent = _points_extent(points)
+    scale, height = _thumbnail_size(extent, width)
+    bins = bin_points(points, scale)
+    bins = bins[(bins[:, 0] >= 0) & (bins[:, 1] >= 0) & (bins[:, 0] < width) & (bins[:, 1] < height)]
+    mask = np.zeros((height, width), dtype=np.uint8)
+    mask[bins[:, 1], bins[:, 0]] = 255
+    dilated_mask = cv2.dilate(mask, np.ones((3, 3), dtype=np.uint8))
+    thumbnail = np.zeros((height, width, 3), dtype=np.uint8)
+    thumbnail[dilated_mask > 0] = POINTS_COLOR
+    return thumbnail  # type: ignore
+
+
+def _points_extent(points: np.ndarray) -> Tuple[int, int]:
+    """(width, height) of the area [0, max] that contains the points"""
+    max_xy = points.max(axis=0)
+    return int(max_xy[0]) + 1, int(max_xy[1]) + 1
+
+
+class _GuiSection:  # Dummy class to create a section in the IDE # noqa
+    """
+    # --------------------------------------------------------------------------------------------
+    #        Gui
+    # --------------------------------------------------------------------------------------------
+    """
+
+    pass
+
+
+# id(thumbnail) last displayed, per imgui id: the texture is refreshed only when the thumbnail changes
+_DISPLAYED_THUMBNAILS: dict[int, int] = {}
+
+
+def gui_thumbnail(label_id: str, value: Any, render_fn: Callable[[Any, int], ImageU8_3], size: Any) -> None:
+    """Display the thumbnail of a value (rendered by render_fn(value, width), and cached), resizable by the user.
+    size: an ImVec2, that stores the display size chosen by the user"""
+    from imgui_bundle import imgui, immvision
+
+    width = max(int(size.x), 16)
+    thumbnail = cached_for_value(value, ("thumbnail", render_fn, width), lambda: render_fn(value, width))
+    imgui_id = imgui.get_id(label_id)
+    refresh_image = _DISPLAYED_THUMBNAILS.get(imgui_id) != id(thumbnail)
+    _DISPLAYED_THUMBNAILS[imgui_id] = id(thumbnail)
+    immvision.image_display_resizable(label_id, thumbnail, size=size, refresh_image=refresh_image, resizable=True)
+
+
+def _benchmark_lod_rendering() -> None:
+    """Render the thumbnails of many contours and points, as found in a noisy high resolution image"""
+    import cv2
+    import timeit
+
+    noise = np.random.randint(0, 255, (4000, 6000), dtype=np.uint8)
+    binary = (cv2.GaussianBlur(noise, (0, 0), 3) > 128).astype(np.uint8)
+    contours, _ = cv2.findContours(binary, cv2.RETR_LIST, cv2.CHAIN_APPROX_NONE)
+    nb_contour_points = sum(c.shape[0] for c in contours)
+    points = np.random.randint(0, 6000, (500_000, 2)).astype(np.int32)
+    nb_runs = 3
+    duration = timeit.timeit(lambda: render_contours(contours, 400), number=nb_runs) / nb_runs
+    print(f"render_contours: {len(contours)} contours, {nb_contour_points} points: {duration * 1000:.1f} ms")
+    duration = timeit.timeit(lambda: render_points(points, 400), number=nb_runs) / nb_runs
+    print(f"render_points: {points.shape[0]} points: {duration * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    _benchmark_lod_rendering()
@@ -2,13 +2,16 @@ from fiatlight.fiat_utils.fiat_attributes_decorator import with_fiat_attributes
 from fiatlight.fiat_types import JsonDict, ImagePath, FiatAttributes, Unspecified, UnspecifiedValue
 from fiatlight.fiat_core import AnyDataWithGui, PossibleFiatAttributes
 from fiatlight.fiat_kits.fiat_image.image_types import Image, ImageU8
+from fiatlight.fiat_kits.fiat_image.image_pyramid import ImagePyramid, image_fingerprint, rescale_zoom_pan_matrix
+from fiatlight.fiat_kits.fiat_image.image_stats import ImageStats, image_stats
 from fiatlight.fiat_utils.cache_per_imgui_view import CachePerImGuiView
 from imgui_bundle import immvision, imgui, ImVec2
 from imgui_bundle import portable_file_dialogs as pfd, hello_imgui
 
-from typing import Optional, Sequence, TypeAlias, Any
+from typing import Optional, Sequence, Tuple, TypeAlias, Any
 import numpy as np
 import json
+import math
 
 
 ImagePresenterParams: TypeAlias = immvision.ImageParams
@@ -77,6 +80,12 @@ class _ImagePossibleAttributes(PossibleFiatAttributes):
         self.add_explained_section("Channels")
         attr("show_channels", bool, "Show channels", default_value=False)
         attr("channel_layout_vertically", bool, "Layout channels vertically", default_value=False)
+        attr(
+            "show_stats",
+            bool,
+            "Show the statistics (min, max, mean, stddev) and histogram of each channel",
+            default_value=False,
+        )
 
         # Zoom & Pan
         self.add_explained_section("Zoom & Pan")
@@ -122,15 +131,38 @@ _IMAGE_POSSIBLE_ATTRIBUTES = _ImagePossibleAttributes()
 
 
 class ImagePresenter:
+    """Displays an image with immvision.
+
+    Large images are not uploaded at full resolution: the presenter displays the smallest level
+    of an ImagePyramid that is at least as large as the displayed size (and whose pixels are not magnified
+    by the zoom). The Image Inspector always receives the full resolution image.
+    """
+
     # Cached image and channels
     image: Image
     image_channels: Sequence[Image]
+    # The channels of the last displayed pyramid level: (level image, its channels)
+    _displayed_channels: Tuple[Image, Sequence[Image]] | None = None
+    # The statistics of the image (computed when first displayed, see image_stats.py)
+    _stats: ImageStats | None = None
+    # Downscaled versions of the image (see image_pyramid.py)
+    pyramid: ImagePyramid | None = None
     # Cache
     need_refresh_cache_per_view: CachePerImGuiView[bool]
+    # Pyramid level displayed by immvision.image (image_params.zoom_pan_matrix uses the coordinates of this level)
+    _zoomable_level: int = 0
+    # Pyramid level displayed by immvision.image_display_resizable, per view (-1 if none yet)
+    _display_only_level_per_view: CachePerImGuiView[int]
+    # Region (x, y, width, height) of the full resolution image visible at the last frame (None: the whole image)
+    _visible_region: Tuple[int, int, int, int] | None = None
+    # Region (x, y, width, height) of the image that holds valid pixels (None: the whole image).
+    # Set by roi_mode.py, whose outputs are only computed on a region (the rest is zero filled)
+    _valid_region: Tuple[int, int, int, int] | None = None
     # User preferences below
     image_params: ImagePresenterParams
     show_channels: bool = False
     channel_layout_vertically: bool = False
+    show_stats: bool = False
     only_display: bool = False
     size_when_only_display: ImVec2
     show_inspect_button: bool = True
@@ -142,6 +174,7 @@ class ImagePresenter:
         self.image_params = default_image_params()
         self.size_when_only_display = ImVec2(200, 0)
         self.need_refresh_cache_per_view = CachePerImGuiView("ImagePresenter_need_refresh", True)
+        self._display_only_level_per_view = CachePerImGuiView("ImagePresenter_display_only_level", -1)
 
     def handle_fiat_attrs(self, fiat_attrs: dict[str, Any]) -> None:
         if "image_display_size" in fiat_attrs:
@@ -162,6 +195,8 @@ class ImagePresenter:
             self.show_channels = fiat_attrs["show_channels"]
         if "channel_layout_vertically" in fiat_attrs:
             self.channel_layout_vertically = fiat_attrs["channel_layout_vertically"]
+        if "show_stats" in fiat_attrs:
+            self.show_stats = fiat_attrs["show_stats"]
         if "only_display" in fiat_attrs:
             self.only_display = fiat_attrs["only_display"]
         if "zoom_key" in fiat_attrs:
@@ -194,10 +229,134 @@ class ImagePresenter:
             self.show_inspect_button = fiat_attrs["show_inspect_button"]
 
     def set_image(self, image: Image) -> None:
+        if self.pyramid is not None and self.pyramid.fingerprint == image_fingerprint(image):
+            return  # Same image: the pyramid and the textures are up to date
+        previous_pyramid = self.pyramid
         self.image = image
+        self.pyramid = ImagePyramid(image)
         self.need_refresh_cache_per_view.set_for_all_views(True)
         if len(image.shape) == 3 or len(image.shape) == 4:
-            self.image_channels = [image[:, :, i] for i in range(image.shape[2])]  # type: ignore
+            self.image_channels = self._channels(image)
+        self._displayed_channels = None
+        self._stats = None
+        # Keep the same view, in the coordinates of the level that will be displayed (i.e. level 0)
+        if previous_pyramid is not None and self._zoomable_level != 0:
+            self.image_params.zoom_pan_matrix = rescale_zoom_pan_matrix(
+                self.image_params.zoom_pan_matrix,
+                previous_pyramid.level_size(self._zoomable_level),
+                previous_pyramid.level_size(0),
+            )
+        self._zoomable_level = 0
+
+    @staticmethod
+    def _channels(image: Image) -> Sequence[Image]:
+        return [image[:, :, i] for i in range(image.shape[2])]  # type: ignore
+
+    def _channels_of_displayed_image(self, displayed_image: Image) -> Sequence[Image]:
+        """The channels of a pyramid level (cached, as long as the same level is displayed)"""
+        if self._displayed_channels is None or self._displayed_channels[0] is not displayed_image:
+            self._displayed_channels = (displayed_image, self._channels(displayed_image))
+        return self._displayed_channels[1]
+
+    def _display_only_image(self) -> Image:
+        """The pyramid level to display with immvision.image_display_resizable in the current view"""
+        assert self.pyramid is not None
+        size = self.size_when_only_display
+        level = self.pyramid.level_index_for_display_size(size.x, size.y)
+        if level != self._display_only_level_per_view.get_for_current_view():
+            self._display_only_level_per_view.set_for_current_view(level)
+            self.need_refresh_cache_per_view.set_for_current_view(True)
+        return self.pyramid.level(level)
+
+    def _zoomable_image(self) -> Image:
+        """The pyramid level to display with immvision.image"""
+        assert self.pyramid is not None
+        return self.pyramid.level(self._zoomable_level)
+
+    def _zoom_key_for_level(self) -> str:
+        # Images displayed at different levels do not share the same coordinates:
+        # their zoom is synchronized only with images displayed at the same level
+        zoom_key = self.image_params.zoom_key
+        if zoom_key == "" or self._zoomable_level == 0:
+            return zoom_key
+        return f"{zoom_key}@level{self._zoomable_level}"
+
+    def _call_immvision_image(self, label: str, image: Image) -> None:
+        zoom_key = self.image_params.zoom_key
+        # The pixel info of a downscaled level would be misleading
+        show_pixel_info = self.image_params.show_pixel_info
+        self.image_params.zoom_key = self._zoom_key_for_level()
+        if self._zoomable_level > 0:
+            self.image_params.show_pixel_info = False
+        try:
+            immvision.image(label, image, self.image_params)
+        finally:
+            self.image_params.zoom_key = zoom_key
+            self.image_params.show_pixel_info = show_pixel_info
+
+    def _update_zoomable_level(self) -> None:
+        """Select the level to display at the next frame, depending on the zoom and on the display size"""
+        assert self.pyramid is not None
+        zoom_scale = self.image_params.zoom_pan_matrix[0][0]
+        display_width, display_height = self.image_params.image_display_size
+        new_level = self.pyramid.level_index_for_zoom(self._zoomable_level, zoom_scale, display_width, display_height)
+        if new_level == self._zoomable_level:
+            return
+        self.image_params.zoom_pan_matrix = rescale_zoom_pan_matrix(
+            self.image_params.zoom_pan_matrix,
+            self.pyramid.level_size(self._zoomable_level),
+            self.pyramid.level_size(new_level),
+        )
+        self._zoomable_level = new_level
+        self.need_refresh_cache_per_view.set_for_all_views(True)
+
+    def visible_region(self) -> Tuple[int, int, int, int] | None:
+        """The region (x, y, width, height) of the full resolution image that was visible at the last frame,
+        or None if the whole image was visible (see roi_mode.py)"""
+        return self._visible_region
+
+    def valid_region(self) -> Tuple[int, int, int, int] | None:
+        """The region (x, y, width, height) of the image that holds valid pixels (None: the whole image)"""
+        return self._valid_region
+
+    def set_valid_region(self, region: Tuple[int, int, int, int] | None) -> None:
+        """Mark the image as partial: only this region holds valid pixels (see roi_mode.py).
+        The statistics are then computed on this region only."""
+        if region != self._valid_region:
+            self._valid_region = region
+            self._stats = None
+
+    def _valid_image(self) -> Image:
+        """The valid region of the image (a view, not a copy)"""
+        if self._valid_region is None:
+            return self.image
+        x, y, w, h = self._valid_region
+        return self.image[y : y + h, x : x + w]  # type: ignore
+
+    def _update_visible_region(self) -> None:
+        assert self.pyramid is not None
+        if self.only_display:
+            self._visible_region = None
+            return
+        level_width, level_height = self.pyramid.level_size(self._zoomable_level)
+        full_width, full_height = self.pyramid.level_size(0)
+        display_width: float = self.image_params.image_display_size[0]
+        display_height: float = self.image_params.image_display_size[1]
+        if display_height <= 0:
+            display_height = display_width * level_height / level_width
+        if display_width <= 0:
+            display_width = display_height * level_width / level_height
+        # zoom_pan_matrix: level coords -> view coords
+        m = self.image_params.zoom_pan_matrix
+        kx, ky = full_width / level_width, full_height / level_height
+        x0 = max(math.floor(-m[0][2] / m[0][0] * kx), 0)
+        y0 = max(math.floor(-m[1][2] / m[1][1] * ky), 0)
+        x1 = min(math.ceil((display_width - m[0][2]) / m[0][0] * kx), full_width)
+        y1 = min(math.ceil((display_height - m[1][2]) / m[1][1] * ky), full_height)
+        if x0 <= 0 and y0 <= 0 and x1 >= full_width and y1 >= full_height:
+            self._visible_region = None
+        else:
+            self._visible_region = (x0, y0, max(x1 - x0, 1), max(y1 - y0, 1))
 
     def _show_image_inspector_on_first_call(self) -> None:
         if not self.was_inspect_window_opened_on_first_log:
@@ -205,8 +364,9 @@ class ImagePresenter:
             self.was_inspect_window_opened_on_first_log = True
 
     def _gui_channels(self) -> None:
+        displayed_image = self._display_only_image() if self.only_display else self._zoomable_image()
         need_refresh = self.need_refresh_cache_per_view.get_for_current_view()
-        for i, image_channel in enumerate(self.image_channels):
+        for i, image_channel in enumerate(self._channels_of_displayed_image(displayed_image)):
             imgui.push_id(str(i))
             label = f"channel {i}"
             imgui.begin_group()
@@ -221,11 +381,11 @@ class ImagePresenter:
                 )
             else:
                 self.image_params.refresh_image = need_refresh
-                immvision.image(label, image_channel, self.image_params)
+                self._call_immvision_image(label, image_channel)
             if self.show_inspect_button and not self.only_display:
                 if imgui.small_button("Inspect"):
                     global _INSPECT_ID
-                    immvision.inspector_add_image(image_channel, f"inspect {_INSPECT_ID} _ channel {i}")
+                    immvision.inspector_add_image(self.image_channels[i], f"inspect {_INSPECT_ID} _ channel {i}")
                     self._show_image_inspector_on_first_call()
                     _INSPECT_ID += 1
             imgui.end_group()
@@ -235,28 +395,36 @@ class ImagePresenter:
         if not self.channel_layout_vertically:
             imgui.new_line()
         self.need_refresh_cache_per_view.set_for_current_view(False)
+        self._update_visible_region()
+        if not self.only_display:
+            self._update_zoomable_level()
 
     def _gui_image(self) -> None:
-        need_refresh = self.need_refresh_cache_per_view.get_for_current_view()
         if self.only_display:
+            displayed_image = self._display_only_image()
+            need_refresh = self.need_refresh_cache_per_view.get_for_current_view()
             immvision.image_display_resizable(
                 "##output",
-                self.image,
+                displayed_image,
                 refresh_image=need_refresh,
                 resizable=self.image_params.can_resize,
                 size=self.size_when_only_display,
                 show_options_button=False,
             )
         else:
-            self.image_params.refresh_image = need_refresh
-            immvision.image("##output", self.image, self.image_params)
+            displayed_image = self._zoomable_image()
+            self.image_params.refresh_image = self.need_refresh_cache_per_view.get_for_current_view()
+            self._call_immvision_image("##output", displayed_image)
+            self._update_zoomable_level()
 
         self.need_refresh_cache_per_view.set_for_current_view(False)
+        self._update_visible_region()
 
         if self.show_inspect_button and not self.only_display:
             if imgui.small_button("Inspect"):
                 global _INSPECT_ID
-                immvision.inspector_add_image(self.image, f"inspect {_INSPECT_ID}")
+                partial = "" if self._valid_region is None else f" (partial, valid region {self._valid_region})"
+                immvision.inspector_add_image(self.image, f"inspect {_INSPECT_ID}{partial}")
                 self._show_image_inspector_on_first_call()
                 _INSPECT_ID += 1
 
@@ -271,25 +439,73 @@ class ImagePresenter:
             _, self.show_channels = imgui.checkbox("Show channels", self.show_channels)
             if self.show_channels:
                 _, self.channel_layout_vertically = imgui.checkbox("Vertical layout", self.channel_layout_vertically)
+        if not self.only_display:
+            _, self.show_stats = imgui.checkbox("Show stats", self.show_stats)
+        if self._valid_region is not None:
+            x, y, w, h = self._valid_region
+            imgui.text(f"Partial image: only the region x={x} y={y} w={w} h={h} was computed")
+            imgui.set_item_tooltip("The rest of the image is zero filled (see roi_mode.py)")
         if self.show_channels and nb_channels > 1:
             self._gui_channels()
         else:
             self._gui_image()
+        if self.show_stats and not self.only_display:
+            self._gui_stats()
+
+    def _gui_stats(self) -> None:
+        """The statistics and histograms of the channels (computed once per image, see image_stats.py),
+        on the valid region of the image"""
+        if self._stats is None:
+            self._stats = image_stats(self._valid_image())
+        stats = self._stats
+        nb_channels = len(stats.channels)
+        histogram_size = ImVec2(
+            self.image_params.image_display_size[0] or hello_imgui.em_size(15), hello_imgui.em_size(2.5)
+        )
+        for i, channel_stats in enumerate(stats.channels):
+            name = "value" if nb_channels == 1 else f"channel {i}"
+            imgui.text(
+                f"{name}: min={channel_stats.min:.4g} max={channel_stats.max:.4g} "
+                f"mean={channel_stats.mean:.4g} std={channel_stats.stddev:.4g}"
+            )
+            range_min, range_max = channel_stats.histogram_range
+            imgui.plot_histogram(
+                f"##histogram_{i}",
+                channel_stats.histogram,
+                overlay_text=f"[{range_min:.4g}, {range_max:.4g}]",
+                scale_min=0.0,
+                scale_max=1.0,
+                graph_size=histogram_size,
+            )
+        if stats.is_sampled():
+            imgui.text(f"(mean, std and histograms computed on {stats.nb_sampled_pixels} sampled pixels)")
 
     def save_gui_options_to_json(self) -> JsonDict:
-        image_params = _save_image_params_to_json(self.image_params)
+        # The zoom is saved in the coordinates of the full resolution image
+        zoom_pan_matrix = self.image_params.zoom_pan_matrix
+        if self.pyramid is not None and self._zoomable_level != 0:
+            self.image_params.zoom_pan_matrix = rescale_zoom_pan_matrix(
+                zoom_pan_matrix, self.pyramid.level_size(self._zoomable_level), self.pyramid.level_size(0)
+            )
+        try:
+            image_params = _save_image_params_to_json(self.image_params)
+        finally:
+            self.image_params.zoom_pan_matrix = zoom_pan_matrix
         r = {
             "image_params": image_params,
             "show_channels": self.show_channels,
             "channel_layout_vertically": self.channel_layout_vertically,
+            "show_stats": self.show_stats,
         }
         return r
 
     def load_gui_options_from_json(self, data: JsonDict) -> None:
         image_params = data["image_params"]
         _load_image_params_from_json(image_params, self.image_params)
+        self._zoomable_level = 0  # the zoom was saved in the coordinates of the full resolution image
         self.show_channels = data["show_channels"]
         self.channel_layout_vertically = data["channel_layout_vertically"]
+        self.show_stats = data.get("show_stats", False)
 
 
 class ImageWithGui(AnyDataWithGui[Image]):
@@ -373,18 +589,13 @@ def image_source(image_file: ImagePath, max_image_size: int | None = None) -> Im
 
     Since image_file is of type ImagePath, it will be displayed as a file picker in the GUI
     (if not linked to another function).
-    """
-    from fiatlight.fiat_kits.fiat_image.imread_rgb import imread_rgb
 
-    image = imread_rgb(image_file)
+    The decoded images are cached (see imread_rgb), and the next images of the folder are decoded
+    in advance on a background thread. The returned image is a writable copy of the cached one
+    (the downstream functions may modify it in place), which is much cheaper than decoding it again.
+    """
+    from fiatlight.fiat_kits.fiat_image.imread_rgb import imread_rgb, prefetch_next_images_in_folder
 
-    if max_image_size is not None:
-        try:
-            import cv2
-        except ImportError:
-            raise ImportError("cv2 is required to resize the image, please install it with 'pip install opencv-python'")
-        if image.shape[0] > max_image_size or image.shape[1] > max_image_size:
-            k = max_image_size / max(image.shape[0], image.shape[1])
-            assert k > 0.0
-            image = cv2.resize(image, None, fx=k, fy=k)  # type: ignore
-    return image
+    image = imread_rgb(image_file, max_image_size, use_cache=True)
+    prefetch_next_images_in_folder(image_file, max_image_size=max_image_size)
+    return image.copy()
@@ -0,0 +1,157 @@
+"""image_stats: per channel statistics and histograms of an image, computed once per image
+
+image_stats(image) returns the min, max, mean, standard deviation and histogram of each channel of an image.
+The statistics are cached per image fingerprint (see image_pyramid.image_fingerprint), and shared by the presenters
+that display the same image. The cache references the images weakly: it never keeps an image alive.
+
+The computations use cv2 (minMaxLoc, meanStdDev, calcHist) when the image type supports it, and numpy otherwise.
+For huge images, the mean, standard deviation and histogram are computed on a regular sample of at most
+max_sampled_pixels pixels (the min and max are always computed on the full image).
+"""
+
+from fiatlight.fiat_kits.fiat_image.image_pyramid import ImageFingerprint, image_fingerprint
+from fiatlight.fiat_kits.fiat_image.image_types import Image
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Tuple
+import math
+import threading
+import weakref
+
+import numpy as np
+
+
+@dataclass
+class ChannelStats:
+    min: float
+    max: float
+    mean: float
+    stddev: float
+    # Histogram of the channel, normalized so that its highest bin is 1 (float32)
+    histogram: np.ndarray
+    # The range of values covered by the histogram
+    histogram_range: Tuple[float, float]
+
+
+@dataclass
+class ImageStats:
+    channels: List[ChannelStats]
+    nb_pixels: int
+    # The number of pixels used for the mean, stddev and histogram (less than nb_pixels for huge images)
+    nb_sampled_pixels: int
+
+    def is_sampled(self) -> bool:
+        return self.nb_sampled_pixels < self.nb_pixels
+
+
+# Above this number of pixels, the mean, stddev and histogram are computed on a sample of the image
+DEFAULT_MAX_SAMPLED_PIXELS = 1_000_000
+
+
+def compute_image_stats(
+    image: Image, nb_bins: int = 256, max_sampled_pixels: int = DEFAULT_MAX_SAMPLED_PIXELS
+) -> ImageStats:
+    """The statistics of each channel of an image (not cached: see image_stats)"""
+    if image.ndim not in (2, 3):
+        raise ValueError(f"compute_image_stats: unsupported image shape {image.shape}")
+    height, width = image.shape[:2]
+    step = max(math.ceil(math.sqrt(height * width / max_sampled_pixels)), 1)
+    sample = image[::step, ::step]
+    channels = [image] if image.ndim == 2 else list(np.moveaxis(image, -1, 0))
+    sample_channels = [sample] if sample.ndim == 2 else list(np.moveaxis(sample, -1, 0))
+
+    r = []
+    for channel, sample_channel in zip(channels, sample_channels):
+        min_value, max_value = _channel_min_max(channel)
+        mean, stddev = _channel_mean_stddev(sample_channel)
+        histogram, histogram_range = _channel_histogram(sample_channel, nb_bins, min_value, max_value)
+        r.append(ChannelStats(min_value, max_value, mean, stddev, histogram, histogram_range))
+    return ImageStats(channels=r, nb_pixels=height * width, nb_sampled_pixels=sample.shape[0] * sample.shape[1])
+
+
+def _channel_min_max(channel: np.ndarray) -> Tuple[float, float]:
+    import cv2
+
+    try:
+        min_value, max_value, _, _ = cv2.minMaxLoc(channel)
+        return float(min_value), float(max_value)
+    except cv2.error:  # types not supported by cv2 (int64, bool, ...)
+        return float(np.nanmin(channel)), float(np.nanmax(channel))
+
+
+def _channel_mean_stddev(channel: np.ndarray) -> Tuple[float, float]:
+    import cv2
+
+    try:
+        mean, stddev = cv2.meanStdDev(channel)
+        return float(mean[0, 0]), float(stddev[0, 0])
+    except cv2.error:
+        return float(np.nanmean(channel)), float(np.nanstd(channel))
+
+
+def _channel_histogram(
+    channel: np.ndarray, nb_bins: int, min_value: float, max_value: float
+) -> Tuple[np.ndarray, Tuple[float, float]]:
+    import cv2
+
+    if channel.dtype == np.uint8:
+        histogram_range = (0.0, 256.0)
+        histogram = cv2.calcHist([np.ascontiguousarray(channel)], [0], None, [nb_bins], list(histogram_range)).reshape(
+            -1
+        )
+    else:
+        histogram_range = (min_value, max_value if max_value > min_value else min_value + 1.0)
+        values = channel[np.isfinite(channel)] if channel.dtype.kind == "f" else channel
+        histogram = np.histogram(values, bins=nb_bins, range=histogram_range)[0].astype(np.float32)
+    highest = histogram.max()
+    if highest > 0:
+        histogram = histogram / highest
+    return histogram.astype(np.float32), histogram_range
+
+
+class _ImageStatsCache:
+    """An LRU cache of ImageStats, keyed by image fingerprint.
+    The images are referenced weakly: the entries of released images are ignored, and purged by put()"""
+
+    max_entries: int
+    # fingerprint -> (weak reference to the image, stats): the weak reference tells whether the id of the image
+    # (part of the fingerprint) still designates the same image
+    _entries: OrderedDict[Tuple[ImageFingerprint, int], Tuple["weakref.ref[Image]", ImageStats]]
+    _lock: threading.Lock
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[ImageFingerprint, int], image: Image) -> ImageStats | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0]() is not image:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Tuple[ImageFingerprint, int], image: Image, stats: ImageStats) -> None:
+        with self._lock:
+            self._entries[key] = (weakref.ref(image), stats)
+            for dead_key in [k for k, (image_ref, _) in self._entries.items() if image_ref() is None]:
+                del self._entries[dead_key]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_IMAGE_STATS_CACHE = _ImageStatsCache(max_entries=32)
+
+
+def image_stats(image: Image, nb_bins: int = 256) -> ImageStats:
+    """The statistics of each channel of an image, cached per image fingerprint"""
+    key = (image_fingerprint(image), nb_bins)
+    stats = _IMAGE_STATS_CACHE.get(key, image)
+    if stats is None:
+        stats = compute_image_stats(image, nb_bins)
+        _IMAGE_STATS_CACHE.put(key, image, stats)
+    return stats
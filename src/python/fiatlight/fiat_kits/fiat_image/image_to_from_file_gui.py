@@ -1,10 +1,16 @@
+from fiatlight.fiat_types.base_types import JsonDict
 from fiatlight.fiat_types.file_types import ImagePath, ImagePath_Save
 from fiatlight.fiat_core.function_with_gui import FunctionWithGui
-from imgui_bundle import imgui, portable_file_dialogs as pfd
-from .image_types import ImageRgb
+from fiatlight.fiat_core.file_writer import background_file_writer
+from imgui_bundle import imgui, hello_imgui, portable_file_dialogs as pfd
+from pydantic import BaseModel, Field
+from typing import List
+import os
+from .image_types import ImageRgb, ImageRgba
 
 
 _ACCEPT_ANY_FILE = "*.*"
+_IMAGE_FILE_FILTERS = ["*.png", "*.jpg", "*.jpeg", "*.webp", "*.bmp", "*.tif", "*.tiff", _ACCEPT_ANY_FILE]
 
 
 def image_from_file(path: ImagePath) -> ImageRgb | None:
@@ -20,37 +26,125 @@ def image_from_file(path: ImagePath) -> ImageRgb | None:
         return None
 
 
+class ImageEncodingParams(BaseModel):
+    """Encoding parameters of the image files (the format is given by the file extension)"""
+
+    png_compression: int = Field(default=3, ge=0, le=9)  # 0: fast, large files ... 9: slow, small files
+    jpeg_quality: int = Field(default=95, ge=0, le=100)
+    webp_quality: int = Field(default=95, ge=1, le=100)  # above 100: lossless
+
+    def imwrite_params(self, path: str) -> List[int]:
+        """The parameters for cv2.imwrite / cv2.imencode, for the format of path"""
+        import cv2
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".png":
+            return [cv2.IMWRITE_PNG_COMPRESSION, self.png_compression]
+        if extension in (".jpg", ".jpeg"):
+            return [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        if extension == ".webp":
+            return [cv2.IMWRITE_WEBP_QUALITY, self.webp_quality]
+        return []
+
+
+def encode_image_rgb(image: ImageRgb | ImageRgba, path: str, encoding_params: ImageEncodingParams) -> bytes:
+    """Encode an RGB (or RGBA) image in the format given by the extension of path"""
+    import cv2
+
+    extension = os.path.splitext(path)[1].lower()
+    nb_channels = image.shape[2] if image.ndim == 3 else 1
+    if nb_channels == 3:
+        img_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    elif nb_channels == 4:
+        img_bgr = cv2.cvtColor(image, cv2.COLOR_RGBA2BGRA)
+    else:
+        img_bgr = image
+    ok, encoded = cv2.imencode(extension, img_bgr, encoding_params.imwrite_params(path))
+    if not ok:
+        raise ValueError(f"Failed to encode image to format {extension}")
+    return encoded.tobytes()
+
+
 class ImageToFileGui(FunctionWithGui):
+    """Saves the image to a file. The image is encoded and written on a background thread
+    (see fiat_core/file_writer.py). With "Export on change", each new image is saved to the last selected file
+    (if images arrive faster than they are written, only the latest one is written)."""
+
+    encoding_params: ImageEncodingParams
+    export_on_change: bool = False
+    _export_path: str | None = None
     _save_dialog: pfd.save_file | None = None
     _image: ImageRgb | None = None
     _exception_message: str | None = None
 
     def __init__(self) -> None:
         super().__init__(self.f, "ImageToFile")
+        self.encoding_params = ImageEncodingParams()
         self.internal_state_gui = self._internal_state_gui
+        self.save_internal_gui_options_to_json = self._save_internal_gui_options_to_json
+        self.load_internal_gui_options_from_json = self._load_internal_gui_options_from_json
 
     def f(self, image: ImageRgb) -> None:
         self._image = image
+        if self.export_on_change and self._export_path is not None:
+            self.do_write(self._export_path)  # type: ignore
 
     def do_write(self, path: ImagePath_Save) -> None:
-        import cv2
-
+        """Submit the image to the background writer (the call returns immediately)"""
         assert self._image is not None
-        try:
-            img_bgr = cv2.cvtColor(self._image, cv2.COLOR_RGB2BGR)
-            cv2.imwrite(path, img_bgr)
-        except Exception:
-            self._exception_message = f"Failed to write image to file {path}"
+        image = self._image
+        encoding_params = self.encoding_params.model_copy()
+        self._export_path = path
+        background_file_writer().submit(
+            path,
+            lambda: encode_image_rgb(image, path, encoding_params),
+            coalesce_key=(id(self), path),
+            on_done=self._on_write_done,
+        )
+
+    def _on_write_done(self, error: str | None) -> None:
+        self._exception_message = error
+
+    def _save_internal_gui_options_to_json(self) -> JsonDict:
+        return {
+            "encoding_params": self.encoding_params.model_dump(),
+            "export_on_change": self.export_on_change,
+            "export_path": self._export_path,
+        }
+
+    def _load_internal_gui_options_from_json(self, json_data: JsonDict) -> None:
+        self.encoding_params = ImageEncodingParams.model_validate(json_data["encoding_params"])
+        self.export_on_change = json_data["export_on_change"]
+        self._export_path = json_data["export_path"]
+
+    def _gui_encoding_params(self) -> None:
+        if imgui.tree_node("Encoding"):
+            params = self.encoding_params
+            imgui.set_next_item_width(hello_imgui.em_size(8))
+            _, params.png_compression = imgui.slider_int("PNG compression", params.png_compression, 0, 9)
+            imgui.set_next_item_width(hello_imgui.em_size(8))
+            _, params.jpeg_quality = imgui.slider_int("JPEG quality", params.jpeg_quality, 0, 100)
+            imgui.set_next_item_width(hello_imgui.em_size(8))
+            _, params.webp_quality = imgui.slider_int("WebP quality", params.webp_quality, 1, 100)
+            imgui.tree_pop()
 
     def _internal_state_gui(self) -> bool:
         if self._image is None:
             return False
         if imgui.button("Save file"):
-            self._save_dialog = pfd.save_file("Select file", "", ["*.txt", _ACCEPT_ANY_FILE])
+            self._save_dialog = pfd.save_file("Select file", "", _IMAGE_FILE_FILTERS)
         if self._save_dialog is not None and self._save_dialog.ready():
             selected_file = self._save_dialog.result()
-            self.do_write(selected_file)  # type: ignore
+            if selected_file != "":
+                self.do_write(selected_file)  # type: ignore
             self._save_dialog = None
+        if self._export_path is not None:
+            _, self.export_on_change = imgui.checkbox("Export on change", self.export_on_change)
+            imgui.set_item_tooltip(f"Save each new image to {self._export_path}")
+        self._gui_encoding_params()
+        writer = background_file_writer()
+        if writer.nb_writes > 0 or writer.is_busy():
+            imgui.text(writer.stats_report())
         if self._exception_message is not None:
             from fiatlight import fiat_config as fc
 
@@ -1,11 +1,148 @@
-"""reads an image file and returns a numpy array with the image data in RGB order, using OpenCV"""
+"""reads an image file and returns a numpy array with the image data in RGB order, using OpenCV
+
+With use_cache=True (as used by image_source), decoded images are kept in an LRU cache (bounded in bytes), keyed
+by (path, modification time, file size, resize target): reading the same file again is instant, and a file is
+decoded again when it changes. The cached images are shared, and therefore read-only.
+prefetch_images() and prefetch_next_images_in_folder() decode files in advance, on a background thread,
+so that browsing a folder of large photos does not pay for a full decode at each step.
+"""
 
 from .image_types import ImageU8
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Sequence, Tuple
 import numpy as np
+import os
+import threading
+
+
+# (absolute path, modification time in ns, file size, max_image_size)
+_ImageCacheKey = Tuple[str, int, int, int | None]
+
+# Extensions of the files prefetched by prefetch_next_images_in_folder()
+IMAGE_FILE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp", ".jp2", ".pgm", ".ppm")
+
+
+def imread_rgb(image_file: str, max_image_size: int | None = None, use_cache: bool = False) -> ImageU8:
+    """reads an image file and returns a numpy array with the image data in RGB order, using OpenCV
+
+    If max_image_size is not None, the image is resized if its width or height is larger than max_image_size.
+    By default, the image is a new (writable) image. If use_cache is True, the image is shared with the
+    decoded images cache, and is therefore read-only.
+    """
+    if not use_cache:
+        return _read_image_resized(image_file, max_image_size)
+    return _read_image_cached(_image_cache_key(image_file, max_image_size))
+
+
+class _ImageCacheSection:  # Dummy class to create a section in the IDE # noqa
+    """
+    # --------------------------------------------------------------------------------------------
+    #        Decoded images cache
+    # --------------------------------------------------------------------------------------------
+    """
+
+    pass
+
+
+class _DecodedImagesCache:
+    """An LRU cache of decoded images, whose size is bounded in bytes"""
+
+    max_bytes: int
+    nb_bytes: int = 0
+    _images: OrderedDict[_ImageCacheKey, ImageU8]
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+
+    def get(self, key: _ImageCacheKey) -> ImageU8 | None:
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+        return image
+
+    def put(self, key: _ImageCacheKey, image: ImageU8) -> None:
+        if key in self._images:
+            return
+        self._images[key] = image
+        self.nb_bytes += image.nbytes
+        self.evict()
+
+    def evict(self) -> None:
+        while self.nb_bytes > self.max_bytes and len(self._images) > 1:
+            _, evicted = self._images.popitem(last=False)
+            self.nb_bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        self._images.clear()
+        self.nb_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+
+_DECODED_IMAGES_CACHE = _DecodedImagesCache(max_bytes=512 * 1024 * 1024)
+# Images being decoded (by another thread): their result is awaited instead of being decoded twice
+_PENDING_DECODES: Dict[_ImageCacheKey, "Future[ImageU8]"] = {}
+# Protects _DECODED_IMAGES_CACHE and _PENDING_DECODES
+_CACHE_LOCK = threading.Lock()
+
+
+def set_imread_rgb_cache_max_bytes(max_bytes: int) -> None:
+    """Sets the maximum size of the decoded images cache (512MB by default)"""
+    with _CACHE_LOCK:
+        _DECODED_IMAGES_CACHE.max_bytes = max_bytes
+        _DECODED_IMAGES_CACHE.evict()
 
 
-def imread_rgb(image_file: str) -> ImageU8:
-    """reads an image file and returns a numpy array with the image data in RGB order, using OpenCV"""
+def clear_imread_rgb_cache() -> None:
+    with _CACHE_LOCK:
+        _DECODED_IMAGES_CACHE.clear()
+
+
+def _image_cache_key(image_file: str, max_image_size: int | None) -> _ImageCacheKey:
+    stat = os.stat(image_file)
+    return os.path.abspath(image_file), stat.st_mtime_ns, stat.st_size, max_image_size
+
+
+def _read_image_cached(key: _ImageCacheKey) -> ImageU8:
+    with _CACHE_LOCK:
+        image = _DECODED_IMAGES_CACHE.get(key)
+        if image is not None:
+            return image
+        pending = _PENDING_DECODES.get(key)
+        if pending is None:
+            future: Future[ImageU8] = Future()
+            _PENDING_DECODES[key] = future
+    if pending is not None:
+        return pending.result()
+
+    try:
+        path, mtime, size, max_image_size = key
+        if max_image_size is None:
+            image = _read_image(path)
+        else:
+            # The full size image is cached too: changing max_image_size does not decode the file again
+            full_image = _read_image_cached((path, mtime, size, None))
+            image = _resize_image(full_image, max_image_size)
+            if image is full_image:
+                future.set_result(image)
+                return image
+        image.setflags(write=False)
+        with _CACHE_LOCK:
+            _DECODED_IMAGES_CACHE.put(key, image)
+        future.set_result(image)
+        return image
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _CACHE_LOCK:
+            del _PENDING_DECODES[key]
+
+
+def _read_image(image_file: str) -> ImageU8:
     import cv2
 
     img = cv2.imread(image_file)
@@ -17,3 +154,74 @@ def imread_rgb(image_file: str) -> ImageU8:
         elif nb_channels == 3:
             img = np.ascontiguousarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
     return img  # type: ignore
+
+
+def _resize_image(image: ImageU8, max_image_size: int) -> ImageU8:
+    """Resizes the image if it is too large (returns the same image otherwise)"""
+    try:
+        import cv2
+    except ImportError:
+        raise ImportError("cv2 is required to resize the image, please install it with 'pip install opencv-python'")
+    if image.shape[0] > max_image_size or image.shape[1] > max_image_size:
+        k = max_image_size / max(image.shape[0], image.shape[1])
+        assert k > 0.0
+        image = cv2.resize(image, None, fx=k, fy=k)  # type: ignore
+    return image
+
+
+def _read_image_resized(image_file: str, max_image_size: int | None) -> ImageU8:
+    image = _read_image(image_file)
+    if max_image_size is not None:
+        image = _resize_image(image, max_image_size)
+    return image
+
+
+class _PrefetchSection:  # Dummy class to create a section in the IDE # noqa
+    """
+    # --------------------------------------------------------------------------------------------
+    #        Prefetch
+    # --------------------------------------------------------------------------------------------
+    """
+
+    pass
+
+
+_PREFETCH_EXECUTOR: ThreadPoolExecutor | None = None
+# folder -> (modification time in ns, sorted image files)
+_FOLDER_LISTINGS: Dict[str, Tuple[int, List[str]]] = {}
+
+
+def prefetch_images(image_files: Sequence[str], max_image_size: int | None = None) -> List["Future[ImageU8]"]:
+    """Decodes image files in advance, on a background thread, and stores them in the decoded images cache:
+    the next imread_rgb(use_cache=True) calls for these files (with the same max_image_size) will be instant.
+    """
+    global _PREFETCH_EXECUTOR
+    if _PREFETCH_EXECUTOR is None:
+        _PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="imread_rgb_prefetch")
+    return [
+        _PREFETCH_EXECUTOR.submit(imread_rgb, image_file, max_image_size, use_cache=True) for image_file in image_files
+    ]
+
+
+def next_images_in_folder(image_file: str, count: int) -> List[str]:
+    """The (at most) count image files that follow image_file in its folder, in alphabetical order"""
+    folder = os.path.dirname(os.path.abspath(image_file))
+    folder_mtime = os.stat(folder).st_mtime_ns
+    listing = _FOLDER_LISTINGS.get(folder)
+    if listing is None or listing[0] != folder_mtime:
+        files = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_FILE_EXTENSIONS))
+        listing = (folder_mtime, files)
+        _FOLDER_LISTINGS[folder] = listing
+    files = listing[1]
+    name = os.path.basename(image_file)
+    if name not in files:
+        return []
+    idx = files.index(name)
+    return [os.path.join(folder, f) for f in files[idx + 1 : idx + 1 + count]]
+
+
+def prefetch_next_images_in_folder(
+    image_file: str, count: int = 2, max_image_size: int | None = None
+) -> List["Future[ImageU8]"]:
+    """Decodes the next image files of the folder of image_file on a background thread (see prefetch_images)"""
+    return prefetch_images(next_images_in_folder(image_file, count), max_image_size)
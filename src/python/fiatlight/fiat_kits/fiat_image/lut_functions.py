@@ -1,8 +1,15 @@
-from typing import Tuple, Optional
+"""LUT (Look-Up Table) functions: adjust the levels of an image channels
+
+The tables are cached per LutParams value (see LutParams.to_table), and the tables of all the channels
+are applied in a single cv2.LUT call (with a 256x1xC table), without splitting and merging the channels.
+"""
+
+from typing import Dict, List, Tuple, Optional
+import functools
 import cv2
 import numpy as np
-from fiatlight.fiat_kits.fiat_image import ImageU8, ColorType, ColorConversion
-from .lut_types import LutParams, LutTable
+from fiatlight.fiat_kits.fiat_image import ImageU8, ColorType
+from .lut_types import LutParams, LutTable, _lut_table
 
 
 def lut_with_params(image: ImageU8, params: LutParams) -> ImageU8:
@@ -17,21 +24,44 @@ def lut_channels_with_params(
     lut_channel_2: Optional[LutParams] = None,
     lut_channel_3: Optional[LutParams] = None,
 ) -> ImageU8:
-    lut_channel_0 = lut_channel_0 or LutParams()
-    lut_channel_1 = lut_channel_1 or LutParams()
-    lut_channel_2 = lut_channel_2 or LutParams()
-    lut_channel_3 = lut_channel_3 or LutParams()
-    lut_params = [lut_channel_0, lut_channel_1, lut_channel_2, lut_channel_3]
+    lut_params = _channels_lut_params(lut_channel_0, lut_channel_1, lut_channel_2, lut_channel_3)
+    return _apply_channels_luts(image, lut_params)
+
+
+def _channels_lut_params(*lut_channels: Optional[LutParams]) -> List[LutParams]:
+    return [lut_channel or LutParams() for lut_channel in lut_channels]
+
 
+@functools.lru_cache(maxsize=256)
+def _channels_lut_table(channels_keys: Tuple[Tuple[float, float, float, float, float], ...]) -> LutTable:
+    """A 256x1xC table, that applies a different LUT to each channel (cached per channels LutParams values)"""
+    tables = [_lut_table(*channel_key) for channel_key in channels_keys]
+    r = np.ascontiguousarray(np.stack(tables, axis=-1).reshape(1, 256, len(tables)))
+    r.flags.writeable = False
+    return r
+
+
+def _apply_channels_luts(image: ImageU8, lut_params: List[LutParams], in_place: bool = False) -> ImageU8:
+    """Apply lut_params[i] to the channel i of the image, in a single cv2.LUT call.
+    If in_place is True, the result is written into image (which must be writable)"""
     if len(image.shape) == 2:
-        return lut_with_params(image, lut_params[0])
+        table = lut_params[0].to_table()
+    else:
+        nb_channels = image.shape[2]
+        table = _channels_lut_table(tuple(p.cache_key() for p in lut_params[:nb_channels]))
+    if in_place:
+        cv2.LUT(image, table, dst=image)
+        return image
+    return cv2.LUT(image, table)  # type: ignore
 
-    nb_channels = image.shape[2]
-    channels = cv2.split(image)
-    assert len(channels) == nb_channels
-    result_channels = [lut_with_params(channels[i], lut_params[i]) for i in range(nb_channels)]  # type: ignore
-    result = cv2.merge(result_channels)
-    return result  # type: ignore
+
+# Conversions that only reorder the channels: (src, dst) -> channel i of dst is channel permutation[i] of src
+_CHANNELS_PERMUTATIONS: Dict[Tuple[ColorType, ColorType], Tuple[int, ...]] = {
+    (ColorType.BGR, ColorType.RGB): (2, 1, 0),
+    (ColorType.RGB, ColorType.BGR): (2, 1, 0),
+    (ColorType.BGRA, ColorType.RGBA): (2, 1, 0, 3),
+    (ColorType.RGBA, ColorType.BGRA): (2, 1, 0, 3),
+}
 
 
 def lut_channels_in_colorspace(
@@ -48,17 +78,31 @@ def lut_channels_in_colorspace(
     The image is converted to the target color space (color_space_lut), the LUT is applied,
     and the image is converted back to the original color space (color_space_src).
     """
-
-    image_color_conversion_1 = ColorConversion(src_color=color_space_src, dst_color=color_space_lut)
-    if image_color_conversion_1.conversion_code() is None:
+    lut_params = _channels_lut_params(lut_channel_0, lut_channel_1, lut_channel_2, lut_channel_3)
+
+    # Fused cases: no conversion is needed
+    if color_space_src == color_space_lut:
+        return _apply_channels_luts(image, lut_params)
+    permutation = _CHANNELS_PERMUTATIONS.get((color_space_src, color_space_lut))
+    if permutation is not None and len(image.shape) == 3 and image.shape[2] == len(permutation):
+        # Apply the LUTs to the corresponding channels of the source image
+        lut_params_src = list(lut_params)
+        for i, src_channel in enumerate(permutation):
+            lut_params_src[src_channel] = lut_params[i]
+        return _apply_channels_luts(image, lut_params_src)
+
+    # The conversion codes are looked up in the precomputed table (no ColorConversion is created for each call)
+    code_to_lut = color_space_src.conversion_code(color_space_lut)
+    if code_to_lut is None:
         raise ValueError(f"Conversion from {color_space_src} to {color_space_lut} is not available")
-    image_color_conversion_2 = ColorConversion(src_color=color_space_lut, dst_color=color_space_src)
-    if image_color_conversion_2.conversion_code() is None:
+    code_from_lut = color_space_lut.conversion_code(color_space_src)
+    if code_from_lut is None:
         raise ValueError(f"Conversion from {color_space_lut} to {color_space_src} is not available")
 
-    image_color = image_color_conversion_1.convert_image(image)
-    image_color_lut = lut_channels_with_params(image_color, lut_channel_0, lut_channel_1, lut_channel_2, lut_channel_3)
-    image_lut = image_color_conversion_2.convert_image(image_color_lut)
+    image_color = cv2.cvtColor(image, code_to_lut)
+    # image_color is a new buffer: the LUT is applied in place, without another intermediate image
+    image_color_lut = _apply_channels_luts(image_color, lut_params, in_place=True)  # type: ignore
+    image_lut: ImageU8 = cv2.cvtColor(image_color_lut, code_from_lut)  # type: ignore
     return image_lut
 
 
@@ -1,5 +1,6 @@
-from typing import TypeAlias
+from typing import Tuple, TypeAlias
 from numpy.typing import NDArray
+import functools
 import numpy as np
 from fiatlight.fiat_togui.gui_registry import base_model_with_gui_registration
 from .cv_color_type import ColorConversion
@@ -19,16 +20,13 @@ class LutParams(BaseModel):
     max_in: float = 1.0  # <=> 255
     max_out: float = 1.0
 
+    def cache_key(self) -> Tuple[float, float, float, float, float]:
+        """A hashable key that identifies the table (LutParams is mutable, and thus not hashable)"""
+        return self.pow_exponent, self.min_in, self.min_out, self.max_in, self.max_out
+
     def to_table(self) -> LutTable:
-        x = np.arange(0.0, 1.0, 1.0 / 256.0)
-        y = (x - self.min_in) / (self.max_in - self.min_in)
-        y = np.clip(y, 0.0, 1.0)
-        y = np.power(y, self.pow_exponent)
-        y = np.clip(y, 0.0, 1.0)
-        y = self.min_out + (self.max_out - self.min_out) * y
-        y = np.clip(y, 0.0, 1.0)
-        lut_uint8 = (y * 255.0).astype(np.uint8)
-        return lut_uint8
+        """The LUT table. It is cached per parameters value, and is read-only"""
+        return _lut_table(*self.cache_key())
 
     def is_default(self) -> bool:
         return (
@@ -40,6 +38,20 @@ class LutParams(BaseModel):
         )
 
 
+@functools.lru_cache(maxsize=1024)
+def _lut_table(pow_exponent: float, min_in: float, min_out: float, max_in: float, max_out: float) -> LutTable:
+    x = np.arange(0.0, 1.0, 1.0 / 256.0)
+    y = (x - min_in) / (max_in - min_in)
+    y = np.clip(y, 0.0, 1.0)
+    y = np.power(y, pow_exponent)
+    y = np.clip(y, 0.0, 1.0)
+    y = min_out + (max_out - min_out) * y
+    y = np.clip(y, 0.0, 1.0)
+    lut_uint8 = (y * 255.0).astype(np.uint8)
+    lut_uint8.flags.writeable = False  # shared by all the users of the cache
+    return lut_uint8
+
+
 @base_model_with_gui_registration()
 class ColorLutParams(BaseModel):
     lut_0: LutParams = Field(default_factory=LutParams)
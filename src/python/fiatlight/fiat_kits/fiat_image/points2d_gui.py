@@ -1,21 +1,35 @@
-"""GUI registration for the `Points2D` type — text-only summary."""
+"""GUI registration for the `Points2D` type — summary, and a thumbnail of the points
+(binned at the thumbnail resolution, see geometry_lod.py)."""
 
 import numpy as np
-from imgui_bundle import imgui
+from imgui_bundle import imgui, ImVec2
 
 from fiatlight.fiat_togui.simple_gui import register_callbacks
 
+from .geometry_lod import cached_for_value, forget_value, gui_thumbnail, render_points
 from .points2d_types import Points2D
 
 
+# Display size of the thumbnails (shared by the points presenters, resizable by the user)
+_THUMBNAIL_SIZE = ImVec2(200, 0)
+
+
+def _bbox_str(points: Points2D) -> str:
+    def compute() -> str:
+        x_min, y_min = points.min(axis=0)
+        x_max, y_max = points.max(axis=0)
+        return f"bbox x=[{int(x_min)},{int(x_max)}] y=[{int(y_min)},{int(y_max)}]"
+
+    return cached_for_value(points, "bbox_str", compute)
+
+
 def _present(points: Points2D) -> None:
     n = int(points.shape[0]) if points.ndim >= 1 else 0
     if n == 0:
         imgui.text("0 points")
         return
-    x_min, y_min = int(points[:, 0].min()), int(points[:, 1].min())
-    x_max, y_max = int(points[:, 0].max()), int(points[:, 1].max())
-    imgui.text(f"{n} point(s), bbox x=[{x_min},{x_max}] y=[{y_min},{y_max}]")
+    imgui.text(f"{n} point(s), {_bbox_str(points)}")
+    gui_thumbnail("##points", points, render_points, _THUMBNAIL_SIZE)
     if imgui.tree_node("First 10"):
         for i in range(min(10, n)):
             imgui.text(f"#{i}: ({int(points[i, 0])}, {int(points[i, 1])})")
@@ -33,4 +47,5 @@ def _register() -> None:
         present=_present,
         present_str=_present_str,
         default=lambda: Points2D(np.empty((0, 2), dtype=np.int32)),
+        on_change=forget_value,
     )
@@ -0,0 +1,209 @@
+"""ImagePreviewMode: a graph-wide preview-resolution mode for image pipelines
+
+While the user interacts with the GUI (e.g. drags a slider of a function in a long image chain),
+the functions of the graph are invoked with downscaled proxies of their large ImageU8 inputs
+(at most max_preview_size pixels wide or high). Their outputs are thus small, and the downstream
+functions run at the preview resolution too.
+Once the interaction settles (no active widget during settle_seconds), the functions that ran
+at the preview resolution are invoked again, at full resolution.
+
+Some parameters depend on the image scale (e.g. the sigma of a blur, in pixels): they can be declared with
+the fiat attribute "preview_scaled_params", and are then multiplied by the preview scale:
+
+    @fl.with_fiat_attributes(preview_scaled_params=["sigmaX", "sigmaY"])
+    def GaussianBlur(image: ImageU8, sigmaX: float = 0.0, sigmaY: float = 0.0) -> ImageU8:
+        ...
+
+Usage:
+    fl.run(graph, params=fl.FiatRunParams(image_preview=True))
+
+or, with any FunctionsGraph:
+    preview_mode = ImagePreviewMode(graph)
+    preview_mode.attach()
+    ...
+    preview_mode.heartbeat()   # once per frame: triggers the full resolution run when the interaction settles
+"""
+
+from fiatlight.fiat_core.functions_graph import FunctionsGraph
+from fiatlight.fiat_core.function_node import FunctionNode
+from fiatlight.fiat_kits.fiat_image.image_pyramid import ImageFingerprint, image_fingerprint
+from fiatlight.fiat_kits.fiat_image.image_types import ImageU8
+from fiatlight.fiat_utils import get_fiat_attribute
+from typing import Any, Callable, Dict, List, Tuple
+import functools
+import threading
+import time
+
+import numpy as np
+
+
+def _is_interacting_with_imgui() -> bool:
+    """True if a widget is active (e.g. a slider being dragged), when called from the GUI thread"""
+    from imgui_bundle import imgui
+
+    if threading.current_thread() is not threading.main_thread() or imgui.get_current_context() is None:
+        return False
+    return imgui.is_any_item_active()
+
+
+class ImagePreviewMode:
+    """Invoke the functions of a graph at a preview resolution during interactions (see module doc)"""
+
+    graph: FunctionsGraph
+    max_preview_size: int
+    settle_seconds: float
+
+    _is_interacting: Callable[[], bool]
+    _last_interaction_time: float = -float("inf")
+    # The original _f_impl of the instrumented functions
+    _original_f_impls: Dict[FunctionNode, Callable[..., Any]]
+    # The functions that were invoked at the preview resolution, since the last full resolution run
+    _previewed_nodes: List[FunctionNode]
+    # The last preview outputs of each previewed function: (image, scale)
+    # (only the last ones are kept: the previous outputs of a function are not referenced anymore)
+    _preview_outputs: Dict[FunctionNode, List[Tuple[np.ndarray, float]]]
+    # The proxy of the last full resolution image received by each image parameter of a function:
+    # (function, parameter) -> (fingerprint of the full resolution image, proxy, scale)
+    _proxies: Dict[Tuple[FunctionNode, str], Tuple[ImageFingerprint, ImageU8, float]]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        graph: FunctionsGraph,
+        max_preview_size: int = 512,
+        settle_seconds: float = 0.3,
+        is_interacting: Callable[[], bool] = _is_interacting_with_imgui,
+    ) -> None:
+        self.graph = graph
+        self.max_preview_size = max_preview_size
+        self.settle_seconds = settle_seconds
+        self._is_interacting = is_interacting
+        self._original_f_impls = {}
+        self._previewed_nodes = []
+        self._preview_outputs = {}
+        self._proxies = {}
+        self._lock = threading.Lock()
+
+    def attach(self) -> None:
+        """Instrument the functions of the graph (functions added later are instrumented at the next heartbeat)"""
+        for fn_node in self.graph.functions_nodes:
+            if fn_node in self._original_f_impls:
+                continue
+            f_impl = fn_node.function_with_gui._f_impl
+            if f_impl is None:
+                continue
+            self._original_f_impls[fn_node] = f_impl
+            fn_node.function_with_gui._f_impl = self._preview_f_impl(fn_node, f_impl)
+
+    def detach(self) -> None:
+        for fn_node, f_impl in self._original_f_impls.items():
+            fn_node.function_with_gui._f_impl = f_impl
+        self._original_f_impls = {}
+
+    def is_previewing(self) -> bool:
+        now = time.perf_counter()
+        if self._is_interacting():
+            self._last_interaction_time = now
+        return now - self._last_interaction_time < self.settle_seconds
+
+    def heartbeat(self) -> None:
+        """Shall be called once per frame: when the interaction has settled, the functions that ran
+        at the preview resolution are invoked again at full resolution"""
+        if len(self._original_f_impls) != len(self.graph.functions_nodes):
+            self.attach()
+        if self.is_previewing() or len(self._previewed_nodes) == 0:
+            return
+        with self._lock:
+            previewed_nodes = self._previewed_nodes
+            self._previewed_nodes = []
+            self._preview_outputs = {}
+            self._proxies = {}
+        # Invoke again the first previewed functions: their outputs are propagated downstream
+        for fn_node in previewed_nodes:
+            has_previewed_parent = any(link.src_function_node in previewed_nodes for link in fn_node.input_links)
+            if not has_previewed_parent:
+                fn_node.on_inputs_changed()
+
+    def _preview_f_impl(self, fn_node: FunctionNode, f_impl: Callable[..., Any]) -> Callable[..., Any]:
+        scaled_params: List[str] = get_fiat_attribute(f_impl, "preview_scaled_params", [])
+
+        @functools.wraps(f_impl)
+        def f(*args: Any, **kwargs: Any) -> Any:
+            if not self.is_previewing():
+                return f_impl(*args, **kwargs)
+
+            scales: List[float] = []
+            args = tuple(self._to_preview(fn_node, str(i), value, scales) for i, value in enumerate(args))
+            kwargs = {name: self._to_preview(fn_node, name, value, scales) for name, value in kwargs.items()}
+            if len(scales) == 0:
+                # No image input (e.g. a source): run at full resolution
+                return f_impl(*args, **kwargs)
+            scale = scales[0]
+            for name in scaled_params:
+                if name in kwargs:
+                    kwargs[name] = _scaled_param(kwargs[name], scale)
+
+            output = f_impl(*args, **kwargs)
+
+            with self._lock:
+                outputs = output if isinstance(output, tuple) else (output,)
+                self._preview_outputs[fn_node] = [(value, scale) for value in outputs if isinstance(value, np.ndarray)]
+                if fn_node not in self._previewed_nodes:
+                    self._previewed_nodes.append(fn_node)
+            return output
+
+        return f
+
+    def _preview_scale(self, image: np.ndarray) -> float | None:
+        """The scale of an image, if it is a preview image (a proxy, or the output of a previewed function)"""
+        for outputs in self._preview_outputs.values():
+            for output, scale in outputs:
+                if output is image:
+                    return scale
+        for _, proxy, scale in self._proxies.values():
+            if proxy is image:
+                return scale
+        return None
+
+    def _to_preview(self, fn_node: FunctionNode, param: str, value: Any, scales: List[float]) -> Any:
+        """The preview version of a parameter value (appends its scale to scales, if it is an image)"""
+        if not isinstance(value, np.ndarray):
+            return value
+        with self._lock:
+            known_scale = self._preview_scale(value)
+            if known_scale is not None:
+                scales.append(known_scale)
+                return value
+            if value.dtype != np.uint8 or value.ndim not in (2, 3) or max(value.shape[:2]) <= self.max_preview_size:
+                return value
+            fingerprint = image_fingerprint(value)  # type: ignore
+            known_proxy = self._proxies.get((fn_node, param))
+        if known_proxy is not None and known_proxy[0] == fingerprint:
+            _, proxy, scale = known_proxy
+        else:
+            proxy = _downscale(value, self.max_preview_size)  # type: ignore
+            scale = proxy.shape[1] / value.shape[1]
+            with self._lock:
+                self._proxies[(fn_node, param)] = (fingerprint, proxy, scale)
+        scales.append(scale)
+        return proxy
+
+
+def _downscale(image: ImageU8, max_size: int) -> ImageU8:
+    import cv2
+
+    k = max_size / max(image.shape[0], image.shape[1])
+    width = max(round(image.shape[1] * k), 1)
+    height = max(round(image.shape[0] * k), 1)
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)  # type: ignore
+
+
+def _scaled_param(value: Any, scale: float) -> Any:
+    """A scale dependent parameter (in pixels), at the preview scale"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return max(round(value * scale), 1) if value > 0 else value
+    if isinstance(value, float):
+        return value * scale
+    return value
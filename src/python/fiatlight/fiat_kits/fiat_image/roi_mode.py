@@ -0,0 +1,333 @@
+"""ImageRoiMode: evaluate the image functions of a graph only on the region of interest (ROI) that is displayed
+
+When the user zooms into a region of an image, only this region of the outputs is visible: computing the full
+frames of the whole pipeline is wasteful. The ImagePresenter publishes the visible region of its image
+(see ImagePresenter.visible_region), and the functions flagged with the fiat attribute "halo" compute only the
+region that is needed (by their own presenter, and by their downstream functions), plus the halo of pixels
+on which this region depends.
+
+The fiat attribute "halo" is the one set by tiled_parallel: a number of pixels (0 for pointwise functions),
+or a function of the parameters of the call (dict: name -> value):
+
+    @fl.with_fiat_attributes(halo=0)
+    def threshold(image: ImageU8_GRAY, thresh: float = 128.0) -> ImageU8_GRAY:
+        ...
+
+    @fl.with_fiat_attributes(halo=lambda params: params["ksize"] // 2)
+    def median_blur(image: ImageU8, ksize: int = 5) -> ImageU8:
+        ...
+
+The output of a function evaluated on a ROI is a full size image, in which only the computed region is valid.
+The full frame is computed lazily, i.e. only when it is needed: when the view is unzoomed, when it pans outside
+of the computed region, or when the output is used by a function that is not flagged with a halo.
+The computed region is extended by a margin (margin_ratio of its size), so that small pans do not trigger
+a new evaluation. The presenters of the outputs are told which region is valid (ImagePresenter.set_valid_region):
+they show that the image is partial, and compute its statistics on the valid region only.
+
+When ImagePreviewMode is also used (see preview_mode.py), the ROI is not used while previewing:
+the functions then run on the downscaled proxies of the full frames.
+
+Usage:
+    fl.run(graph, params=fl.FiatRunParams(image_roi=True))
+
+or, with any FunctionsGraph:
+    roi_mode = ImageRoiMode(graph)  # or ImageRoiMode(graph, is_previewing=preview_mode.is_previewing)
+    roi_mode.attach()
+    ...
+    roi_mode.heartbeat()   # once per frame: updates the regions, and invokes again the functions when needed
+"""
+
+from fiatlight.fiat_core.functions_graph import FunctionsGraph
+from fiatlight.fiat_core.function_node import FunctionNode
+from fiatlight.fiat_kits.fiat_image.image_gui import ImagePresenter, ImageWithGui
+from fiatlight.fiat_kits.fiat_image.tiled_image import Rect
+from fiatlight.fiat_kits.fiat_image.tiled_parallel import Halo
+from fiatlight.fiat_utils import get_fiat_attribute
+from typing import Any, Callable, Dict, List, Set, Tuple
+import functools
+import inspect
+import threading
+
+import numpy as np
+
+
+class ImageRoiMode:
+    """Evaluate the image functions of a graph only on the displayed region of interest (see module doc)"""
+
+    graph: FunctionsGraph
+    margin_ratio: float
+
+    # True while ImagePreviewMode runs the functions at the preview resolution
+    _is_previewing: Callable[[], bool]
+    # The original _f_impl of the instrumented functions (those with a "halo" fiat attribute)
+    _original_f_impls: Dict[FunctionNode, Callable[..., Any]]
+    # The name of the image parameter of the instrumented functions (their first parameter)
+    _image_params: Dict[FunctionNode, str]
+    # The halo (in pixels) used by the last call of the instrumented functions
+    _halos: Dict[FunctionNode, int]
+    # The region of the output needed by the GUI and by the downstream functions (None: the full frame)
+    _required_regions: Dict[FunctionNode, Rect | None]
+    # The last output of the instrumented functions, and its valid region (None: the full frame)
+    _outputs: Dict[FunctionNode, Tuple[np.ndarray, Rect | None]]
+    # The functions of the graph that were already seen by attach()
+    _known_nodes: Set[FunctionNode]
+    _lock: threading.Lock
+
+    def __init__(
+        self, graph: FunctionsGraph, margin_ratio: float = 0.25, is_previewing: Callable[[], bool] = lambda: False
+    ) -> None:
+        self.graph = graph
+        self.margin_ratio = margin_ratio
+        self._is_previewing = is_previewing
+        self._original_f_impls = {}
+        self._image_params = {}
+        self._halos = {}
+        self._required_regions = {}
+        self._outputs = {}
+        self._known_nodes = set()
+        self._lock = threading.Lock()
+
+    def attach(self) -> None:
+        """Instrument the functions of the graph that have a "halo" fiat attribute
+        (functions added later are instrumented at the next heartbeat)"""
+        for fn_node in self.graph.functions_nodes:
+            if fn_node in self._known_nodes:
+                continue
+            self._known_nodes.add(fn_node)
+            function_with_gui = fn_node.function_with_gui
+            f_impl = function_with_gui._f_impl
+            if f_impl is None or function_with_gui.nb_outputs() != 1:
+                continue
+            halo: Halo | None = get_fiat_attribute(f_impl, "halo", None)
+            if halo is None:
+                continue
+            try:
+                signature = inspect.signature(f_impl)
+            except (TypeError, ValueError):
+                continue
+            if len(signature.parameters) == 0:
+                continue
+            self._original_f_impls[fn_node] = f_impl
+            self._image_params[fn_node] = next(iter(signature.parameters))
+            function_with_gui._f_impl = self._roi_f_impl(fn_node, f_impl, signature, halo)
+
+    def detach(self) -> None:
+        for fn_node, f_impl in self._original_f_impls.items():
+            fn_node.function_with_gui._f_impl = f_impl
+        self._original_f_impls = {}
+        self._image_params = {}
+        self._known_nodes = set()
+
+    def heartbeat(self) -> None:
+        """Shall be called once per frame: updates the required regions, and invokes again the functions
+        whose output does not cover the region that is needed"""
+        if len(self._known_nodes) != len(self.graph.functions_nodes):
+            self.attach()
+        self._update_required_regions()
+        if not self._is_previewing():
+            outdated_nodes = [fn_node for fn_node in self._original_f_impls if not self._is_up_to_date(fn_node)]
+            # Invoke again the first outdated functions: their outputs are propagated downstream
+            for fn_node in outdated_nodes:
+                if not _has_ancestor_in(fn_node, outdated_nodes):
+                    fn_node.on_inputs_changed()
+        self._update_valid_regions()
+
+    def required_region(self, fn_node: FunctionNode) -> Rect | None:
+        """The region of the output of an instrumented function that is needed (None: the full frame)"""
+        return self._required_regions.get(fn_node)
+
+    def computed_region(self, fn_node: FunctionNode) -> Rect | None:
+        """The valid region of the last output of an instrumented function (None: the full frame)"""
+        output = self._outputs.get(fn_node)
+        return None if output is None else output[1]
+
+    def _update_required_regions(self) -> None:
+        required_regions: Dict[FunctionNode, Rect | None] = {}
+
+        def required_region(fn_node: FunctionNode) -> Rect | None:
+            if fn_node in required_regions:
+                return required_regions[fn_node]
+            region = _presented_region(fn_node)
+            for link in fn_node.output_links:
+                if region is None:
+                    break
+                dst_node = link.dst_function_node
+                if dst_node not in self._original_f_impls or link.dst_input_name != self._image_params[dst_node]:
+                    region = None  # a function that needs the full frame
+                    break
+                dst_region = required_region(dst_node)
+                if dst_region is None:
+                    region = None
+                    break
+                region = _union_rect(region, _expand_rect(dst_region, self._halos.get(dst_node, 0)))
+            required_regions[fn_node] = region
+            return region
+
+        for fn_node in self._original_f_impls:
+            required_region(fn_node)
+        self._required_regions = required_regions
+
+    def _update_valid_regions(self) -> None:
+        """Tell the presenters which region of the displayed outputs is valid"""
+        for fn_node in self._original_f_impls:
+            presenter = _image_presenter(fn_node)
+            if presenter is None:
+                continue
+            with self._lock:
+                output = self._outputs.get(fn_node)
+            displayed_image = fn_node.function_with_gui.output(0).value
+            is_displayed = output is not None and output[0] is displayed_image
+            presenter.set_valid_region(output[1] if output is not None and is_displayed else None)
+
+    def _is_up_to_date(self, fn_node: FunctionNode) -> bool:
+        with self._lock:
+            output = self._outputs.get(fn_node)
+        if output is None:
+            return True  # not computed yet
+        image, computed_region = output
+        if computed_region is None:
+            return True
+        required_region = self._required_regions.get(fn_node)
+        if required_region is None:
+            return False
+        height, width = image.shape[:2]
+        return _contains_rect(computed_region, _intersect_rect(required_region, (0, 0, width, height)))
+
+    def _valid_region(self, image: np.ndarray) -> Rect | None:
+        """The valid region of an image, if it is the output of an instrumented function (None: the full frame)"""
+        for output, region in self._outputs.values():
+            if output is image:
+                return region
+        return None
+
+    def _roi_f_impl(
+        self, fn_node: FunctionNode, f_impl: Callable[..., Any], signature: inspect.Signature, halo: Halo
+    ) -> Callable[..., Any]:
+        image_param = self._image_params[fn_node]
+
+        @functools.wraps(f_impl)
+        def f(*args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            image = params.pop(image_param)
+            if not isinstance(image, np.ndarray) or image.ndim not in (2, 3) or self._is_previewing():
+                return f_impl(*args, **kwargs)
+
+            height, width = image.shape[:2]
+            full_rect = (0, 0, width, height)
+            halo_pixels = halo(params) if callable(halo) else halo
+            with self._lock:
+                self._halos[fn_node] = halo_pixels
+                input_region = self._valid_region(image)
+            required_region = self._required_regions.get(fn_node)
+
+            # The region to compute: the required region (with a margin), where the input is valid
+            region = full_rect if required_region is None else self._with_margin(required_region, width, height)
+            if input_region is not None:
+                region = _intersect_rect(region, _shrink_rect(input_region, halo_pixels, width, height))
+            if region == full_rect or region[2] <= 0 or region[3] <= 0:
+                output = f_impl(*args, **kwargs)
+                if isinstance(output, np.ndarray):
+                    with self._lock:
+                        self._outputs[fn_node] = (output, None if region == full_rect else region)
+                return output
+
+            x, y, w, h = _expand_rect(region, halo_pixels, width, height)
+            bound.arguments[image_param] = image[y : y + h, x : x + w]
+            roi_output = f_impl(*bound.args, **bound.kwargs)
+            if self._is_previewing():
+                # The preview started during the call, and the ROI was downscaled: run on the full frame proxy
+                return f_impl(*args, **kwargs)
+            if not isinstance(roi_output, np.ndarray) or roi_output.shape[:2] != (h, w):
+                raise ValueError(
+                    f"ImageRoiMode: {f_impl} should return an image of the same width and height as its input "
+                    f"(got {getattr(roi_output, 'shape', type(roi_output))} for an input of shape ({h}, {w}))"
+                )
+            rx, ry, rw, rh = region
+            output = np.zeros((height, width) + roi_output.shape[2:], dtype=roi_output.dtype)
+            output[ry : ry + rh, rx : rx + rw] = roi_output[ry - y : ry - y + rh, rx - x : rx - x + rw]
+            with self._lock:
+                self._outputs[fn_node] = (output, region)
+            return output
+
+        return f
+
+    def _with_margin(self, region: Rect, width: int, height: int) -> Rect:
+        margin = round(max(region[2], region[3]) * self.margin_ratio)
+        return _expand_rect(region, margin, width, height)
+
+
+def _image_presenter(fn_node: FunctionNode) -> ImagePresenter | None:
+    """The presenter of the output of a function, if it is an image"""
+    function_with_gui = fn_node.function_with_gui
+    if function_with_gui.nb_outputs() != 1:
+        return None
+    output_with_gui = function_with_gui.output(0)
+    if not isinstance(output_with_gui, ImageWithGui):
+        return None
+    return output_with_gui.image_presenter
+
+
+def _presented_region(fn_node: FunctionNode) -> Rect | None:
+    """The region of the output of a function that is visible in its presenter (None: the full frame)"""
+    presenter = _image_presenter(fn_node)
+    return None if presenter is None else presenter.visible_region()
+
+
+def _has_ancestor_in(fn_node: FunctionNode, nodes: List[FunctionNode]) -> bool:
+    visited: Set[FunctionNode] = set()
+    to_visit = [link.src_function_node for link in fn_node.input_links]
+    while len(to_visit) > 0:
+        node = to_visit.pop()
+        if node in nodes:
+            return True
+        if node not in visited:
+            visited.add(node)
+            to_visit.extend(link.src_function_node for link in node.input_links)
+    return False
+
+
+class _RectSection:  # Dummy class to create a section in the IDE # noqa
+    """
+    # --------------------------------------------------------------------------------------------
+    #        Rect utilities (x, y, width, height)
+    # --------------------------------------------------------------------------------------------
+    """
+
+    pass
+
+
+def _intersect_rect(a: Rect, b: Rect) -> Rect:
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    return x0, y0, max(x1 - x0, 0), max(y1 - y0, 0)
+
+
+def _union_rect(a: Rect, b: Rect) -> Rect:
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _contains_rect(outer: Rect, inner: Rect) -> bool:
+    return _intersect_rect(outer, inner) == inner
+
+
+def _expand_rect(rect: Rect, margin: int, width: int | None = None, height: int | None = None) -> Rect:
+    """Extend a rect by margin pixels on each side (clipped to the image, if its size is given)"""
+    expanded = rect[0] - margin, rect[1] - margin, rect[2] + 2 * margin, rect[3] + 2 * margin
+    if width is None or height is None:
+        return expanded
+    return _intersect_rect(expanded, (0, 0, width, height))
+
+
+def _shrink_rect(rect: Rect, margin: int, width: int, height: int) -> Rect:
+    """Shrink a rect by margin pixels on each side, except on the sides that lie on the border of the image
+    (i.e. the region of a neighbourhood operation's output that can be computed from this region of its input)"""
+    x0, y0, x1, y1 = rect[0], rect[1], rect[0] + rect[2], rect[1] + rect[3]
+    x0 = x0 if x0 <= 0 else x0 + margin
+    y0 = y0 if y0 <= 0 else y0 + margin
+    x1 = x1 if x1 >= width else x1 - margin
+    y1 = y1 if y1 >= height else y1 - margin
+    return x0, y0, max(x1 - x0, 0), max(y1 - y0, 0)
@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+
+from fiatlight.fiat_kits.fiat_image.camera_image_provider import CameraCaptureThread
+
+
+class _FakeVideoCapture:
+    """Produces BGR frames whose pixels are equal to the frame number"""
+
+    nb_frames: int = 0
+
+    def grab(self) -> bool:
+        self.nb_frames += 1
+        return True
+
+    def retrieve(self, image: np.ndarray | None = None) -> tuple[bool, np.ndarray]:
+        if image is None or image.shape != (48, 64, 3):
+            image = np.empty((48, 64, 3), dtype=np.uint8)
+        image[:, :, 0] = self.nb_frames % 256
+        image[:, :, 1:] = 0
+        return True, image
+
+
+def _wait_for_frames(capture_thread: CameraCaptureThread, nb_frames: int) -> None:
+    while capture_thread.capture_stats.nb_frames < nb_frames:
+        time.sleep(0.001)
+
+
+def test_capture_thread() -> None:
+    capture_thread = CameraCaptureThread(_FakeVideoCapture(), nb_slots=3, max_fps=500.0)
+    assert capture_thread.newest_frame() is None
+    capture_thread.start()
+    _wait_for_frames(capture_thread, 5)
+
+    # The frames are converted to RGB
+    frame = capture_thread.newest_frame()
+    assert frame is not None
+    assert frame.shape == (48, 64, 3)
+    assert frame[0, 0, 0] == 0 and frame[0, 0, 2] > 0
+
+    # A frame that is still referenced is never overwritten
+    frame_copy = frame.copy()
+    _wait_for_frames(capture_thread, capture_thread.capture_stats.nb_frames + 10)
+    assert np.array_equal(frame, frame_copy)
+    assert capture_thread.newest_frame() is not frame
+
+    capture_thread.stop()
+    assert not capture_thread.is_running()
+    assert capture_thread.capture_stats.fps() > 0.0
+    assert capture_thread.delivery_stats.nb_frames == 2
+    # Most frames were never delivered
+    assert capture_thread.nb_dropped > 0
+    assert "Dropped" in capture_thread.stats_report()
+
+
+def test_capture_thread_when_consumer_keeps_references() -> None:
+    # e.g. a cache of the displayed images: the capture shall not be blocked by the delivered frames
+    capture_thread = CameraCaptureThread(_FakeVideoCapture(), nb_slots=3, max_fps=1000.0)
+    capture_thread.start()
+    kept_frames: list[np.ndarray] = []
+    kept_frames_copies: list[np.ndarray] = []
+    start = time.time()
+    while len(kept_frames) < 20 and time.time() - start < 5.0:
+        frame = capture_thread.newest_frame()
+        if frame is not None and (len(kept_frames) == 0 or frame is not kept_frames[-1]):
+            kept_frames.append(frame)
+            kept_frames_copies.append(frame.copy())
+        time.sleep(0.002)
+    capture_thread.stop()
+
+    # New frames were delivered, although all the previous ones are still referenced
+    assert len(kept_frames) == 20
+    assert capture_thread.delivery_stats.nb_frames == 20
+    # and the kept frames were never overwritten
+    for kept_frame, kept_frame_copy in zip(kept_frames, kept_frames_copies):
+        assert np.array_equal(kept_frame, kept_frame_copy)
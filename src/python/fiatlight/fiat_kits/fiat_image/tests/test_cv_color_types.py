@@ -1,3 +1,7 @@
+import cv2
+import numpy as np
+import pytest
+
 from fiatlight.fiat_kits.fiat_image import cv_color_type
 
 
@@ -5,3 +9,49 @@ def test_truc() -> None:
     color = cv_color_type.ColorType.BGR
     outputs = color.available_conversion_outputs()
     print(outputs)
+
+
+def _random_image(color_type: cv_color_type.ColorType) -> np.ndarray:
+    shape = (40, 50) if color_type == cv_color_type.ColorType.Gray else (40, 50, len(color_type.channels_names()))
+    return np.random.randint(0, 255, shape, dtype=np.uint8)
+
+
+def test_conversion_outputs() -> None:
+    ColorType = cv_color_type.ColorType
+    assert ColorType.Gray.available_conversion_outputs() == [
+        ColorType.BGR,
+        ColorType.BGRA,
+        ColorType.RGB,
+        ColorType.RGBA,
+    ]
+    assert ColorType.HSV not in ColorType.Gray.available_conversion_outputs()
+    for color_type in ColorType:
+        assert color_type not in color_type.available_conversion_outputs()
+
+
+def test_simplify_color_chain() -> None:
+    ColorType = cv_color_type.ColorType
+    simplify = cv_color_type.simplify_color_chain
+    assert simplify([ColorType.RGB, ColorType.BGR, ColorType.Gray]) == [ColorType.RGB, ColorType.Gray]
+    assert simplify([ColorType.BGR, ColorType.RGB, ColorType.BGR]) == [ColorType.BGR]
+    assert simplify([ColorType.BGR, ColorType.BGRA, ColorType.BGR]) == [ColorType.BGR]
+    # Lossy conversions are kept
+    assert simplify([ColorType.BGRA, ColorType.BGR, ColorType.BGRA]) == [ColorType.BGRA, ColorType.BGR, ColorType.BGRA]
+    assert simplify([ColorType.BGR, ColorType.HSV, ColorType.BGR]) == [ColorType.BGR, ColorType.HSV, ColorType.BGR]
+    assert simplify([ColorType.BGR, ColorType.HSV, ColorType.RGB], exact=False) == [ColorType.BGR, ColorType.RGB]
+
+
+def test_convert_color_chain_is_exact() -> None:
+    ColorType = cv_color_type.ColorType
+    # All the chains of 3 color types: the simplified chain gives the same result as the step by step conversion
+    for type1 in ColorType:
+        image = _random_image(type1)
+        for type2 in type1.available_conversion_outputs():
+            for type3 in type2.available_conversion_outputs():
+                codes = cv_color_type._CONVERSION_CODES
+                expected = cv2.cvtColor(cv2.cvtColor(image, codes[(type1, type2)]), codes[(type2, type3)])
+                r = cv_color_type.convert_color_chain(image, [type1, type2, type3])  # type: ignore
+                assert np.array_equal(r, expected), (type1, type2, type3)
+
+    with pytest.raises(ValueError):
+        cv_color_type.convert_color_chain(_random_image(ColorType.Gray), [ColorType.Gray, ColorType.HSV])  # type: ignore
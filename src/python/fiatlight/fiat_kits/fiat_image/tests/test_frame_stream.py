@@ -0,0 +1,135 @@
+import time
+
+import numpy as np
+
+from fiatlight.fiat_core.functions_graph import FunctionsGraph
+from fiatlight.fiat_kits.fiat_image.frame_stream import (
+    DropOldestQueue,
+    FrameStreamPipeline,
+    stages_from_functions_graph,
+    _StampedFrame,
+)
+from fiatlight.fiat_kits.fiat_image.image_types import ImageU8, Image
+
+
+def _make_reader(nb_frames: int):  # type: ignore
+    frames = iter(range(nb_frames))
+
+    def read_frame() -> ImageU8 | None:
+        i = next(frames, None)
+        if i is None:
+            return None
+        return np.full((4, 4), i, dtype=np.uint8)  # type: ignore
+
+    return read_frame
+
+
+def _wait_until_done(pipeline: FrameStreamPipeline, timeout: float = 5.0) -> None:
+    start = time.time()
+    while pipeline.is_running() and time.time() - start < timeout:
+        time.sleep(0.01)
+
+
+def test_drop_oldest_queue() -> None:
+    q = DropOldestQueue(2)
+    for i in range(4):
+        q.put(_StampedFrame(frame=np.full((1, 1), i, dtype=np.uint8), source_time=0.0))  # type: ignore
+    assert q.nb_dropped == 2
+    item = q.get(timeout=0.0)
+    assert item is not None and item.frame[0, 0] == 2
+
+
+def test_pipeline_processes_frames_in_order() -> None:
+    def add_one(image: Image) -> Image:
+        return image + 1  # type: ignore
+
+    def times_two(image: Image) -> Image:
+        return image * 2  # type: ignore
+
+    # A large queue: no frame is dropped
+    pipeline = FrameStreamPipeline(_make_reader(20), [("add_one", add_one), ("times_two", times_two)], queue_size=50)
+    pipeline.start()
+    _wait_until_done(pipeline)
+    pipeline.stop()
+
+    assert pipeline.is_source_finished()
+    assert pipeline.nb_dropped_frames() == [0, 0]
+    assert [stats.nb_frames for stats in pipeline.stages_stats] == [20, 20]
+    latest = pipeline.latest_frame()
+    assert latest is not None and latest[0, 0] == (19 + 1) * 2
+    assert "times_two" in pipeline.stats_report()
+
+
+def test_pipeline_drops_oldest_frames_when_stage_is_slow() -> None:
+    def slow(image: Image) -> Image:
+        time.sleep(0.01)
+        return image
+
+    pipeline = FrameStreamPipeline(_make_reader(50), [("slow", slow)], queue_size=1)
+    pipeline.start()
+    _wait_until_done(pipeline)
+    pipeline.stop()
+
+    nb_processed = pipeline.stages_stats[0].nb_frames
+    assert nb_processed + pipeline.nb_dropped_frames()[0] == 50
+    assert nb_processed < 50
+    # The last frame is never dropped
+    latest = pipeline.latest_frame()
+    assert latest is not None and latest[0, 0] == 49
+
+
+def test_stages_from_functions_graph() -> None:
+    def source() -> ImageU8:
+        return np.zeros((2, 2), dtype=np.uint8)  # type: ignore
+
+    def add_value(image: ImageU8, value: int = 3) -> ImageU8:
+        return image + value  # type: ignore
+
+    graph = FunctionsGraph.from_function_composition([source, add_value])
+    stages = stages_from_functions_graph(graph, "source")
+    assert [name for name, _ in stages] == ["add_value"]
+    graph.function_with_gui_of_name("add_value").set_param_value("value", 5)
+    _, process = stages[0]
+    assert process(np.zeros((2, 2), dtype=np.uint8))[0, 0] == 5  # type: ignore
+
+
+def test_pipeline_stop_closes_the_source() -> None:
+    import cv2
+    import os
+    import tempfile
+    from fiatlight.fiat_kits.fiat_image.frame_stream import video_capture_reader
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_file = os.path.join(tmp_dir, "video.avi")
+        writer = cv2.VideoWriter(video_file, cv2.VideoWriter.fourcc(*"MJPG"), 10, (16, 16))
+        for i in range(100):
+            writer.write(np.full((16, 16, 3), i, dtype=np.uint8))
+        writer.release()
+
+        reader = video_capture_reader(video_file)
+        # A slow source: the pipeline is stopped before the end of the video
+        pipeline = FrameStreamPipeline(reader, [], max_source_fps=20)
+        pipeline.start()
+        time.sleep(0.1)
+        assert not reader.is_closed()
+        pipeline.stop()
+        assert not pipeline.is_source_finished()
+        assert reader.is_closed()
+        assert reader() is None
+
+
+def test_upstream_is_empty_when_the_last_frame_is_published_while_exiting() -> None:
+    pipeline = FrameStreamPipeline(_make_reader(0), [("identity", lambda image: image)])
+
+    class _ThreadPublishingItsLastFrame:
+        # A source thread that publishes its last frame, and exits, between the checks of _upstream_is_empty
+        def is_alive(self) -> bool:
+            pipeline._queues[0].put(_StampedFrame(frame=np.zeros((1, 1), dtype=np.uint8), source_time=0.0))  # type: ignore
+            return False
+
+    pipeline._threads = [_ThreadPublishingItsLastFrame()]  # type: ignore
+    assert not pipeline._upstream_is_empty(0)
+    pipeline._threads = []
+    assert not pipeline._upstream_is_empty(0)
+    assert pipeline._queues[0].get(timeout=0.0) is not None
+    assert pipeline._upstream_is_empty(0)
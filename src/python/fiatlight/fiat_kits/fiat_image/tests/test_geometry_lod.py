@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+from fiatlight.fiat_kits.fiat_image.geometry_lod import (
+    POINTS_COLOR,
+    bin_points,
+    cached_for_value,
+    forget_value,
+    render_contours,
+    render_points,
+    simplify_contours,
+)
+
+
+def _noisy_circle(nb_points: int) -> np.ndarray:
+    angles = np.linspace(0, 2 * np.pi, nb_points, endpoint=False)
+    radius = 300 + np.random.uniform(-0.4, 0.4, nb_points)
+    xy = np.stack([400 + radius * np.cos(angles), 400 + radius * np.sin(angles)], axis=1)
+    return np.round(xy).astype(np.int32).reshape(-1, 1, 2)
+
+
+def test_simplify_contours() -> None:
+    circle = _noisy_circle(5000)
+    tiny = np.array([[[10, 10]], [[11, 10]], [[11, 11]], [[10, 11]]], dtype=np.int32)
+    simplified = simplify_contours([circle, tiny], epsilon=2.0)
+    assert simplified[0].shape[0] < 100
+    assert simplified[1].shape == (1, 1, 2)
+    # The simplified contour stays within epsilon of the original one
+    for point in circle[::50]:
+        distance = abs(cv2.pointPolygonTest(simplified[0], (float(point[0, 0]), float(point[0, 1])), True))
+        assert distance <= 2.0 + 1e-6
+
+
+def test_bin_points() -> None:
+    points = np.array([[0, 0], [3, 3], [10, 0], [11, 1], [25, 27]], dtype=np.int32)
+    bins = bin_points(points, scale=0.1)
+    assert sorted(map(tuple, bins)) == [(0, 0), (1, 0), (2, 2)]
+
+
+def test_render_thumbnails() -> None:
+    contours = [_noisy_circle(200_000)] + [np.array([[[x, 700]]], dtype=np.int32) for x in range(0, 700, 7)]
+    thumbnail = render_contours(contours, 200)
+    assert thumbnail.shape == (200, 200, 3)
+    assert thumbnail.any()
+
+    points = np.random.randint(0, 1000, (100_000, 2)).astype(np.int32)
+    thumbnail = render_points(points, 100)
+    assert thumbnail.shape == (100, 100, 3)
+    assert (thumbnail == POINTS_COLOR).all(axis=2).mean() > 0.9
+
+    # The thumbnails are cached per value
+    assert cached_for_value(points, "thumbnail", lambda: render_points(points, 100)) is cached_for_value(
+        points, "thumbnail", lambda: render_points(points, 100)
+    )
+
+
+def test_forget_value_modified_in_place() -> None:
+    points = np.array([[0, 0], [10, 10]], dtype=np.int32)
+    assert cached_for_value(points, "max", lambda: int(points.max())) == 10
+    points[1] = (20, 20)
+    # The value is set again (on_change): what was cached for it is forgotten
+    forget_value(points)
+    assert cached_for_value(points, "max", lambda: int(points.max())) == 20
@@ -0,0 +1,96 @@
+import numpy as np
+
+from fiatlight.fiat_kits.fiat_image.image_types import ImageFloat_1, ImageU8_1, ImageU8_3
+from fiatlight.fiat_kits.fiat_image.image_pyramid import ImagePyramid, image_fingerprint, rescale_zoom_pan_matrix
+
+
+def test_pyramid_levels() -> None:
+    image = ImageU8_3(np.random.randint(0, 255, (600, 1001, 3), dtype=np.uint8))
+    pyramid = ImagePyramid(image, min_level_size=64)
+    assert pyramid.nb_levels() == 4
+    assert [pyramid.level_size(i) for i in range(4)] == [(1001, 600), (501, 300), (251, 150), (126, 75)]
+    assert len(pyramid._levels) == 1  # levels are computed lazily
+
+    level_2 = pyramid.level(2)
+    assert level_2.shape == (150, 251, 3)
+    assert level_2.dtype == np.uint8
+    assert pyramid.level(2) is level_2
+
+    # INTER_AREA: a level is the average of the pixels of the previous one
+    level_1 = pyramid.level(1).astype(float)
+    assert abs(level_1.mean() - image.astype(float).mean()) < 1.0
+
+    # 1-channel images keep their channel axis
+    assert ImagePyramid(ImageU8_1(image[:, :, :1])).level(1).shape == (300, 501, 1)
+
+
+def test_pyramid_level_selection() -> None:
+    image = ImageFloat_1(np.zeros((2400, 3200), dtype=np.float32))
+    pyramid = ImagePyramid(image)
+    assert pyramid.level_index_for_display_size(0, 0) == 0
+    assert pyramid.level_index_for_display_size(200, 0) == 4  # 200 wide
+    assert pyramid.level_for_display_size(200, 0).shape == (150, 200)
+    assert pyramid.level_index_for_display_size(201, 0) == 3
+    assert pyramid.level_index_for_display_size(0, 1000) == 1
+
+    # Displayed at level 4 (200 pixels wide), with a zoom factor of 1 on this level:
+    assert pyramid.level_index_for_zoom(4, 1.0, 200, 0) == 4
+    # zoomed x4: level 2 pixels are displayed at scale 1
+    assert pyramid.level_index_for_zoom(4, 4.0, 200, 0) == 2
+    # zoomed x100: full resolution
+    assert pyramid.level_index_for_zoom(4, 100.0, 200, 0) == 0
+
+
+def test_pyramid_unsupported_dtype() -> None:
+    pyramid = ImagePyramid(np.zeros((1000, 1000), dtype=bool))  # type: ignore
+    assert pyramid.nb_levels() == 1
+    assert pyramid.level_for_display_size(100, 100) is pyramid.image
+
+
+def test_image_fingerprint() -> None:
+    image = ImageU8_3(np.zeros((100, 100, 3), dtype=np.uint8))
+    assert image_fingerprint(image) == image_fingerprint(image)
+    assert image_fingerprint(image) != image_fingerprint(ImageU8_3(image.copy()))
+    assert image_fingerprint(image) != image_fingerprint(ImageU8_3(image[:, :, :2]))
+    # An image modified in place gets a new fingerprint
+    fingerprint = image_fingerprint(image)
+    image[50, 50, 0] = 1
+    assert image_fingerprint(image) != fingerprint
+
+
+def test_rescale_zoom_pan_matrix() -> None:
+    # Full view of a 200x100 image displayed at 100x50, then the same view of a 50x25 version of it
+    matrix = [[0.5, 0.0, 10.0], [0.0, 0.5, 20.0], [0.0, 0.0, 1.0]]
+    rescaled = rescale_zoom_pan_matrix(matrix, (200, 100), (50, 25))
+    assert rescaled == [[2.0, 0.0, 10.0], [0.0, 2.0, 20.0], [0.0, 0.0, 1.0]]
+
+
+def test_presenter_keeps_pyramid_of_same_image() -> None:
+    from fiatlight.fiat_kits.fiat_image.image_gui import ImagePresenter
+
+    presenter = ImagePresenter()
+    image = ImageU8_3(np.zeros((1000, 1000, 3), dtype=np.uint8))
+    presenter.set_image(image)
+    pyramid = presenter.pyramid
+    presenter.need_refresh_cache_per_view.set_for_all_views(False)
+    presenter.set_image(image)
+    assert presenter.pyramid is pyramid
+    assert not presenter.need_refresh_cache_per_view.default_value
+
+    presenter.set_image(ImageU8_3(image.copy()))
+    assert presenter.pyramid is not pyramid
+    assert presenter.need_refresh_cache_per_view.default_value
+
+
+def test_presenter_refreshes_image_modified_in_place() -> None:
+    # e.g. a function that draws on its input, and returns it
+    from fiatlight.fiat_kits.fiat_image.image_gui import ImagePresenter
+
+    presenter = ImagePresenter()
+    image = ImageU8_3(np.zeros((1000, 1000, 3), dtype=np.uint8))
+    presenter.set_image(image)
+    assert presenter.pyramid is not None
+    assert presenter.pyramid.level(1).max() == 0
+    image[:] = 255
+    presenter.set_image(image)
+    assert presenter.pyramid.level(1).max() == 255
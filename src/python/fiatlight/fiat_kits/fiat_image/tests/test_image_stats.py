@@ -0,0 +1,56 @@
+import numpy as np
+
+from fiatlight.fiat_kits.fiat_image.image_stats import compute_image_stats, image_stats
+from fiatlight.fiat_kits.fiat_image.image_types import ImageFloat_1, ImageU8_3
+
+
+def test_image_stats_uint8() -> None:
+    image = ImageU8_3(np.random.randint(0, 256, (300, 400, 3), dtype=np.uint8))
+    image[0, 0, 1] = 255
+    image[0, 1, 1] = 0
+    stats = compute_image_stats(image)
+    assert not stats.is_sampled()
+    for i, channel_stats in enumerate(stats.channels):
+        channel = image[:, :, i]
+        assert channel_stats.min == channel.min() and channel_stats.max == channel.max()
+        assert abs(channel_stats.mean - channel.mean()) < 1e-6
+        assert abs(channel_stats.stddev - channel.std()) < 1e-6
+        expected_histogram = np.bincount(channel.ravel(), minlength=256)
+        assert np.allclose(channel_stats.histogram, expected_histogram / expected_histogram.max())
+
+    # Cached per image fingerprint
+    assert image_stats(image) is image_stats(image)
+    assert image_stats(image) is not image_stats(ImageU8_3(image.copy()))
+    # An image modified in place gets new stats
+    image[:] = 3
+    assert image_stats(image).channels[0].max == 3
+
+
+def test_image_stats_cache_does_not_keep_images() -> None:
+    import gc
+    import weakref
+
+    image = ImageU8_3(np.zeros((100, 100, 3), dtype=np.uint8))
+    image_ref = weakref.ref(image)
+    stats = image_stats(image)
+    del image
+    gc.collect()
+    assert image_ref() is None
+    # A new image, possibly with the same id and data pointer, does not reuse the stats of the released one
+    image_2 = ImageU8_3(np.full((100, 100, 3), 7, dtype=np.uint8))
+    assert image_stats(image_2) is not stats
+    assert image_stats(image_2).channels[0].mean == 7.0
+
+
+def test_image_stats_sampled_float() -> None:
+    image = ImageFloat_1(np.random.normal(10.0, 2.0, (2000, 1500)).astype(np.float32))
+    image[1, 1] = -100.0  # not in the sample, but the min is computed on the full image
+    stats = compute_image_stats(image, nb_bins=64, max_sampled_pixels=100_000)
+    assert stats.is_sampled()
+    assert stats.nb_sampled_pixels <= 100_000
+    channel_stats = stats.channels[0]
+    assert channel_stats.min == -100.0
+    assert abs(channel_stats.mean - 10.0) < 0.1
+    assert abs(channel_stats.stddev - 2.0) < 0.1
+    assert channel_stats.histogram.shape == (64,)
+    assert channel_stats.histogram_range == (-100.0, float(image.max()))
@@ -0,0 +1,56 @@
+import numpy as np
+
+from fiatlight.fiat_core.file_writer import background_file_writer
+from fiatlight.fiat_kits.fiat_image.image_to_from_file_gui import ImageEncodingParams, ImageToFileGui, encode_image_rgb
+from fiatlight.fiat_kits.fiat_image.image_types import ImageRgb, ImageRgba, ImageU8_3, ImageU8_4
+from fiatlight.fiat_kits.fiat_image.imread_rgb import imread_rgb
+
+
+def test_image_to_file_gui(tmp_path) -> None:  # type: ignore
+    image = ImageRgb(ImageU8_3(np.random.randint(0, 255, (60, 80, 3), dtype=np.uint8)))
+    image_to_file = ImageToFileGui()
+    image_to_file.f(image)
+
+    # PNG is lossless, whatever the compression level
+    image_to_file.encoding_params = ImageEncodingParams(png_compression=9)
+    path = str(tmp_path / "image.png")
+    image_to_file.do_write(path)  # type: ignore
+    background_file_writer().flush()
+    assert np.array_equal(imread_rgb(path, use_cache=False), image)
+
+    # Export on change: each new image is written to the last selected file
+    image_to_file.export_on_change = True
+    image2 = ImageRgb(ImageU8_3(255 - image))
+    image_to_file.f(image2)
+    background_file_writer().flush()
+    assert np.array_equal(imread_rgb(path, use_cache=False), image2)
+
+    # The JPEG quality is applied
+    sizes = []
+    for quality in (10, 95):
+        image_to_file.encoding_params.jpeg_quality = quality
+        image_to_file.do_write(str(tmp_path / f"image_{quality}.jpg"))  # type: ignore
+        background_file_writer().flush()
+        sizes.append((tmp_path / f"image_{quality}.jpg").stat().st_size)
+    assert sizes[0] < sizes[1]
+
+
+def test_encode_image_rgb_round_trip() -> None:
+    import cv2
+
+    # Pure red images: the channels must be swapped to BGR (or BGRA) before encoding
+    red_rgb = np.zeros((8, 10, 3), dtype=np.uint8)
+    red_rgb[:, :, 0] = 255
+    red_rgba = np.zeros((8, 10, 4), dtype=np.uint8)
+    red_rgba[:, :, 0] = 128
+    red_rgba[:, :, 3] = 200
+    cases: list[tuple[ImageRgb | ImageRgba, list[int]]] = [
+        (ImageRgb(ImageU8_3(red_rgb)), [0, 0, 255]),
+        (ImageRgba(ImageU8_4(red_rgba)), [0, 0, 128, 200]),
+    ]
+    for image, expected_bgr in cases:
+        encoded = encode_image_rgb(image, "image.png", ImageEncodingParams())
+        decoded = cv2.imdecode(np.frombuffer(encoded, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        assert decoded is not None
+        assert decoded.shape == image.shape
+        assert np.all(decoded == np.array(expected_bgr, dtype=np.uint8))
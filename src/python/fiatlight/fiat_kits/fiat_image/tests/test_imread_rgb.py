@@ -0,0 +1,106 @@
+import os
+
+import cv2
+import numpy as np
+
+from fiatlight.fiat_kits.fiat_image.imread_rgb import (
+    _DECODED_IMAGES_CACHE,
+    clear_imread_rgb_cache,
+    imread_rgb,
+    next_images_in_folder,
+    prefetch_next_images_in_folder,
+    set_imread_rgb_cache_max_bytes,
+)
+
+
+def _write_png(path: str, shape: tuple[int, int] = (300, 400), value: int = 0) -> np.ndarray:
+    image_bgr = np.random.randint(0, 255, (*shape, 3), dtype=np.uint8)
+    image_bgr[0, 0] = value
+    cv2.imwrite(path, image_bgr)
+    return image_bgr
+
+
+def test_imread_rgb_cache(tmp_path) -> None:  # type: ignore
+    clear_imread_rgb_cache()
+    path = str(tmp_path / "a.png")
+    image_bgr = _write_png(path)
+
+    image = imread_rgb(path, use_cache=True)
+    assert np.array_equal(image, image_bgr[:, :, ::-1])
+    assert imread_rgb(path, use_cache=True) is image
+    assert not image.flags.writeable
+    assert imread_rgb(path, use_cache=False) is not image
+    assert imread_rgb(path, use_cache=False).flags.writeable
+
+    # Resized images are cached with their resize target, the full size image is not decoded again
+    small = imread_rgb(path, use_cache=True, max_image_size=100)
+    assert small.shape == (75, 100, 3)
+    assert imread_rgb(path, use_cache=True, max_image_size=100) is small
+    assert imread_rgb(path, use_cache=True, max_image_size=1000) is image
+
+    # A modified file is decoded again
+    _write_png(path, value=255)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    image_2 = imread_rgb(path, use_cache=True)
+    assert image_2 is not image
+    assert image_2[0, 0, 0] == 255
+
+
+def test_imread_rgb_is_writable_by_default(tmp_path) -> None:  # type: ignore
+    clear_imread_rgb_cache()
+    path = str(tmp_path / "a.png")
+    _write_png(path)
+    image = imread_rgb(path)
+    assert image.flags.writeable
+    cv2.rectangle(image, (10, 10), (50, 50), (255, 0, 0), 2)
+    assert imread_rgb(path) is not image
+    assert len(_DECODED_IMAGES_CACHE) == 0
+
+
+def test_imread_rgb_cache_is_bounded(tmp_path) -> None:  # type: ignore
+    clear_imread_rgb_cache()
+    image_bytes = 300 * 400 * 3
+    set_imread_rgb_cache_max_bytes(3 * image_bytes)
+    try:
+        for i in range(5):
+            path = str(tmp_path / f"{i}.png")
+            _write_png(path)
+            imread_rgb(path, use_cache=True)
+        assert len(_DECODED_IMAGES_CACHE) == 3
+        assert _DECODED_IMAGES_CACHE.nb_bytes == 3 * image_bytes
+    finally:
+        set_imread_rgb_cache_max_bytes(512 * 1024 * 1024)
+
+
+def test_prefetch_next_images_in_folder(tmp_path) -> None:  # type: ignore
+    clear_imread_rgb_cache()
+    for name in ["c.jpg", "a.png", "b.png", "notes.txt"]:
+        if name.endswith(".txt"):
+            (tmp_path / name).write_text("not an image")
+        else:
+            _write_png(str(tmp_path / name))
+    folder = str(tmp_path)
+    assert next_images_in_folder(os.path.join(folder, "a.png"), 5) == [
+        os.path.join(folder, "b.png"),
+        os.path.join(folder, "c.jpg"),
+    ]
+
+    futures = prefetch_next_images_in_folder(os.path.join(folder, "a.png"), count=1, max_image_size=200)
+    assert len(futures) == 1
+    prefetched = futures[0].result()
+    assert imread_rgb(os.path.join(folder, "b.png"), max_image_size=200, use_cache=True) is prefetched
+
+
+def test_image_source_returns_a_writable_image(tmp_path) -> None:  # type: ignore
+    from fiatlight.fiat_kits.fiat_image.image_gui import image_source
+    from fiatlight.fiat_types.file_types import FilePath, ImagePath
+
+    clear_imread_rgb_cache()
+    path = str(tmp_path / "a.png")
+    image_bgr = _write_png(path)
+    image = image_source(ImagePath(FilePath(path)))
+    assert np.array_equal(image, image_bgr[:, :, ::-1])
+    # A downstream function may draw on it, without modifying the cached image
+    image[:] = 0
+    assert np.array_equal(imread_rgb(path, use_cache=True), image_bgr[:, :, ::-1])
@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+
+from fiatlight.fiat_kits.fiat_image.cv_color_type import ColorType
+from fiatlight.fiat_kits.fiat_image.image_types import ImageU8_1, ImageU8_3, ImageU8_4
+from fiatlight.fiat_kits.fiat_image.lut_functions import lut_channels_in_colorspace, lut_channels_with_params
+from fiatlight.fiat_kits.fiat_image.lut_types import LutParams
+
+
+_LUT_PARAMS = [
+    LutParams(pow_exponent=0.5),
+    LutParams(min_in=0.2, max_in=0.8),
+    LutParams(min_out=0.1, max_out=0.9),
+    LutParams(pow_exponent=2.0, max_out=0.5),
+]
+
+
+def _lut_channels_reference(image: np.ndarray, lut_params: list[LutParams]) -> np.ndarray:
+    channels = cv2.split(image)
+    return cv2.merge([cv2.LUT(c, lut_params[i].to_table()) for i, c in enumerate(channels)])
+
+
+def test_table_is_cached() -> None:
+    table = LutParams(pow_exponent=0.7).to_table()
+    assert LutParams(pow_exponent=0.7).to_table() is table
+    assert not table.flags.writeable
+
+
+def test_lut_channels_with_params() -> None:
+    for nb_channels in (3, 4):
+        image = np.random.randint(0, 255, (50, 60, nb_channels), dtype=np.uint8)
+        r = lut_channels_with_params(ImageU8_4(image), *_LUT_PARAMS)
+        assert np.array_equal(r, _lut_channels_reference(image, _LUT_PARAMS))
+    gray = np.random.randint(0, 255, (50, 60), dtype=np.uint8)
+    r = lut_channels_with_params(ImageU8_1(gray), _LUT_PARAMS[0])
+    assert np.array_equal(r, cv2.LUT(gray, _LUT_PARAMS[0].to_table()))
+
+
+def test_lut_channels_in_colorspace() -> None:
+    image = np.random.randint(0, 255, (50, 60, 3), dtype=np.uint8)
+    for color_space_lut in (ColorType.BGR, ColorType.RGB, ColorType.HSV):
+        r = lut_channels_in_colorspace(
+            ImageU8_3(image),
+            _LUT_PARAMS[0],
+            _LUT_PARAMS[1],
+            _LUT_PARAMS[2],
+            color_space_src=ColorType.BGR,
+            color_space_lut=color_space_lut,
+        )
+        # Reference: convert, apply the LUT, convert back
+        if color_space_lut == ColorType.BGR:
+            expected = _lut_channels_reference(image, _LUT_PARAMS)
+        elif color_space_lut == ColorType.RGB:
+            expected = cv2.cvtColor(
+                _lut_channels_reference(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), _LUT_PARAMS), cv2.COLOR_RGB2BGR
+            )
+        else:
+            expected = cv2.cvtColor(
+                _lut_channels_reference(cv2.cvtColor(image, cv2.COLOR_BGR2HSV_FULL), _LUT_PARAMS),
+                cv2.COLOR_HSV2BGR_FULL,
+            )
+        assert np.array_equal(r, expected)
@@ -0,0 +1,74 @@
+import time
+
+import numpy as np
+
+import fiatlight as fl
+from fiatlight.fiat_core import FunctionsGraph
+from fiatlight.fiat_kits.fiat_image.image_types import ImageU8_3
+from fiatlight.fiat_kits.fiat_image.preview_mode import ImagePreviewMode
+
+
+def test_preview_mode() -> None:
+    blur_calls: list[tuple[tuple[int, ...], float]] = []
+
+    @fl.with_fiat_attributes(preview_scaled_params=["sigma"])
+    def blur(image: ImageU8_3, sigma: float = 4.0) -> ImageU8_3:
+        blur_calls.append((image.shape, sigma))
+        return image.copy()
+
+    def invert(image: ImageU8_3) -> ImageU8_3:
+        return 255 - image  # type: ignore
+
+    interacting = True
+    graph = FunctionsGraph.from_function_composition([blur, invert])
+    preview_mode = ImagePreviewMode(
+        graph, max_preview_size=100, settle_seconds=0.05, is_interacting=lambda: interacting
+    )
+    preview_mode.attach()
+    blur_node = graph._function_node_with_name_or_is_function(blur)
+    invert_fn = graph._function_node_with_name("invert").function_with_gui
+
+    def invert_output_shape() -> tuple[int, ...]:
+        output = invert_fn.output(0).value
+        assert isinstance(output, np.ndarray)
+        return tuple(output.shape)
+
+    # During the interaction, the functions run on a proxy, and the scale dependent params are rescaled
+    image = ImageU8_3(np.zeros((800, 1000, 3), dtype=np.uint8))
+    blur_node.function_with_gui.input("image").value = image
+    blur_node.on_inputs_changed()
+    assert blur_calls == [((80, 100, 3), 0.4)]
+    assert invert_output_shape() == (80, 100, 3)
+
+    # The full resolution run happens once the interaction has settled
+    preview_mode.heartbeat()
+    assert len(blur_calls) == 1
+    interacting = False
+    time.sleep(0.1)
+    preview_mode.heartbeat()
+    assert blur_calls[-1] == ((800, 1000, 3), 4.0)
+    assert invert_output_shape() == (800, 1000, 3)
+
+    preview_mode.detach()
+    assert blur_node.function_with_gui._f_impl is blur
+
+
+def test_preview_mode_keeps_only_the_last_previews() -> None:
+    def brighten(image: ImageU8_3, delta: int = 0) -> ImageU8_3:
+        return image + np.uint8(delta)  # type: ignore
+
+    graph = FunctionsGraph.from_function_composition([brighten])
+    preview_mode = ImagePreviewMode(graph, max_preview_size=100, settle_seconds=10.0, is_interacting=lambda: True)
+    preview_mode.attach()
+    brighten_node = graph._function_node_with_name_or_is_function(brighten)
+    brighten_node.function_with_gui.input("image").value = ImageU8_3(np.zeros((800, 1000, 3), dtype=np.uint8))
+
+    # A long slider drag: only the last output and proxy are referenced
+    for delta in range(200):
+        brighten_node.function_with_gui.input("delta").value = delta
+        brighten_node.on_inputs_changed()
+    assert len(preview_mode._preview_outputs[brighten_node]) == 1
+    assert len(preview_mode._proxies) == 1
+    output = brighten_node.function_with_gui.output(0).value
+    assert isinstance(output, np.ndarray)
+    assert output.shape == (80, 100, 3) and output[0, 0, 0] == 199
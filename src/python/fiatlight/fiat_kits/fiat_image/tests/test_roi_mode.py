@@ -0,0 +1,148 @@
+import cv2
+import numpy as np
+
+import fiatlight as fl
+from fiatlight.fiat_core import FunctionsGraph
+from fiatlight.fiat_kits.fiat_image.image_gui import ImagePresenter, ImageWithGui
+from fiatlight.fiat_kits.fiat_image.image_stats import image_stats
+from fiatlight.fiat_kits.fiat_image.image_types import ImageU8_3
+from fiatlight.fiat_kits.fiat_image.roi_mode import ImageRoiMode
+
+
+def test_roi_mode() -> None:
+    blur_shapes: list[tuple[int, ...]] = []
+
+    @fl.with_fiat_attributes(halo=lambda params: params["ksize"] // 2)
+    def blur(image: ImageU8_3, ksize: int = 5) -> ImageU8_3:
+        blur_shapes.append(image.shape)
+        return cv2.blur(image, (ksize, ksize))  # type: ignore
+
+    @fl.with_fiat_attributes(halo=0)
+    def invert(image: ImageU8_3) -> ImageU8_3:
+        return 255 - image  # type: ignore
+
+    graph = FunctionsGraph.from_function_composition([blur, invert])
+    roi_mode = ImageRoiMode(graph, margin_ratio=0.0)
+    roi_mode.attach()
+    blur_node = graph._function_node_with_name_or_is_function(blur)
+    invert_node = graph._function_node_with_name("invert")
+
+    def set_visible_region(region: tuple[int, int, int, int] | None) -> None:
+        for fn_node in (blur_node, invert_node):
+            output = fn_node.function_with_gui.output(0)
+            assert isinstance(output, ImageWithGui)
+            output.image_presenter._visible_region = region
+
+    def invert_presenter() -> ImagePresenter:
+        output = invert_node.function_with_gui.output(0)
+        assert isinstance(output, ImageWithGui)
+        return output.image_presenter
+
+    def invert_output() -> np.ndarray:
+        output = invert_node.function_with_gui.output(0).value
+        assert isinstance(output, np.ndarray)
+        return output
+
+    image = ImageU8_3(np.random.randint(0, 255, (400, 600, 3), dtype=np.uint8))
+    expected = 255 - cv2.blur(image, (5, 5))
+
+    # Zoomed in: only the visible region (plus the halo of invert, i.e. 0) is computed
+    set_visible_region((100, 50, 60, 40))
+    roi_mode.heartbeat()
+    assert roi_mode.required_region(blur_node) == (100, 50, 60, 40)
+    blur_node.function_with_gui.input("image").value = image
+    blur_node.on_inputs_changed()
+    assert blur_shapes == [(44, 64, 3)]
+    assert roi_mode.computed_region(invert_node) == (100, 50, 60, 40)
+    assert np.array_equal(invert_output()[50:90, 100:160], expected[50:90, 100:160])
+
+    # Panning inside the computed region does not invoke the functions again
+    set_visible_region((110, 60, 40, 20))
+    roi_mode.heartbeat()
+    assert len(blur_shapes) == 1
+    # The presenter knows that only the computed region is valid
+    assert invert_presenter().valid_region() == (100, 50, 60, 40)
+
+    # Unzoomed: the full frame is computed lazily
+    set_visible_region(None)
+    roi_mode.heartbeat()
+    assert blur_shapes[-1] == (400, 600, 3)
+    assert roi_mode.computed_region(invert_node) is None
+    assert np.array_equal(invert_output(), expected)
+    assert invert_presenter().valid_region() is None
+
+    roi_mode.detach()
+    assert blur_node.function_with_gui._f_impl is blur
+
+
+def test_presenter_visible_region() -> None:
+    presenter = ImagePresenter()
+    presenter.set_image(ImageU8_3(np.zeros((400, 600, 3), dtype=np.uint8)))
+    presenter.image_params.image_display_size = (300, 200)
+    # Unzoomed: the whole image is visible
+    presenter.image_params.zoom_pan_matrix = [[0.5, 0.0, 0.0], [0.0, 0.5, 0.0], [0.0, 0.0, 1.0]]
+    presenter._update_visible_region()
+    assert presenter.visible_region() is None
+    # Zoom x2, panned to (100, 50)
+    presenter.image_params.zoom_pan_matrix = [[2.0, 0.0, -200.0], [0.0, 2.0, -100.0], [0.0, 0.0, 1.0]]
+    presenter._update_visible_region()
+    assert presenter.visible_region() == (100, 50, 150, 100)
+
+
+def test_presenter_stats_on_valid_region() -> None:
+    # A partial output of ImageRoiMode: only the region (100, 50, 60, 40) was computed, the rest is zero filled
+    image = np.zeros((400, 600, 3), dtype=np.uint8)
+    image[50:90, 100:160] = 200
+    presenter = ImagePresenter()
+    presenter.set_image(ImageU8_3(image))
+    presenter.set_valid_region((100, 50, 60, 40))
+    assert presenter._valid_image().shape == (40, 60, 3)
+    assert presenter._stats is None
+    presenter._stats = image_stats(presenter._valid_image())
+    assert presenter._stats.channels[0].min == 200
+    # Changing the valid region invalidates the statistics
+    presenter.set_valid_region(None)
+    assert presenter._stats is None
+    assert presenter._valid_image().shape == (400, 600, 3)
+
+
+def test_roi_mode_with_preview_mode() -> None:
+    import time
+    from fiatlight.fiat_kits.fiat_image.preview_mode import ImagePreviewMode
+
+    @fl.with_fiat_attributes(halo=0)
+    def invert(image: ImageU8_3) -> ImageU8_3:
+        return 255 - image  # type: ignore
+
+    # As in FiatGui: the preview mode is attached first, the ROI mode wraps it
+    interacting = True
+    graph = FunctionsGraph.from_function_composition([invert])
+    preview_mode = ImagePreviewMode(
+        graph, max_preview_size=512, settle_seconds=0.05, is_interacting=lambda: interacting
+    )
+    preview_mode.attach()
+    roi_mode = ImageRoiMode(graph, margin_ratio=0.0, is_previewing=preview_mode.is_previewing)
+    roi_mode.attach()
+    invert_node = graph._function_node_with_name("invert")
+    output_with_gui = invert_node.function_with_gui.output(0)
+    assert isinstance(output_with_gui, ImageWithGui)
+
+    # Zoomed in on a region larger than the preview size, while dragging a slider: the preview is computed
+    image = ImageU8_3(np.random.randint(0, 255, (3000, 4000, 3), dtype=np.uint8))
+    output_with_gui.image_presenter._visible_region = (100, 50, 1200, 1000)
+    preview_mode.is_previewing()
+    roi_mode.heartbeat()
+    invert_node.function_with_gui.input("image").value = image
+    invert_node.on_inputs_changed()
+    assert isinstance(output_with_gui.value, np.ndarray)
+    assert output_with_gui.value.shape == (384, 512, 3)
+    assert roi_mode.computed_region(invert_node) is None
+
+    # Once the interaction has settled, the visible region is computed at full resolution
+    interacting = False
+    time.sleep(0.1)
+    preview_mode.heartbeat()
+    roi_mode.heartbeat()
+    assert output_with_gui.value.shape == (3000, 4000, 3)
+    assert roi_mode.computed_region(invert_node) == (100, 50, 1200, 1000)
+    assert np.array_equal(output_with_gui.value[50:1050, 100:1300], 255 - image[50:1050, 100:1300])
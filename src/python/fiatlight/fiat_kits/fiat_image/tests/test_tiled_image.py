@@ -0,0 +1,157 @@
+import os
+
+import numpy as np
+
+from fiatlight.fiat_kits.fiat_image.image_types import ImageU8_3
+from fiatlight.fiat_kits.fiat_image.tiled_image import (
+    TiledImage,
+    iter_tile_rects,
+    process_tile_by_tile,
+    tiled_image_function,
+)
+
+
+def _write_npy(tmp_path, shape: tuple[int, ...]) -> tuple[str, np.ndarray]:  # type: ignore
+    array = np.random.randint(0, 255, shape, dtype=np.uint8)
+    path = str(tmp_path / "big.npy")
+    np.save(path, array)
+    return path, array
+
+
+def test_iter_tile_rects() -> None:
+    rects = list(iter_tile_rects(250, 100, 100, 100, overlap=10))
+    assert [inner for inner, _ in rects] == [(0, 0, 100, 100), (100, 0, 100, 100), (200, 0, 50, 100)]
+    assert [outer for _, outer in rects] == [(0, 0, 110, 100), (90, 0, 120, 100), (190, 0, 60, 100)]
+
+
+def test_tiles_and_regions(tmp_path) -> None:  # type: ignore
+    path, array = _write_npy(tmp_path, (1000, 1500, 3))
+    image = TiledImage.open(path, tile_size=256)
+    assert (image.width, image.height) == (1500, 1000)
+    assert image.nb_levels() == 4
+    assert image.level_size(3) == (188, 125)
+    assert image.nb_tiles(0) == (4, 6)
+
+    assert np.array_equal(image.tile(0, 1, 2), array[256:512, 512:768])
+    assert np.array_equal(image.read_region(300, 200, 400, 500), array[200:700, 300:700])
+    # Regions are clipped to the image
+    assert image.read_region(1400, 900, 400, 400).shape == (100, 100, 3)
+
+    # Levels > 0 are downscaled averages
+    overview = image.overview()
+    assert overview.shape == (125, 188, 3)
+    assert abs(float(overview.mean()) - float(array.mean())) < 1.0
+
+
+def test_tile_cache_is_bounded(tmp_path) -> None:  # type: ignore
+    path, _ = _write_npy(tmp_path, (1024, 1024, 3))
+    tile_bytes = 128 * 128 * 3
+    image = TiledImage.open(path, tile_size=128, cache_max_bytes=10 * tile_bytes)
+    image.read_region(0, 0, 1024, 1024)
+    assert len(image._tile_cache) == 10
+    assert image._tile_cache.nb_bytes == 10 * tile_bytes
+
+
+def test_open_raw(tmp_path) -> None:  # type: ignore
+    array = np.arange(300 * 200, dtype=np.uint16).reshape(300, 200)
+    path = str(tmp_path / "big.raw")
+    with open(path, "wb") as f:
+        f.write(b"header")
+        f.write(array.tobytes())
+    image = TiledImage.open_raw(path, (300, 200), np.uint16, offset=6, tile_size=64)
+    assert np.array_equal(image.read_region(10, 20, 100, 100), array[20:120, 10:110])
+    assert image.open_params is not None
+    assert image.open_params["raw_dtype"] == np.dtype(np.uint16).str
+
+
+def test_process_tile_by_tile_with_overlap(tmp_path) -> None:  # type: ignore
+    import cv2
+
+    path, array = _write_npy(tmp_path, (500, 700, 3))
+    image = TiledImage.open(path, tile_size=128)
+
+    def blur(img: ImageU8_3, ksize: int = 5) -> ImageU8_3:
+        return cv2.blur(img, (ksize, ksize), borderType=cv2.BORDER_REFLECT_101)  # type: ignore
+
+    expected = blur(ImageU8_3(array))
+    output = process_tile_by_tile(blur, image, overlap=2)
+    assert np.array_equal(output.read_region(0, 0, 700, 500), expected)
+
+    # The function can also be wrapped for use in a graph
+    tiled_blur = tiled_image_function(blur, overlap=4)
+    output_2 = tiled_blur(image, ksize=9)
+    assert np.array_equal(output_2.read_region(0, 0, 700, 500), blur(ImageU8_3(array), 9))
+    assert tiled_blur.__annotations__["img"] is TiledImage
+
+    # The output is a temporary file, removed when released
+    output_path = output._array.filename  # type: ignore
+    assert os.path.exists(output_path)
+    del output
+    assert not os.path.exists(output_path)
+
+
+def test_tiled_image_function_in_graph() -> None:
+    from fiatlight.fiat_core import FunctionWithGui
+    from fiatlight.fiat_kits.fiat_image.tiled_image_gui import TiledImageWithGui
+
+    def invert(image: ImageU8_3) -> ImageU8_3:
+        return 255 - image  # type: ignore
+
+    fn_gui = FunctionWithGui(tiled_image_function(invert))
+    assert isinstance(fn_gui.input("image"), TiledImageWithGui)
+    assert isinstance(fn_gui.output(0), TiledImageWithGui)
+
+
+def test_overview_levels(tmp_path) -> None:  # type: ignore
+    path, array = _write_npy(tmp_path, (1000, 1500, 3))
+    image = TiledImage.open(path, tile_size=128)
+    image.overview_max_bytes = 300 * 1000
+    assert image.nb_levels() == 5
+    first_level = image.overview_first_level()
+    assert first_level == 2  # level 2 is 375x250x3 bytes
+    assert image.is_level_ready(1)
+    assert not image.is_level_ready(first_level)
+    # The tile by tile computation of the last level, before the overview levels are built
+    last_level = image.nb_levels() - 1
+    overview_by_tiles = image.overview()
+
+    image._tile_cache = type(image._tile_cache)(image._tile_cache.max_bytes)
+    image.start_building_overview_levels()
+    assert image._overview_thread is not None
+    image._overview_thread.join()
+    assert image.overview_levels_progress() == 1.0
+    assert all(image.is_level_ready(level) for level in range(image.nb_levels()))
+    # The overview levels are not stored in the tile cache
+    overview = image.overview()
+    assert len(image._tile_cache) == 0
+    assert overview.shape == overview_by_tiles.shape == (*image.level_size(last_level)[::-1], 3)
+    assert np.abs(overview.astype(float) - overview_by_tiles.astype(float)).mean() < 2.0
+    level_2 = image.read_region(0, 0, 375, 250, level=2)
+    assert abs(float(level_2.mean()) - float(array.mean())) < 1.0
+
+
+def test_tiled_image_gui_reads_views_in_background(tmp_path) -> None:  # type: ignore
+    import time
+    from fiatlight.fiat_kits.fiat_image.tiled_image_gui import TiledImageWithGui
+
+    path, array = _write_npy(tmp_path, (1000, 1500, 3))
+    image = TiledImage.open(path, tile_size=128)
+    image_with_gui = TiledImageWithGui()
+    image_with_gui.on_change(image)
+    assert image_with_gui.level == 0  # the default view does not need the overview levels
+    image_with_gui.view_size = 256
+
+    start = time.time()
+    while image_with_gui._displayed_view is None and time.time() - start < 5.0:
+        image_with_gui._update_displayed_view(image)
+        time.sleep(0.01)
+    assert np.array_equal(image_with_gui.image_presenter.image, array[:256, :256])
+
+
+def test_tiled_image_gui_read_error() -> None:
+    from fiatlight.fiat_kits.fiat_image.tiled_image_gui import TiledImageWithGui
+
+    image_with_gui = TiledImageWithGui()
+    image_with_gui._read_view(TiledImage(np.zeros((10, 10), dtype=np.uint8)), (0, 0, 100, 100))
+    assert image_with_gui._error_message is not None
+    assert image_with_gui._failed_view == (0, 0, 100, 100)
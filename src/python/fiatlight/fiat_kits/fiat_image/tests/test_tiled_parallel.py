@@ -0,0 +1,42 @@
+import inspect
+
+import cv2
+import numpy as np
+
+from fiatlight.fiat_kits.fiat_image.image_types import ImageFloat_1, ImageU8_1, ImageU8_3
+from fiatlight.fiat_kits.fiat_image.tiled_parallel import process_in_parallel_strips, tiled_parallel
+
+
+def test_process_in_parallel_strips() -> None:
+    image = np.random.randint(0, 255, (1001, 700, 3), dtype=np.uint8)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7, 7))
+
+    def morph_open(img: ImageU8_3) -> ImageU8_3:
+        return cv2.morphologyEx(img, cv2.MORPH_OPEN, kernel)  # type: ignore
+
+    r = process_in_parallel_strips(morph_open, ImageU8_3(image), halo=6, nb_strips=4)
+    assert np.array_equal(r, morph_open(ImageU8_3(image)))
+
+    # The output dtype and channels may differ from the input
+    gray = ImageU8_1(np.ascontiguousarray(image[:, :, 0]))
+
+    def sobel(img: ImageU8_1) -> ImageFloat_1:
+        return cv2.Sobel(img, cv2.CV_32F, 1, 1, ksize=5)  # type: ignore
+
+    r = process_in_parallel_strips(sobel, gray, halo=2, nb_strips=5)
+    assert r.dtype == np.float32
+    assert np.array_equal(r, sobel(gray))
+
+
+def test_tiled_parallel_decorator() -> None:
+    @tiled_parallel(halo=lambda params: params["ksize"] // 2, nb_strips=3)
+    def median_blur(image: ImageU8_3, ksize: int = 5) -> ImageU8_3:
+        """Median blur"""
+        return cv2.medianBlur(image, ksize)  # type: ignore
+
+    image = ImageU8_3(np.random.randint(0, 255, (800, 900, 3), dtype=np.uint8))
+    assert np.array_equal(median_blur(image), cv2.medianBlur(image, 5))
+    assert np.array_equal(median_blur(image, ksize=7), cv2.medianBlur(image, 7))
+    # The function keeps its signature, and its halo is available as a fiat attribute
+    assert list(inspect.signature(median_blur).parameters) == ["image", "ksize"]
+    assert median_blur.halo({"ksize": 7}) == 3  # type: ignore
@@ -0,0 +1,472 @@
+"""TiledImage: very large images (slide scans, satellite images, ...), read tile by tile
+
+image_source / imread_rgb decode the whole file into memory, which is impossible for images of tens of gigapixels.
+A TiledImage is backed by a memory-mapped file, and only the tiles that are used are read.
+Supported files:
+    - raw files (the shape and dtype must be given): TiledImage.open_raw()
+    - .npy files: TiledImage.open()
+    - uncompressed TIFF files: TiledImage.open() (requires tifffile: pip install tifffile)
+
+The tiles are organized in levels: level 0 is the full resolution image, and each level is half the size of the
+previous one (a tile is computed from 4 tiles of the previous level, with cv2.INTER_AREA). The tiles are stored in
+an LRU cache whose size is bounded in bytes, so that the memory stays bounded regardless of the image size.
+TiledImageWithGui (see tiled_image_gui.py) uses them to browse the image.
+
+A tile of level n requires 4^n tiles of level 0: the coarse levels (the "overview levels", whose size is below
+overview_max_bytes) are instead computed in one pass over the file, by bands, and kept in memory
+(see build_overview_levels; TiledImageWithGui runs it on a background thread).
+
+Image functions can be applied tile by tile, with an overlap for neighbourhood operations (blur, edges, ...):
+    output = process_tile_by_tile(my_function, tiled_image, overlap=16)
+or, to use them inside a graph:
+    my_tiled_function = tiled_image_function(my_function, overlap=16)   # TiledImage -> TiledImage
+The output is written to a memory-mapped raw file (a temporary file, unless output_path is given).
+"""
+
+from fiatlight.fiat_kits.fiat_image.image_types import Image
+from fiatlight.fiat_types.base_types import JsonDict
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Tuple
+import functools
+import inspect
+import logging
+import os
+import tempfile
+import threading
+import weakref
+
+import numpy as np
+
+
+# (x, y, width, height)
+Rect = Tuple[int, int, int, int]
+# (level, row, col)
+TileKey = Tuple[int, int, int]
+
+
+def iter_tile_rects(
+    width: int, height: int, tile_width: int, tile_height: int, overlap: int = 0
+) -> Iterator[Tuple[Rect, Rect]]:
+    """Split an image into tiles: yields (tile rect, tile rect extended by overlap on each side, clipped to the image)"""
+    for y in range(0, height, tile_height):
+        for x in range(0, width, tile_width):
+            w = min(tile_width, width - x)
+            h = min(tile_height, height - y)
+            x0 = max(x - overlap, 0)
+            y0 = max(y - overlap, 0)
+            x1 = min(x + w + overlap, width)
+            y1 = min(y + h + overlap, height)
+            yield (x, y, w, h), (x0, y0, x1 - x0, y1 - y0)
+
+
+class _TileCache:
+    """An LRU cache of tiles, whose size is bounded in bytes"""
+
+    max_bytes: int
+    nb_bytes: int = 0
+    _tiles: OrderedDict[TileKey, Image]
+    _lock: threading.Lock
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: TileKey) -> Image | None:
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+            return tile
+
+    def put(self, key: TileKey, tile: Image) -> None:
+        with self._lock:
+            if key in self._tiles:
+                return
+            self._tiles[key] = tile
+            self.nb_bytes += tile.nbytes
+            while self.nb_bytes > self.max_bytes and len(self._tiles) > 1:
+                _, evicted = self._tiles.popitem(last=False)
+                self.nb_bytes -= evicted.nbytes
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class TiledImage:
+    """A large image, backed by a memory-mapped file, and read tile by tile (see module doc)"""
+
+    tile_size: int
+    # How to reopen the file (None for temporary files): see TiledImageWithGui serialization
+    open_params: JsonDict | None
+
+    # The levels whose size is below this are overview levels (see build_overview_levels)
+    overview_max_bytes: int = 64 * 1024 * 1024
+
+    _array: np.ndarray  # memory-mapped, (height, width) or (height, width, nb_channels)
+    _tile_cache: _TileCache
+
+    # level -> full level array (only the overview levels, once built)
+    _overview_levels: Dict[int, np.ndarray]
+    _overview_progress: float = 0.0
+    _overview_thread: threading.Thread | None = None
+    _overview_failed: bool = False  # if the build failed, the overview levels are computed tile by tile
+    _overview_lock: threading.Lock
+
+    # dtypes supported by cv2.resize with INTER_AREA (for the levels > 0)
+    _RESIZABLE_DTYPES = ("uint8", "uint16", "int16", "float32", "float64")
+
+    def __init__(
+        self,
+        array: np.ndarray,
+        tile_size: int = 512,
+        cache_max_bytes: int = 256 * 1024 * 1024,
+        open_params: JsonDict | None = None,
+    ) -> None:
+        if array.ndim not in (2, 3):
+            raise ValueError(f"TiledImage: expected an array of shape (height, width[, channels]), got {array.shape}")
+        self._array = array
+        self.tile_size = tile_size
+        self.open_params = open_params
+        self._tile_cache = _TileCache(cache_max_bytes)
+        self._overview_levels = {}
+        self._overview_lock = threading.Lock()
+
+    class _OpenSection:  # Dummy class to create a section in the IDE # noqa
+        """
+        # --------------------------------------------------------------------------------------------
+        #        Open / create files
+        # --------------------------------------------------------------------------------------------
+        """
+
+        pass
+
+    @staticmethod
+    def open(path: str, tile_size: int = 512, cache_max_bytes: int = 256 * 1024 * 1024) -> "TiledImage":
+        """Open a .npy file, or an uncompressed TIFF file (memory-mapped, nothing is read yet)"""
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".npy":
+            array = np.load(path, mmap_mode="r")
+        elif extension in (".tif", ".tiff"):
+            try:
+                import tifffile  # type: ignore
+            except ImportError:
+                raise ImportError(
+                    "tifffile is required to open TIFF files, please install it with 'pip install tifffile'"
+                )
+            try:
+                array = tifffile.memmap(path, mode="r")
+            except ValueError as e:
+                raise ValueError(f"TiledImage: {path} cannot be memory-mapped (is it compressed?): {e}")
+        else:
+            raise ValueError(f"TiledImage: unsupported file type {path} (use .npy, .tif, or TiledImage.open_raw)")
+        open_params = {"type": "TiledImage", "path": path, "tile_size": tile_size}
+        return TiledImage(array, tile_size, cache_max_bytes, open_params)
+
+    @staticmethod
+    def open_raw(
+        path: str,
+        shape: Tuple[int, ...],
+        dtype: Any,
+        offset: int = 0,
+        tile_size: int = 512,
+        cache_max_bytes: int = 256 * 1024 * 1024,
+    ) -> "TiledImage":
+        """Open a raw file, whose pixels are stored row by row (after offset bytes)"""
+        array = np.memmap(path, dtype=dtype, mode="r", shape=tuple(shape), offset=offset)
+        open_params = {
+            "type": "TiledImage",
+            "path": path,
+            "tile_size": tile_size,
+            "raw_shape": list(shape),
+            "raw_dtype": np.dtype(dtype).str,
+            "raw_offset": offset,
+        }
+        return TiledImage(array, tile_size, cache_max_bytes, open_params)
+
+    @staticmethod
+    def create_raw(path: str | None, shape: Tuple[int, ...], dtype: Any, tile_size: int = 512) -> "TiledImage":
+        """Create a writable raw file (a temporary file, removed when the TiledImage is released, if path is None)"""
+        is_temporary = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="fiat_tiled_", suffix=".raw")
+            os.close(fd)
+        array = np.memmap(path, dtype=dtype, mode="w+", shape=tuple(shape))
+        if is_temporary:
+            r = TiledImage(array, tile_size)
+            weakref.finalize(r, _remove_file, path)
+        else:
+            r = TiledImage.open_raw(path, shape, dtype, tile_size=tile_size)
+            r._array = array
+        return r
+
+    class _PropertiesSection:  # Dummy class to create a section in the IDE # noqa
+        """
+        # --------------------------------------------------------------------------------------------
+        #        Properties
+        # --------------------------------------------------------------------------------------------
+        """
+
+        pass
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._array.shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._array.dtype
+
+    @property
+    def width(self) -> int:
+        return int(self._array.shape[1])
+
+    @property
+    def height(self) -> int:
+        return int(self._array.shape[0])
+
+    def nb_levels(self) -> int:
+        """Number of levels: the last level fits in one tile"""
+        if self.dtype.name not in self._RESIZABLE_DTYPES:
+            return 1
+        r = 1
+        width, height = self.width, self.height
+        while width > self.tile_size or height > self.tile_size:
+            width, height = (width + 1) // 2, (height + 1) // 2
+            r += 1
+        return r
+
+    def level_size(self, level: int) -> Tuple[int, int]:
+        """The (width, height) of a level"""
+        width, height = self.width, self.height
+        for _ in range(level):
+            width, height = (width + 1) // 2, (height + 1) // 2
+        return width, height
+
+    def nb_tiles(self, level: int) -> Tuple[int, int]:
+        """The number of (rows, cols) of tiles at a level"""
+        width, height = self.level_size(level)
+        return (height + self.tile_size - 1) // self.tile_size, (width + self.tile_size - 1) // self.tile_size
+
+    def overview_first_level(self) -> int:
+        """The finest overview level: the first level > 0 whose size is below overview_max_bytes"""
+        pixel_bytes = self.dtype.itemsize * (self.shape[2] if len(self.shape) == 3 else 1)
+        last_level = self.nb_levels() - 1
+        for level in range(1, last_level):
+            width, height = self.level_size(level)
+            if width * height * pixel_bytes <= self.overview_max_bytes:
+                return level
+        return last_level
+
+    def is_level_ready(self, level: int) -> bool:
+        """True if the tiles of this level are fast to get: the finer levels (read from the file, with a cost
+        independent of the image size), and the overview levels once they are built"""
+        if self._overview_failed or level == 0 or level < self.overview_first_level():
+            return True
+        return level in self._overview_levels
+
+    def cache_info(self) -> str:
+        cache = self._tile_cache
+        return f"{len(cache)} tiles in cache, {cache.nb_bytes / 1e6:.1f} / {cache.max_bytes / 1e6:.0f} MB"
+
+    class _ReadSection:  # Dummy class to create a section in the IDE # noqa
+        """
+        # --------------------------------------------------------------------------------------------
+        #        Read tiles and regions
+        # --------------------------------------------------------------------------------------------
+        """
+
+        pass
+
+    def tile(self, level: int, row: int, col: int) -> Image:
+        """A tile of a level (read or computed on first access, then cached)"""
+        if level in self._overview_levels:  # already in memory
+            return self._compute_tile(level, row, col)
+        key = (level, row, col)
+        tile = self._tile_cache.get(key)
+        if tile is None:
+            tile = self._compute_tile(level, row, col)
+            self._tile_cache.put(key, tile)
+        return tile
+
+    def _compute_tile(self, level: int, row: int, col: int) -> Image:
+        level_width, level_height = self.level_size(level)
+        x, y = col * self.tile_size, row * self.tile_size
+        width, height = min(self.tile_size, level_width - x), min(self.tile_size, level_height - y)
+        if width <= 0 or height <= 0:
+            raise IndexError(f"TiledImage: no tile ({row}, {col}) at level {level}")
+        overview_level = self._overview_levels.get(level)
+        if overview_level is not None:
+            return overview_level[y : y + height, x : x + width]  # type: ignore
+        if level == 0:
+            return np.array(self._array[y : y + height, x : x + width])  # type: ignore
+        # Downscale the 4 corresponding tiles of the previous level
+        import cv2
+
+        previous = self.read_region(2 * x, 2 * y, 2 * width, 2 * height, level - 1)
+        resized = cv2.resize(previous, (width, height), interpolation=cv2.INTER_AREA)
+        if resized.ndim == 2 and previous.ndim == 3:  # cv2 drops the channel axis of 1-channel images
+            resized = resized[:, :, None]
+        return resized  # type: ignore
+
+    def read_region(self, x: int, y: int, width: int, height: int, level: int = 0, use_cache: bool = True) -> Image:
+        """Read a region of a level (in the coordinates of this level), clipped to the level size.
+
+        With use_cache=False, a region of level 0 is read directly from the file (this is what
+        process_tile_by_tile does, in order not to evict the tiles used by the GUI)
+        """
+        level_width, level_height = self.level_size(level)
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + width, level_width), min(y + height, level_height)
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError(f"TiledImage: region {(x, y, width, height)} is outside of level {level}")
+        if level == 0 and not use_cache:
+            return np.array(self._array[y0:y1, x0:x1])  # type: ignore
+
+        r = np.empty((y1 - y0, x1 - x0) + self.shape[2:], dtype=self.dtype)
+        ts = self.tile_size
+        for row in range(y0 // ts, (y1 - 1) // ts + 1):
+            for col in range(x0 // ts, (x1 - 1) // ts + 1):
+                tile = self.tile(level, row, col)
+                tx0, ty0 = col * ts, row * ts
+                # Intersection of the tile and of the region
+                ix0, iy0 = max(tx0, x0), max(ty0, y0)
+                ix1, iy1 = min(tx0 + tile.shape[1], x1), min(ty0 + tile.shape[0], y1)
+                r[iy0 - y0 : iy1 - y0, ix0 - x0 : ix1 - x0] = tile[iy0 - ty0 : iy1 - ty0, ix0 - tx0 : ix1 - tx0]
+        return r  # type: ignore
+
+    def overview(self) -> Image:
+        """The whole image, at the last level (which fits in one tile).
+        If the overview levels are not built, this reads the whole file (see build_overview_levels)"""
+        level = self.nb_levels() - 1
+        width, height = self.level_size(level)
+        return self.read_region(0, 0, width, height, level)
+
+    class _OverviewLevelsSection:  # Dummy class to create a section in the IDE # noqa
+        """
+        # --------------------------------------------------------------------------------------------
+        #        Overview levels
+        # --------------------------------------------------------------------------------------------
+        """
+
+        pass
+
+    def build_overview_levels(self) -> None:
+        """Compute the overview levels, in one pass over the file (this reads the whole file, and may take minutes
+        for huge images: use start_building_overview_levels to run it on a background thread)"""
+        import cv2
+
+        first_level = self.overview_first_level()
+        if self.nb_levels() == 1 or first_level in self._overview_levels:
+            self._overview_progress = 1.0
+            return
+
+        def half_size(image: np.ndarray) -> np.ndarray:
+            height, width = image.shape[:2]
+            r = cv2.resize(image, ((width + 1) // 2, (height + 1) // 2), interpolation=cv2.INTER_AREA)
+            if r.ndim == 2 and image.ndim == 3:  # cv2 drops the channel axis of 1-channel images
+                r = r[:, :, None]
+            return r
+
+        # The first overview level is computed band by band: a band of level 0 is halved first_level times
+        scale = 2**first_level
+        first_width, first_height = self.level_size(first_level)
+        level_array = np.empty((first_height, first_width) + self.shape[2:], dtype=self.dtype)
+        row_bytes = self.width * self.dtype.itemsize * (self.shape[2] if len(self.shape) == 3 else 1)
+        band_height = scale * max(1, (32 * 1024 * 1024) // (row_bytes * scale))
+        for y in range(0, self.height, band_height):
+            band = np.array(self._array[y : y + band_height])
+            for _ in range(first_level):
+                band = half_size(band)
+            level_array[y // scale : y // scale + band.shape[0]] = band
+            self._overview_progress = min(y + band_height, self.height) / self.height
+        self._overview_levels[first_level] = level_array
+
+        # The next levels are computed from the previous one (which is in memory)
+        for level in range(first_level + 1, self.nb_levels()):
+            level_array = half_size(level_array)
+            self._overview_levels[level] = level_array
+        self._overview_progress = 1.0
+
+    def start_building_overview_levels(self) -> None:
+        """Build the overview levels on a background thread (once)"""
+        with self._overview_lock:
+            if self._overview_thread is not None:
+                return
+            self._overview_thread = threading.Thread(target=self._build_overview_levels_in_background, daemon=True)
+            self._overview_thread.start()
+
+    def _build_overview_levels_in_background(self) -> None:
+        try:
+            self.build_overview_levels()
+        except Exception as e:
+            logging.error(f"TiledImage: failed to build the overview levels: {e}")
+            self._overview_failed = True
+
+    def overview_levels_progress(self) -> float:
+        """Progress of build_overview_levels, between 0 and 1"""
+        return self._overview_progress
+
+
+def process_tile_by_tile(
+    fn: Callable[[Any], Image],
+    image: TiledImage,
+    overlap: int = 0,
+    output_path: str | None = None,
+) -> TiledImage:
+    """Apply fn to the image tile by tile, and write the result to a new TiledImage.
+
+    Each tile is extended by `overlap` pixels on each side (clipped to the image) before calling fn,
+    and the result is cropped back: use an overlap at least as large as the radius of neighbourhood
+    operations (e.g. the kernel radius of a blur), so that there are no seams between the tiles.
+    fn must return an image of the same width and height as its input (the dtype and channels may change).
+    The output is written to output_path (raw file), or to a temporary file.
+    """
+    output: TiledImage | None = None
+    for (x, y, w, h), (ox, oy, ow, oh) in iter_tile_rects(
+        image.width, image.height, image.tile_size, image.tile_size, overlap
+    ):
+        tile_in = image.read_region(ox, oy, ow, oh, use_cache=False)
+        tile_out = fn(tile_in)
+        if tile_out.shape[:2] != tile_in.shape[:2]:
+            raise ValueError(
+                f"process_tile_by_tile: {fn} returned an image of shape {tile_out.shape} for a tile of shape "
+                f"{tile_in.shape} (the width and height must be unchanged)"
+            )
+        if output is None:
+            output_shape = (image.height, image.width) + tile_out.shape[2:]
+            output = TiledImage.create_raw(output_path, output_shape, tile_out.dtype, image.tile_size)
+        output._array[y : y + h, x : x + w] = tile_out[y - oy : y - oy + h, x - ox : x - ox + w]
+    assert output is not None
+    if isinstance(output._array, np.memmap):
+        output._array.flush()
+    return output
+
+
+def tiled_image_function(fn: Callable[..., Image], overlap: int = 0) -> Callable[..., TiledImage]:
+    """Transform a function (image: Image, ...) -> Image into a function (image: TiledImage, ...) -> TiledImage
+    which is applied tile by tile (see process_tile_by_tile). The other parameters and the fiat attributes
+    of the function are kept, so that it can be added to a graph.
+    """
+
+    @functools.wraps(fn)
+    def tiled_fn(image: TiledImage, *args: Any, **kwargs: Any) -> TiledImage:
+        return process_tile_by_tile(lambda tile: fn(tile, *args, **kwargs), image, overlap)
+
+    signature = inspect.signature(fn)
+    parameters = list(signature.parameters.values())
+    if len(parameters) == 0:
+        raise ValueError(f"tiled_image_function: {fn} should have an image as first parameter")
+    parameters[0] = parameters[0].replace(annotation=TiledImage)
+    tiled_fn.__signature__ = signature.replace(parameters=parameters, return_annotation=TiledImage)  # type: ignore
+    tiled_fn.__annotations__ = dict(getattr(fn, "__annotations__", {}))
+    tiled_fn.__annotations__[parameters[0].name] = TiledImage
+    tiled_fn.__annotations__["return"] = TiledImage
+    return tiled_fn
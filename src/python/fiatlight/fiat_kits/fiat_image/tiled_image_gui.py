@@ -0,0 +1,232 @@
+"""TiledImageWithGui: browse a TiledImage (see tiled_image.py)
+
+The image is browsed through a view of fixed size (view_size x view_size pixels) at a given level:
+only the tiles needed by the view are read (and cached by the TiledImage).
+
+The GUI thread never reads the file: the views are read on a background thread (the previous view stays
+displayed meanwhile), and the overview levels are built on another background thread when the image is first
+displayed (the coarse levels show a progress placeholder until they are ready).
+"""
+
+from fiatlight.fiat_types import FiatAttributes, JsonDict
+from fiatlight.fiat_core.any_data_with_gui import AnyDataWithGui
+from fiatlight.fiat_kits.fiat_image.image_gui import ImagePresenter
+from fiatlight.fiat_kits.fiat_image.tiled_image import TiledImage
+from fiatlight.fiat_kits.fiat_image.image_types import Image
+from imgui_bundle import imgui, portable_file_dialogs as pfd
+from typing import Tuple
+import logging
+import threading
+
+import numpy as np
+
+
+class TiledImageWithGui(AnyDataWithGui[TiledImage]):
+    """Browse a very large image, tile by tile: choose a level (zoom) and a position"""
+
+    image_presenter: ImagePresenter
+    # Size of the displayed view (in pixels of the current level)
+    view_size: int = 512
+    # Current view: level, and position of the view center (in the coordinates of level 0)
+    level: int = 0
+    center_x: int = 0
+    center_y: int = 0
+
+    _displayed_view: Tuple[int, int, int, int] | None = None  # (id of the image, level, x, y)
+    # The view being read on a background thread, and its result (set by this thread)
+    _loading_view: Tuple[int, int, int, int] | None = None
+    _loaded_view: Tuple[Tuple[int, int, int, int], Image] | None = None
+    _failed_view: Tuple[int, int, int, int] | None = None  # not read again
+    _error_message: str | None = None
+    _open_file_dialog: pfd.open_file | None = None
+
+    def __init__(self) -> None:
+        super().__init__(TiledImage)
+        self.image_presenter = ImagePresenter()
+        self.callbacks.present_str = self.present_str
+        self.callbacks.present = self.present
+        self.callbacks.present_collapsible = True
+        self.callbacks.present_detachable = True
+        self.callbacks.edit = self.edit
+        self.callbacks.on_change = self.on_change
+        self.callbacks.on_fiat_attributes_changed = self.on_fiat_attributes_changes
+        self.callbacks.save_to_dict = self._save_to_dict
+        self.callbacks.load_from_dict = self._load_from_dict
+        self.callbacks.save_gui_options_to_json = self.save_gui_options_to_json
+        self.callbacks.load_gui_options_from_json = self.load_gui_options_from_json
+        self.callbacks.clipboard_copy_possible = False
+
+    class _PresentCallbacksSection:  # Dummy class to create a section in the IDE # noqa
+        """
+        # --------------------------------------------------------------------------------------------
+        #        Present callbacks
+        # --------------------------------------------------------------------------------------------
+        """
+
+        pass
+
+    @staticmethod
+    def present_str(value: TiledImage) -> str:
+        return f"TiledImage {value.width}x{value.height} {value.dtype} ({value.nb_levels()} levels)"
+
+    def _view_rect(self, value: TiledImage) -> Tuple[int, int, int, int]:
+        """(id of the image, level, x, y): x and y are the top left corner of the view, in the level coordinates"""
+        level = self.level if 0 <= self.level < value.nb_levels() else 0
+        level_width, level_height = value.level_size(level)
+        scale = 2**level
+        x = min(max(self.center_x // scale - self.view_size // 2, 0), max(level_width - self.view_size, 0))
+        y = min(max(self.center_y // scale - self.view_size // 2, 0), max(level_height - self.view_size, 0))
+        return id(value), level, x, y
+
+    def _update_displayed_view(self, value: TiledImage) -> None:
+        """Display the view read by the background thread (if any), and start reading the current view if needed"""
+        loaded_view = self._loaded_view
+        if loaded_view is not None:
+            view, image = loaded_view
+            self.image_presenter.set_image(image)
+            self._displayed_view = view
+            self._loaded_view = None
+            self._loading_view = None
+        view = self._view_rect(value)
+        if view in (self._displayed_view, self._failed_view) or self._loading_view is not None:
+            return
+        if not value.is_level_ready(view[1]):
+            return  # the overview levels are being built
+        self._loading_view = view
+        threading.Thread(target=self._read_view, args=(value, view), daemon=True).start()
+
+    def _read_view(self, value: TiledImage, view: Tuple[int, int, int, int]) -> None:
+        """Read a view (on a background thread)"""
+        _, level, x, y = view
+        try:
+            image = value.read_region(x, y, self.view_size, self.view_size, level)
+        except Exception as e:
+            logging.error(f"TiledImageWithGui: cannot read the view {view}: {e}")
+            self._error_message = f"Cannot read the image: {e}"
+            self._failed_view = view
+            self._loading_view = None
+            return
+        self._loaded_view = (view, image)
+
+    def present(self, value: TiledImage) -> None:
+        nb_levels = value.nb_levels()
+        if self.level < 0 or self.level >= nb_levels:
+            self.level = 0
+        value.start_building_overview_levels()
+        imgui.set_next_item_width(150)
+        _, self.level = imgui.slider_int("Level", self.level, 0, nb_levels - 1)
+        imgui.set_next_item_width(150)
+        _, self.center_x = imgui.slider_int("x", self.center_x, 0, value.width - 1)
+        imgui.set_next_item_width(150)
+        _, self.center_y = imgui.slider_int("y", self.center_y, 0, value.height - 1)
+        self._update_displayed_view(value)
+        if not value.is_level_ready(self.level):
+            imgui.text(f"Building the overview levels... {value.overview_levels_progress():.0%}")
+        elif self._loading_view is not None:
+            imgui.text("Reading...")
+        if self._displayed_view is not None:
+            self.image_presenter.gui()
+        imgui.text(value.cache_info())
+        self._gui_error_message()
+
+    def _gui_error_message(self) -> None:
+        if self._error_message is not None:
+            from fiatlight import fiat_config as fc
+
+            color = fc.get_fiat_config().style.color_as_vec4(fc.FiatColorType.ExceptionError)
+            imgui.text_colored(color, self._error_message)
+
+    class _EditCallbacksSection:  # Dummy class to create a section in the IDE # noqa
+        """
+        # --------------------------------------------------------------------------------------------
+        #        Edit callbacks
+        # --------------------------------------------------------------------------------------------
+        """
+
+        pass
+
+    def edit(self, value: TiledImage) -> tuple[bool, TiledImage]:
+        changed = False
+        if imgui.button("Open tiled image"):
+            self._open_file_dialog = pfd.open_file("Select image file", filters=["*.npy *.tif *.tiff"])
+        if self._open_file_dialog is not None and self._open_file_dialog.ready():
+            if len(self._open_file_dialog.result()) == 1:
+                path = self._open_file_dialog.result()[0]
+                try:
+                    value = TiledImage.open(path)
+                    changed = True
+                    self._error_message = None
+                except (ValueError, ImportError, OSError) as e:
+                    self._error_message = f"Cannot open {path}: {e}"
+            self._open_file_dialog = None
+        self._gui_error_message()
+        return changed, value
+
+    def on_change(self, value: TiledImage) -> None:
+        self._displayed_view = None
+        self._error_message = None
+
+    class _FiatAttributesSection:  # Dummy class to create a section in the IDE # noqa
+        """
+        # --------------------------------------------------------------------------------------------
+        #        Fiat Attributes
+        # --------------------------------------------------------------------------------------------
+        """
+
+        pass
+
+    def on_fiat_attributes_changes(self, fiat_attrs: FiatAttributes) -> None:
+        if "view_size" in fiat_attrs:
+            self.view_size = fiat_attrs["view_size"]
+        self.image_presenter.handle_fiat_attrs(fiat_attrs)
+
+    class _SerializationAndDeserializationSection:  # Dummy class to create a section in the IDE # noqa
+        """
+        # --------------------------------------------------------------------------------------------
+        #        Serialization and deserialization
+        # --------------------------------------------------------------------------------------------
+        """
+
+        pass
+
+    @staticmethod
+    def _save_to_dict(value: TiledImage) -> JsonDict:
+        # Only a reference to the file is saved (temporary files are not saved)
+        if value.open_params is None:
+            return {"type": "Unspecified"}
+        return value.open_params
+
+    @staticmethod
+    def _load_from_dict(json_dict: JsonDict) -> TiledImage:
+        path = json_dict["path"]
+        tile_size = json_dict["tile_size"]
+        if "raw_shape" in json_dict:
+            return TiledImage.open_raw(
+                path,
+                tuple(json_dict["raw_shape"]),
+                np.dtype(json_dict["raw_dtype"]),
+                json_dict["raw_offset"],
+                tile_size=tile_size,
+            )
+        return TiledImage.open(path, tile_size=tile_size)
+
+    def save_gui_options_to_json(self) -> JsonDict:
+        return {
+            "level": self.level,
+            "center_x": self.center_x,
+            "center_y": self.center_y,
+            "image_presenter": self.image_presenter.save_gui_options_to_json(),
+        }
+
+    def load_gui_options_from_json(self, json_dict: JsonDict) -> None:
+        self.level = json_dict.get("level", 0)
+        self.center_x = json_dict.get("center_x", 0)
+        self.center_y = json_dict.get("center_y", 0)
+        if "image_presenter" in json_dict:
+            self.image_presenter.load_gui_options_from_json(json_dict["image_presenter"])
+
+
+def _register() -> None:
+    from fiatlight.fiat_togui.gui_registry import register_type
+
+    register_type(TiledImage, TiledImageWithGui)
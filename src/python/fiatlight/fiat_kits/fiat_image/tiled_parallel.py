@@ -0,0 +1,148 @@
+"""tiled_parallel: run local neighbourhood image operations on overlapping strips, in a thread pool
+
+Many image functions (median blur, bilateral filter, morphology, Sobel, adaptive threshold, ...) are local
+neighbourhood operations: each output pixel only depends on the input pixels within a given radius (the halo).
+The image can then be split into horizontal strips, extended by the halo on each side, which are processed in
+parallel on a thread pool (OpenCV releases the GIL during its computations), and stitched back together.
+With a halo at least as large as the radius of the operation, the result is identical to a single call.
+
+Usage:
+    @tiled_parallel(halo=lambda params: params["ksize"] // 2)
+    def median_blur(image: ImageU8, ksize: int = 5) -> ImageU8:
+        return cv2.medianBlur(image, ksize)
+
+The halo is either a fixed number of pixels, or a function of the parameters of the call (dict: name -> value).
+It is also stored as the fiat attribute "halo" of the decorated function.
+The signature and the fiat attributes of the function are kept, so that it can be added to a graph.
+"""
+
+from fiatlight.fiat_kits.fiat_image.image_types import Image
+from fiatlight.fiat_kits.fiat_image.tiled_image import iter_tile_rects
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, TypeVar
+import functools
+import inspect
+import os
+
+import numpy as np
+
+
+# A halo: a number of pixels, or a function of the parameters of the call
+Halo = int | Callable[[Dict[str, Any]], int]
+ImageFunction = TypeVar("ImageFunction", bound=Callable[..., Any])
+
+# Images smaller than this (in pixels) are processed in a single call
+MIN_PIXELS_FOR_PARALLEL_STRIPS = 512 * 512
+
+_EXECUTOR: ThreadPoolExecutor | None = None
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="tiled_parallel")
+    return _EXECUTOR
+
+
+def process_in_parallel_strips(
+    fn: Callable[[Any], Image], image: Image, halo: int, nb_strips: int | None = None
+) -> Image:
+    """Apply fn to horizontal strips of the image (extended by halo pixels above and below), in parallel,
+    and stitch the results. fn must return an image of the same width and height as its input
+    (the dtype and channels may change).
+    nb_strips: number of strips (by default, the number of CPUs).
+    """
+    height, width = image.shape[:2]
+    if nb_strips is None:
+        nb_strips = os.cpu_count() or 4
+    nb_strips = min(nb_strips, max(height // max(2 * halo, 16), 1))
+    if nb_strips <= 1 or width * height < MIN_PIXELS_FOR_PARALLEL_STRIPS:
+        return fn(image)
+
+    strip_height = -(-height // nb_strips)
+    rects = list(iter_tile_rects(width, height, width, strip_height, overlap=halo))
+
+    def process_strip(strip_idx: int) -> Image:
+        (_, y, _, h), (_, oy, _, oh) = rects[strip_idx]
+        strip_out = fn(image[oy : oy + oh])
+        if strip_out.shape[:2] != (oh, width):
+            raise ValueError(
+                f"process_in_parallel_strips: {fn} returned an image of shape {strip_out.shape} for a strip of "
+                f"shape {image[oy : oy + oh].shape} (the width and height must be unchanged)"
+            )
+        return strip_out[y - oy : y - oy + h]  # type: ignore
+
+    # The first strip gives the dtype and channels of the output; the others are written directly into it
+    first_strip = process_strip(0)
+    output = np.empty((height, width) + first_strip.shape[2:], dtype=first_strip.dtype)
+    output[0 : first_strip.shape[0]] = first_strip
+
+    def process_strip_into_output(strip_idx: int) -> None:
+        (_, y, _, h), _ = rects[strip_idx]
+        output[y : y + h] = process_strip(strip_idx)
+
+    futures = [_executor().submit(process_strip_into_output, i) for i in range(1, len(rects))]
+    for future in futures:
+        future.result()
+    return output  # type: ignore
+
+
+def tiled_parallel(halo: Halo, nb_strips: int | None = None) -> Callable[[ImageFunction], ImageFunction]:
+    """Decorator for functions (image: Image, ...) -> Image that are local neighbourhood operations:
+    the image is processed in overlapping strips, in parallel (see process_in_parallel_strips)."""
+
+    def decorator(fn: ImageFunction) -> ImageFunction:
+        signature = inspect.signature(fn)
+        parameters: List[inspect.Parameter] = list(signature.parameters.values())
+        if len(parameters) == 0:
+            raise ValueError(f"tiled_parallel: {fn} should have an image as first parameter")
+
+        @functools.wraps(fn)
+        def tiled_fn(*args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            image = params.pop(parameters[0].name)
+            halo_pixels = halo(params) if callable(halo) else halo
+            return process_in_parallel_strips(lambda strip: fn(strip, **params), image, halo_pixels, nb_strips)
+
+        tiled_fn.halo = halo  # type: ignore
+        return tiled_fn  # type: ignore
+
+    return decorator
+
+
+def _benchmark_tiled_parallel_vs_single_call() -> None:
+    """Compare the duration of some neighbourhood operations, in a single call vs. in parallel strips"""
+    import cv2
+    import timeit
+
+    image = np.random.randint(0, 255, (3000, 4000, 3), dtype=np.uint8)
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7, 7))
+    operations: List[tuple[str, Callable[[Any], Any], Any, int]] = [
+        ("medianBlur(ksize=5)", lambda img: cv2.medianBlur(img, 5), image, 2),
+        ("bilateralFilter(d=9)", lambda img: cv2.bilateralFilter(img, 9, 75.0, 75.0), image, 5),
+        ("morphologyEx(OPEN, 7x7)", lambda img: cv2.morphologyEx(img, cv2.MORPH_OPEN, kernel), image, 7),
+        ("Sobel(ksize=3)", lambda img: cv2.Sobel(img, cv2.CV_16S, 1, 0, ksize=3), gray, 1),
+        (
+            "adaptiveThreshold(blockSize=11)",
+            lambda img: cv2.adaptiveThreshold(img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2),
+            gray,
+            5,
+        ),
+    ]
+    nb_runs = 5
+    print(f"Image {image.shape[1]}x{image.shape[0]}, {os.cpu_count()} CPUs, {nb_runs} runs")
+    for name, fn, img, halo in operations:
+        assert np.array_equal(fn(img), process_in_parallel_strips(fn, img, halo))
+        duration_single = timeit.timeit(lambda: fn(img), number=nb_runs) / nb_runs
+        duration_strips = timeit.timeit(lambda: process_in_parallel_strips(fn, img, halo), number=nb_runs) / nb_runs
+        print(
+            f"    {name:32s} single call: {duration_single * 1000:7.1f} ms    "
+            f"parallel strips: {duration_strips * 1000:7.1f} ms    speedup: x{duration_single / duration_strips:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    _benchmark_tiled_parallel_vs_single_call()
@@ -3,16 +3,26 @@
 Kept GUI-free so the palette can power non-popup surfaces too (a registry
 browser, a CLI list, headless tests). The matching popup widget lives in
 `fiat_palette.palette_gui`.
+
+Palettes may hold hundreds of functions, so:
+- adding a function only reads its name, tags and doc (no FunctionWithGui is built);
+  pin types are computed on first use by a type filter, and the compatibility
+  results are cached per dragged type;
+- the search text is matched through an inverted index (token -> functions),
+  with prefix / substring matching, and a fuzzy fallback for typos.
 """
 
 from dataclasses import dataclass, field
 from enum import Enum
+import bisect
+import inspect
+import re
 
 from pydantic import BaseModel, ConfigDict, Field
 
 from fiatlight.fiat_core import FunctionWithGui
 from fiatlight.fiat_types import Function
-from fiatlight.fiat_types.type_compat import is_link_compatible
+from fiatlight.fiat_types.type_compat import LinkCompatibilityMatrix, is_link_compatible
 from fiatlight.fiat_types.typename_utils import TypeLike
 
 from typing import Any, Callable
@@ -62,6 +72,9 @@ class PaletteFilter(BaseModel):
     latched_fn: "FunctionInfo | None" = Field(default=None, exclude=True)
 
 
+_NOT_COMPUTED: Any = object()
+
+
 @dataclass
 class FunctionInfo:
     name: str
@@ -69,25 +82,148 @@ class FunctionInfo:
     tags: list[str]
     doc: str | None
     doc_is_markdown: bool
+    # The function, when known: its pin types are then read from its signature,
+    # without building a FunctionWithGui.
+    fn: Function | None = None
     # Cached pin types so the compatibility filter does not have to re-factor
     # every function on every popup frame. Each entry is the parameter / output
     # name and its Python type (which may be None for unannotated outputs).
-    input_types: list[tuple[str, Any]] = field(default_factory=list)
-    output_types: list[Any] = field(default_factory=list)
+    # Computed on first access (see input_types / output_types).
+    _input_types: list[tuple[str, Any]] | None = None
+    _output_types: list[Any] | None = None
+    # Cached results of first_compatible_input / first_compatible_output, per dragged type
+    _compatible_input_cache: dict[Any, str | None] = field(default_factory=dict)
+    _compatible_output_cache: dict[Any, int | None] = field(default_factory=dict)
+
+    @property
+    def input_types(self) -> list[tuple[str, Any]]:
+        if self._input_types is None:
+            self._compute_pin_types()
+        assert self._input_types is not None
+        return self._input_types
+
+    @property
+    def output_types(self) -> list[Any]:
+        if self._output_types is None:
+            self._compute_pin_types()
+        assert self._output_types is not None
+        return self._output_types
+
+    def _compute_pin_types(self) -> None:
+        if self.fn is not None:
+            self._input_types, self._output_types = _pin_types_from_signature(self.fn)
+        else:
+            self._input_types, self._output_types = _pin_types_from_gui(self.function_factory())
 
     def first_compatible_input(self, dragged_output_type: TypeLike) -> str | None:
         """Return the name of the first input whose type accepts `dragged_output_type`."""
+        cached = _cache_get(self._compatible_input_cache, dragged_output_type)
+        if cached is not _NOT_COMPUTED:
+            return cached  # type: ignore
+        r: str | None = None
         for name, t in self.input_types:
             if t is not None and is_link_compatible(dragged_output_type, t):
-                return name
-        return None
+                r = name
+                break
+        _cache_set(self._compatible_input_cache, dragged_output_type, r)
+        return r
 
     def first_compatible_output(self, dragged_input_type: TypeLike) -> int | None:
         """Return the index of the first output whose type fits into `dragged_input_type`."""
+        cached = _cache_get(self._compatible_output_cache, dragged_input_type)
+        if cached is not _NOT_COMPUTED:
+            return cached  # type: ignore
+        r: int | None = None
         for idx, t in enumerate(self.output_types):
             if t is not None and is_link_compatible(t, dragged_input_type):
-                return idx
+                r = idx
+                break
+        _cache_set(self._compatible_output_cache, dragged_input_type, r)
+        return r
+
+
+def _cache_get(cache: dict[Any, Any], key: Any) -> Any:
+    try:
+        return cache.get(key, _NOT_COMPUTED)
+    except TypeError:  # unhashable type
+        return _NOT_COMPUTED
+
+
+def _cache_set(cache: dict[Any, Any], key: Any, value: Any) -> None:
+    try:
+        cache[key] = value
+    except TypeError:  # unhashable type
+        pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+#  Metadata extraction (without building a FunctionWithGui)
+# ----------------------------------------------------------------------------------------------------------------------
+def _pin_types_from_gui(gui: FunctionWithGui) -> tuple[list[tuple[str, Any]], list[Any]]:
+    input_types = [(gui.input_of_idx(i).name, gui.input_of_idx(i).data_with_gui._type) for i in range(gui.nb_inputs())]
+    output_types = [gui.output(i)._type for i in range(gui.nb_outputs())]
+    return input_types, output_types
+
+
+# Pin type (i.e. the `_type` of the GUI that FunctionWithGui would create) per annotation
+_PIN_TYPES_CACHE: dict[Any, Any] = {}
+
+
+def _pin_type(annotation: Any) -> Any:
+    """The type of the GUI that FunctionWithGui would create for this annotation
+    (it is what FunctionsGraph uses to check links: it may differ from the annotation, e.g. for Annotated types)
+    """
+    from fiatlight.fiat_togui.to_gui import _any_type_to_gui_impl
+    from fiatlight.fiat_types.base_types import FiatAttributes
+
+    if annotation is None or annotation is inspect.Parameter.empty:
         return None
+    r = _cache_get(_PIN_TYPES_CACHE, annotation)
+    if r is _NOT_COMPUTED:
+        r = _any_type_to_gui_impl(annotation, FiatAttributes({}))._type
+        _cache_set(_PIN_TYPES_CACHE, annotation, r)
+    return r
+
+
+def _pin_types_from_signature(fn: Function) -> tuple[list[tuple[str, Any]], list[Any]]:
+    """Same result as _pin_types_from_gui(FunctionWithGui(fn)), computed from the signature"""
+    from fiatlight.fiat_togui.function_signature import get_function_signature
+    from fiatlight.fiat_togui.to_gui import _any_type_to_gui_impl
+    from fiatlight.fiat_togui.tuple_with_gui import TupleWithGui
+    from fiatlight.fiat_types.base_types import FiatAttributes
+
+    signature = get_function_signature(fn)
+    input_types = [(name, _pin_type(param.annotation)) for name, param in signature.parameters.items()]
+
+    return_annotation = signature.return_annotation
+    output_types: list[Any]
+    if return_annotation is inspect.Parameter.empty:
+        output_types = [None]
+    elif return_annotation is None:
+        output_types = []
+    else:
+        output_gui = _any_type_to_gui_impl(return_annotation, FiatAttributes({}))
+        if isinstance(output_gui, TupleWithGui):  # tuples are split into several outputs
+            output_types = [inner_gui._type for inner_gui in output_gui._inner_guis]
+        else:
+            output_types = [output_gui._type]
+    return input_types, output_types
+
+
+def _function_doc(fn: Function) -> tuple[str | None, bool]:
+    """(user doc, is markdown), as FunctionWithGui.get_function_doc() would return them"""
+    from fiatlight.fiat_utils import docstring_utils
+
+    doc_is_markdown = bool(getattr(fn, "doc_markdown", True))
+    if not getattr(fn, "doc_display", True):
+        return "", doc_is_markdown
+    doc_user = getattr(fn, "doc_user", "")
+    if doc_user:
+        return docstring_utils.unindent_docstring(doc_user), doc_is_markdown
+    docstring = getattr(fn, "__doc__", None)
+    if docstring is None:
+        return None, doc_is_markdown
+    return docstring_utils.unindent_docstring(docstring), doc_is_markdown
 
 
 def _read_fiat_tags(fn: Function) -> list[str]:
@@ -121,11 +257,102 @@ def _search_terms(search_text: str) -> list[str]:
     return [t.lower() for t in tokens if t]
 
 
+# ----------------------------------------------------------------------------------------------------------------------
+#  Search index
+# ----------------------------------------------------------------------------------------------------------------------
+# A search term made only of these characters is matched via the index
+# (other terms, e.g. quoted terms with spaces, are matched against the full text)
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+
+def _search_text_of(fi: FunctionInfo) -> str:
+    parts = [fi.name, *fi.tags]
+    if fi.doc is not None:
+        parts.append(fi.doc)
+    return "\n".join(parts).lower()
+
+
+class _SearchIndex:
+    """Inverted index: token -> indexes of the functions whose name, tags or doc contain this token.
+
+    A term matches a function if it is a substring of one of its tokens (prefix matches are found
+    by bisection in the sorted vocabulary). This is equivalent to a substring search inside the text
+    of the function. If a term matches nothing, close tokens (typos) are used instead.
+    """
+
+    _texts: list[str]  # lowercase search text of each function
+    _postings: dict[str, set[int]]
+    _sorted_vocabulary: list[str] | None
+    _term_cache: dict[str, frozenset[int]]
+
+    _MAX_CACHED_TERMS = 1000
+
+    def __init__(self) -> None:
+        self._texts = []
+        self._postings = {}
+        self._sorted_vocabulary = None
+        self._term_cache = {}
+
+    def add(self, fi: FunctionInfo) -> None:
+        idx = len(self._texts)
+        text = _search_text_of(fi)
+        self._texts.append(text)
+        for token in set(_TOKEN_RE.findall(text)):
+            self._postings.setdefault(token, set()).add(idx)
+        self._sorted_vocabulary = None
+        self._term_cache.clear()
+
+    def _vocabulary(self) -> list[str]:
+        if self._sorted_vocabulary is None:
+            self._sorted_vocabulary = sorted(self._postings.keys())
+        return self._sorted_vocabulary
+
+    def _matching_tokens(self, term: str) -> list[str]:
+        vocabulary = self._vocabulary()
+        # Prefix matches (most common when typing)
+        start = bisect.bisect_left(vocabulary, term)
+        end = bisect.bisect_left(vocabulary, term + "\x7f")
+        tokens = vocabulary[start:end]
+        # Other substring matches
+        tokens += [token for token in vocabulary[:start] if term in token]
+        tokens += [token for token in vocabulary[end:] if term in token]
+        if len(tokens) == 0 and len(term) >= 3:
+            import difflib
+
+            tokens = difflib.get_close_matches(term, vocabulary, n=5, cutoff=0.8)
+        return tokens
+
+    def matching_functions(self, term: str) -> frozenset[int]:
+        """Indexes of the functions that match the (lowercase) term"""
+        cached = self._term_cache.get(term)
+        if cached is not None:
+            return cached
+        if _TOKEN_RE.fullmatch(term):
+            r: set[int] = set()
+            for token in self._matching_tokens(term):
+                r.update(self._postings[token])
+        else:
+            r = {idx for idx, text in enumerate(self._texts) if term in text}
+        if len(self._term_cache) >= self._MAX_CACHED_TERMS:
+            self._term_cache.clear()
+        result = frozenset(r)
+        self._term_cache[term] = result
+        return result
+
+
 class FunctionPalette:
     _functions: list[FunctionInfo]
+    _search_index: _SearchIndex
+    # FunctionInfo id -> index in _functions
+    _function_indexes: dict[int, int]
+    # Compatibility between all the pin types of the palette (computed when a type filter is first used)
+    _link_compatibility_matrix: LinkCompatibilityMatrix | None
 
     def __init__(self) -> None:
         self._functions = []
+        self._search_index = _SearchIndex()
+        self._function_indexes = {}
+        self._link_compatibility_matrix = None
 
     def add_function_list(self, fn_list: list[Function]) -> None:
         import copy
@@ -140,26 +367,33 @@ class FunctionPalette:
         def factory() -> FunctionWithGui:
             return FunctionWithGui(fn)
 
-        self._add_function_factory(factory, tags)
+        # The metadata is read directly from the function: no FunctionWithGui is built here
+        name = fn.__name__ if hasattr(fn, "__name__") else ""
+        if name == "":
+            raise ValueError(f"FunctionPalette: function {fn!r} has no name")
+        doc, doc_is_markdown = _function_doc(fn)
+        self._add_function_info(FunctionInfo(name, factory, tags, doc, doc_is_markdown, fn=fn))
 
     def _add_function_factory(self, function_factory: FunctionWithGuiFactory, tags: list[str]) -> None:
         gui = function_factory()
-        name = gui.function_name
         doc = gui.get_function_doc()
-        input_types = [
-            (gui.input_of_idx(i).name, gui.input_of_idx(i).data_with_gui._type) for i in range(gui.nb_inputs())
-        ]
-        output_types = [gui.output(i)._type for i in range(gui.nb_outputs())]
+        input_types, output_types = _pin_types_from_gui(gui)
         function_info = FunctionInfo(
-            name,
+            gui.function_name,
             function_factory,
             tags,
             doc.user_doc,
             doc.is_user_doc_markdown,
-            input_types=input_types,
-            output_types=output_types,
+            _input_types=input_types,
+            _output_types=output_types,
         )
+        self._add_function_info(function_info)
+
+    def _add_function_info(self, function_info: FunctionInfo) -> None:
+        self._function_indexes[id(function_info)] = len(self._functions)
         self._functions.append(function_info)
+        self._search_index.add(function_info)
+        self._link_compatibility_matrix = None
 
     def tags_set(self) -> list[str]:
         tags: set[str] = set()
@@ -167,6 +401,16 @@ class FunctionPalette:
             tags.update(function_info.tags)
         return sorted(tags)
 
+    def link_compatibility_matrix(self) -> LinkCompatibilityMatrix:
+        """The link compatibility between all the pin types of the palette"""
+        if self._link_compatibility_matrix is None:
+            pin_types: list[TypeLike] = []
+            for fi in self._functions:
+                pin_types.extend(t for _, t in fi.input_types)
+                pin_types.extend(fi.output_types)
+            self._link_compatibility_matrix = LinkCompatibilityMatrix(pin_types)
+        return self._link_compatibility_matrix
+
     def filter(self, filt: PaletteFilter) -> list[FunctionInfo]:
         """Apply tag / type / search-text filters in one pass."""
         # 1. Tag filter.
@@ -181,27 +425,33 @@ class FunctionPalette:
             infos = list(self._functions)
 
         # 2. Type filters: AND-combined.
-        if filt.input_type_filter is not None:
-            tl = filt.input_type_filter
-            infos = [fi for fi in infos if fi.first_compatible_input(tl) is not None]
-        if filt.output_type_filter is not None:
-            tl = filt.output_type_filter
-            infos = [fi for fi in infos if fi.first_compatible_output(tl) is not None]
+        if filt.input_type_filter is not None or filt.output_type_filter is not None:
+            matrix = self.link_compatibility_matrix()
+
+            def accepts_input(fi: FunctionInfo, dragged_output_type: TypeLike) -> bool:
+                return any(t is not None and matrix.is_compatible(dragged_output_type, t) for _, t in fi.input_types)
+
+            def fits_output(fi: FunctionInfo, dragged_input_type: TypeLike) -> bool:
+                return any(t is not None and matrix.is_compatible(t, dragged_input_type) for t in fi.output_types)
+
+            if filt.input_type_filter is not None:
+                tl = filt.input_type_filter
+                infos = [fi for fi in infos if accepts_input(fi, tl)]
+            if filt.output_type_filter is not None:
+                tl = filt.output_type_filter
+                infos = [fi for fi in infos if fits_output(fi, tl)]
 
         # 3. Search text.
         terms = _search_terms(filt.search_text)
         if not terms:
             return infos
 
-        def haystack(fi: FunctionInfo) -> str:
-            parts = [fi.name, *fi.tags]
-            if fi.doc is not None:
-                parts.append(fi.doc)
-            return "\n".join(parts).lower()
-
+        terms_matches = [self._search_index.matching_functions(t) for t in terms]
         if filt.match_mode is TagMatchMode.AND:
-            return [fi for fi in infos if all(t in haystack(fi) for t in terms)]
-        return [fi for fi in infos if any(t in haystack(fi) for t in terms)]
+            matching_indexes = frozenset.intersection(*terms_matches)
+        else:
+            matching_indexes = frozenset.union(*terms_matches)
+        return [fi for fi in infos if self._function_indexes[id(fi)] in matching_indexes]
 
     def factor_function_from_name(self, name: str) -> FunctionWithGui:
         for function_info in self._functions:
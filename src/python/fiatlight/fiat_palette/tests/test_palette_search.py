@@ -0,0 +1,72 @@
+"""FunctionPalette: lazy metadata extraction, and search via the inverted index."""
+
+from typing import Tuple
+
+import fiatlight as fl
+from fiatlight.fiat_core import FunctionWithGui
+from fiatlight.fiat_palette import FunctionPalette, PaletteFilter
+from fiatlight.fiat_palette.palette import TagMatchMode, _pin_types_from_gui
+
+
+@fl.with_fiat_attributes(fiat_tags=["image"])
+def gaussian_blur(x: int, sigma: float = 1.0) -> int:
+    """Blur an image with a gaussian kernel"""
+    return x
+
+
+@fl.with_fiat_attributes(fiat_tags=["image"])
+def canny_edges(x: int) -> Tuple[int, float]:
+    """Detect the edges of an image"""
+    return x, 0.0
+
+
+@fl.with_fiat_attributes(fiat_tags=["text"])
+def split_words(s: str) -> list[str]:
+    """Split a text into words"""
+    return s.split()
+
+
+def _palette() -> FunctionPalette:
+    p = FunctionPalette()
+    p.add_function_list([gaussian_blur, canny_edges, split_words])
+    return p
+
+
+def _search(p: FunctionPalette, text: str, match_mode: TagMatchMode = TagMatchMode.AND) -> list[str]:
+    return [fi.name for fi in p.filter(PaletteFilter(search_text=text, match_mode=match_mode))]
+
+
+def test_pin_types_match_function_with_gui() -> None:
+    p = _palette()
+    for fi in p._functions:
+        assert fi.fn is not None
+        input_types, output_types = _pin_types_from_gui(FunctionWithGui(fi.fn))
+        assert fi.input_types == input_types
+        assert fi.output_types == output_types
+
+
+def test_search_prefix_substring_and_phrase() -> None:
+    p = _palette()
+    assert _search(p, "") == ["gaussian_blur", "canny_edges", "split_words"]
+    assert _search(p, "gauss") == ["gaussian_blur"]  # prefix
+    assert _search(p, "edge") == ["canny_edges"]  # inside a token
+    assert _search(p, "IMAGE") == ["gaussian_blur", "canny_edges"]  # case insensitive, tags and docs
+    assert _search(p, "image blur") == ["gaussian_blur"]
+    assert _search(p, "blur words", TagMatchMode.OR) == ["gaussian_blur", "split_words"]
+    assert _search(p, '"into words"') == ["split_words"]  # quoted phrase
+
+
+def test_search_fuzzy_fallback() -> None:
+    p = _palette()
+    assert _search(p, "gausian") == ["gaussian_blur"]
+    assert _search(p, "zzzzzz") == []
+
+
+def test_compatible_pins_are_cached() -> None:
+    p = _palette()
+    fi = next(fi for fi in p._functions if fi.name == "canny_edges")
+    assert fi.first_compatible_input(int) == "x"
+    assert fi.first_compatible_output(float) == 1
+    assert fi.first_compatible_input(str) is None
+    assert fi._compatible_input_cache == {int: "x", str: None}
+    assert fi._compatible_output_cache == {float: 1}
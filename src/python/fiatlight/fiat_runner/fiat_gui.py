@@ -3,17 +3,26 @@ from dataclasses import dataclass
 from fiatlight.fiat_nodes.function_node_gui import FunctionNodeGui
 from fiatlight.fiat_nodes.functions_graph_gui import FunctionsGraphGui
 from fiatlight.fiat_core import FunctionsGraph, FunctionWithGui
+from fiatlight.fiat_core.binary_sidecar import BinarySidecar, binary_sidecar_ctx
+from fiatlight.fiat_core.autosave import Autosaver, write_text_file_atomically
+from fiatlight.fiat_core.file_writer import stop_background_file_writer
 from fiatlight.fiat_types.function_types import VoidFunction
 from fiatlight.fiat_types.function_types import Function
+from fiatlight.fiat_types.base_types import JsonDict
 from fiatlight.fiat_widgets import fiat_osd
 from fiatlight.fiat_utils import functional_utils
 from fiatlight.fiat_palette import FunctionPalette
-from fiatlight.fiat_kits.fiat_image.image_types import ImageRgb
 from fiatlight.fiat_config import get_fiat_config
 from imgui_bundle import immapp, imgui, portable_file_dialogs as pfd, imgui_node_editor as ed
-from typing import Any, Callable
+from typing import Any, Callable, TYPE_CHECKING
 from imgui_bundle import hello_imgui, ImVec2, immvision, imgui_md
 
+if TYPE_CHECKING:
+    # fiat_image is imported lazily (it imports cv2)
+    from fiatlight.fiat_kits.fiat_image.image_types import ImageRgb
+    from fiatlight.fiat_kits.fiat_image.preview_mode import ImagePreviewMode
+    from fiatlight.fiat_kits.fiat_image.roi_mode import ImageRoiMode
+
 import json
 import logging
 import pathlib
@@ -125,10 +134,10 @@ def _init_logger() -> None:
 
 
 # Last image
-_LAST_SCREENSHOT: ImageRgb | None = None
+_LAST_SCREENSHOT: "ImageRgb | None" = None
 
 
-def get_last_screenshot() -> ImageRgb | None:
+def get_last_screenshot() -> "ImageRgb | None":
     """Returns a screenshot of the nodes of the last frame, just before exiting the app."""
     return _LAST_SCREENSHOT
 
@@ -179,6 +188,19 @@ class FiatRunParams:
     # FiatLight specific members
     customizable_graph: bool = False
     delete_settings: bool = False
+    # If True, the user inputs (and the graph composition, if customizable) are saved in the background
+    # after each change (once no change happened during autosave_debounce_seconds)
+    autosave: bool = True
+    autosave_debounce_seconds: float = 2.0
+    # If True, during interactions the image functions run on downscaled proxies of their large ImageU8 inputs
+    # (at most image_preview_max_size pixels), and at full resolution once the interaction settles.
+    # See fiatlight.fiat_kits.fiat_image.preview_mode
+    image_preview: bool = False
+    image_preview_max_size: int = 512
+    # If True, the image functions flagged with a "halo" fiat attribute compute only the region of their output
+    # that is displayed (when zoomed in), and the full frame lazily. See fiatlight.fiat_kits.fiat_image.roi_mode
+    # (with image_preview, the ROI is not used while previewing)
+    image_roi: bool = False
 
 
 # ==================================================================================================================
@@ -208,6 +230,10 @@ class FiatGui:
 
     _logo_texture: imgui.ImTextureRef
 
+    _autosavers: List[Autosaver]
+    _image_preview_mode: "ImagePreviewMode | None" = None
+    _image_roi_mode: "ImageRoiMode | None" = None
+
     # ==================================================================================================================
     #                                  Constructor
     # ==================================================================================================================
@@ -232,6 +258,7 @@ class FiatGui:
         if self.params.delete_settings:
             self._del_user_settings()
         self.was_post_init_called = False
+        self._autosavers = []
 
     def _prepare_runner_params(self) -> None:
         params = self.params
@@ -293,10 +320,15 @@ class FiatGui:
         self._notify_if_dirty_functions()
         self._disable_idling_if_any_live_function()
         _init_logger()
+        self._create_autosavers()
+        self._create_image_preview_mode()
+        self._create_image_roi_mode()
 
     def _before_exit(self) -> None:
         self._store_final_app_window_screenshot()
         self._functions_graph_gui.on_exit()
+        self._stop_autosavers()
+        stop_background_file_writer()
         if self.params.customizable_graph:
             self._save_graph_composition(self._graph_composition_filename())
         self._save_user_inputs(self._user_settings_filename())
@@ -519,6 +551,7 @@ class FiatGui:
             any_change = self._functions_graph_gui.draw()
             if any_change:
                 self._notify_if_dirty_functions()
+                self._notify_autosavers()
 
         self._show_help_and_logo_tooltip_window()
 
@@ -533,10 +566,18 @@ class FiatGui:
         for fn in self._functions_graph_gui.function_nodes_gui:
             fn.focused_function_draw_window()
 
+        if self._image_preview_mode is not None:
+            self._image_preview_mode.heartbeat()
+        if self._image_roi_mode is not None:
+            self._image_roi_mode.heartbeat()
+
     def _post_gui_after_swap(self) -> None:
         _ENQUEUED_CALLBACKS.run_post_frame_callbacks()
         if self._functions_graph_gui.did_any_focused_window_change_something():
             self._notify_if_dirty_functions()
+            self._notify_autosavers()
+        for autosaver in self._autosavers:
+            autosaver.heartbeat()
 
     def _handle_file_dialogs(self) -> None:
         if self.save_dialog is not None and self.save_dialog.ready():
@@ -626,6 +667,11 @@ class FiatGui:
             path = pathlib.Path(file)
             if path.exists():
                 path.unlink()
+        sidecar_dir = pathlib.Path(BinarySidecar(self._user_settings_filename()).directory)
+        if sidecar_dir.is_dir():
+            import shutil
+
+            shutil.rmtree(sidecar_dir)
 
     def _node_settings_filename(self) -> str:
         loc = hello_imgui.ini_settings_location(self._runner_params)
@@ -642,7 +688,20 @@ class FiatGui:
         assert loc is not None
         return loc[:-4] + ".fiat_graph.json"
 
+    def _snapshot_data(self, save_type: _SaveType) -> JsonDict:
+        if save_type == _SaveType.UserInputs:
+            return {
+                "user_inputs": self._functions_graph_gui.save_user_inputs_to_json(),
+                "gui_options": self._functions_graph_gui.save_gui_options_to_json(),
+            }
+        else:
+            return self._functions_graph_gui.save_graph_composition_to_json()
+
     def _save_data(self, filename: str, save_type: _SaveType) -> None:
+        # Wait for the background saves, which may write to the same files
+        for autosaver in self._autosavers:
+            autosaver.flush()
+
         has_extension = "." in filename
         if not has_extension:
             if save_type == _SaveType.GraphComposition:
@@ -650,18 +709,13 @@ class FiatGui:
             elif save_type == _SaveType.UserInputs:
                 filename += ".fiat_user.json"
 
-        json_data = {}
-        if save_type == _SaveType.UserInputs:
-            json_data = {
-                "user_inputs": self._functions_graph_gui.save_user_inputs_to_json(),
-                "gui_options": self._functions_graph_gui.save_gui_options_to_json(),
-            }
-        elif save_type == _SaveType.GraphComposition:
-            json_data = self._functions_graph_gui.save_graph_composition_to_json()
         try:
-            with open(filename, "w") as f:
-                json_str = json.dumps(json_data, indent=4)
-                f.write(json_str)
+            # Large values (arrays, data frames) are stored in a binary sidecar directory next to the json file
+            sidecar = BinarySidecar(filename)
+            with binary_sidecar_ctx(sidecar):
+                json_data = self._snapshot_data(save_type)
+            write_text_file_atomically(filename, json.dumps(json_data, indent=4))
+            sidecar.remove_unreferenced_files()
         except Exception as e:
             logging.error(f"FiatGui: Error saving state file {self._user_settings_filename()}: {e}")
 
@@ -684,15 +738,16 @@ class FiatGui:
                 logging.warning(f"Could not find state file {self._user_settings_filename()}")
             return False
         try:
-            if save_type == _SaveType.UserInputs:
-                self._functions_graph_gui.load_user_inputs_from_json(json_data["user_inputs"])
-                self._functions_graph_gui.load_gui_options_from_json(json_data["gui_options"])
-            elif save_type == _SaveType.GraphComposition:
+            with binary_sidecar_ctx(BinarySidecar(filename)):
+                if save_type == _SaveType.UserInputs:
+                    self._functions_graph_gui.load_user_inputs_from_json(json_data["user_inputs"])
+                    self._functions_graph_gui.load_gui_options_from_json(json_data["gui_options"])
+                elif save_type == _SaveType.GraphComposition:
 
-                def factor_function_from_name(name: str) -> Any:
-                    return self._function_palette.factor_function_from_name(name)
+                    def factor_function_from_name(name: str) -> Any:
+                        return self._function_palette.factor_function_from_name(name)
 
-                self._functions_graph_gui.load_graph_composition_from_json(json_data, factor_function_from_name)
+                    self._functions_graph_gui.load_graph_composition_from_json(json_data, factor_function_from_name)
         except Exception as e:
             logging.warning(
                 f"""
@@ -730,6 +785,58 @@ class FiatGui:
         if success:
             self._functions_graph_gui.invoke_all_functions(also_invoke_manual_function=False)
 
+    def _create_autosavers(self) -> None:
+        if not self.params.autosave:
+            return
+        debounce_seconds = self.params.autosave_debounce_seconds
+        self._autosavers.append(
+            Autosaver(
+                self._user_settings_filename(),
+                lambda: self._snapshot_data(_SaveType.UserInputs),
+                debounce_seconds=debounce_seconds,
+            )
+        )
+        if self.params.customizable_graph:
+            self._autosavers.append(
+                Autosaver(
+                    self._graph_composition_filename(),
+                    lambda: self._snapshot_data(_SaveType.GraphComposition),
+                    debounce_seconds=debounce_seconds,
+                )
+            )
+
+    def _notify_autosavers(self) -> None:
+        for autosaver in self._autosavers:
+            autosaver.notify_changed()
+
+    def _stop_autosavers(self) -> None:
+        for autosaver in self._autosavers:
+            autosaver.stop()
+        self._autosavers = []
+
+    def _create_image_preview_mode(self) -> None:
+        if not self.params.image_preview:
+            return
+        from fiatlight.fiat_kits.fiat_image.preview_mode import ImagePreviewMode
+
+        self._image_preview_mode = ImagePreviewMode(
+            self._functions_graph_gui.functions_graph, max_preview_size=self.params.image_preview_max_size
+        )
+        self._image_preview_mode.attach()
+
+    def _create_image_roi_mode(self) -> None:
+        if not self.params.image_roi:
+            return
+        from fiatlight.fiat_kits.fiat_image.roi_mode import ImageRoiMode
+
+        # The ROI is not used while previewing (see roi_mode.py)
+        preview_mode = self._image_preview_mode
+        self._image_roi_mode = ImageRoiMode(
+            self._functions_graph_gui.functions_graph,
+            is_previewing=(lambda: False) if preview_mode is None else preview_mode.is_previewing,
+        )
+        self._image_roi_mode.attach()
+
     def _save_user_inputs(self, filename: str) -> None:
         self._save_data(filename, _SaveType.UserInputs)
 
@@ -1,9 +1,12 @@
 from fiatlight.fiat_core import FunctionsGraph
 from fiatlight.fiat_runner.fiat_gui import FiatRunParams, FiatGui
 from fiatlight.fiat_runner.fiat_gui import get_last_screenshot
-from fiatlight.fiat_kits.fiat_image import ImageRgb
 from imgui_bundle import hello_imgui, immapp
-from typing import Tuple, Optional
+from typing import Tuple, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # fiat_image is imported lazily (it imports cv2)
+    from fiatlight.fiat_kits.fiat_image import ImageRgb
 
 ScreenSize = Tuple[int, int]
 
@@ -45,7 +48,7 @@ def _fiat_nb_run_graph_and_save_screenshot(
         )
         fiat_gui.run()
 
-    def make_thumbnail(image: ImageRgb) -> ImageRgb:
+    def make_thumbnail(image: "ImageRgb") -> "ImageRgb":
         resize_ratio = 1.0
         if notebook_runner_params.thumbnail_ratio is not None:
             resize_ratio = notebook_runner_params.thumbnail_ratio
@@ -68,7 +71,7 @@ def _fiat_nb_run_graph_and_save_screenshot(
             thumbnail_image = image
         return thumbnail_image  # type: ignore
 
-    def display_image(image: ImageRgb) -> None:
+    def display_image(image: "ImageRgb") -> None:
         pil_image = PIL.Image.fromarray(image)
         display(pil_image)  # type: ignore
 
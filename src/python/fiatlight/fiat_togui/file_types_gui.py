@@ -1,5 +1,6 @@
 from fiatlight.fiat_core.any_data_with_gui import AnyDataWithGui
 from fiatlight.fiat_core.function_with_gui import FunctionWithGui
+from fiatlight.fiat_core.file_writer import background_file_writer
 from fiatlight.fiat_types.file_types import (  # noqa
     FilePath,
     FilePath_Save,
@@ -232,8 +233,14 @@ def text_from_file(path: TextPath) -> str | None:
 
 
 class TextToFileGui(FunctionWithGui):
+    """Saves the text to a file. The file is written on a background thread (see fiat_core/file_writer.py).
+    With "Export on change", each new text is saved to the last selected file."""
+
+    export_on_change: bool = False
+    _export_path: str | None = None
     _save_dialog: pfd.save_file | None = None
     _text: str | None = None
+    _exception_message: str | None = None
 
     def __init__(self) -> None:
         super().__init__(self.f, "TextToFile")
@@ -241,11 +248,20 @@ class TextToFileGui(FunctionWithGui):
 
     def f(self, text: str) -> None:
         self._text = text
+        if self.export_on_change and self._export_path is not None:
+            self.do_write(self._export_path)  # type: ignore
 
     def do_write(self, path: FilePath_Save) -> None:
+        """Submit the text to the background writer (the call returns immediately)"""
         assert self._text is not None
-        with open(path, "w") as f:
-            f.write(self._text)
+        text = self._text
+        self._export_path = path
+        background_file_writer().submit(
+            path, lambda: text.encode("utf-8"), coalesce_key=(id(self), path), on_done=self._on_write_done
+        )
+
+    def _on_write_done(self, error: str | None) -> None:
+        self._exception_message = error
 
     def _internal_state_gui(self) -> bool:
         if self._text is None:
@@ -254,6 +270,18 @@ class TextToFileGui(FunctionWithGui):
             self._save_dialog = pfd.save_file("Select file", "", ["*.txt", _ACCEPT_ANY_FILE])
         if self._save_dialog is not None and self._save_dialog.ready():
             selected_file = self._save_dialog.result()
-            self.do_write(selected_file)  # type: ignore
+            if selected_file != "":
+                self.do_write(selected_file)  # type: ignore
             self._save_dialog = None
+        if self._export_path is not None:
+            _, self.export_on_change = imgui.checkbox("Export on change", self.export_on_change)
+            imgui.set_item_tooltip(f"Save each new text to {self._export_path}")
+        writer = background_file_writer()
+        if writer.is_busy():
+            imgui.text(writer.stats_report())
+        if self._exception_message is not None:
+            from fiatlight import fiat_config as fc
+
+            color = fc.get_fiat_config().style.color_as_vec4(fc.FiatColorType.ExceptionError)
+            imgui.text_colored(color, self._exception_message)
         return False
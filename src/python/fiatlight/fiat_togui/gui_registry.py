@@ -6,7 +6,7 @@ from fiatlight.fiat_types.fiat_number_types import FloatInterval, IntInterval
 from fiatlight.fiat_core.any_data_with_gui import AnyDataWithGui
 from fiatlight.fiat_utils import docstring_first_line
 
-from typing import Any, Callable, Generic, List, NewType, Tuple, Type, TypeAlias
+from typing import Any, Callable, Dict, Generic, List, NewType, Tuple, Type, TypeAlias
 from enum import Enum
 from dataclasses import dataclass
 from types import NoneType
@@ -60,6 +60,8 @@ class _GuiFactoryWithMatcher(Generic[DataType]):
     gui_factory: GuiFactory[Any]
     datatype: Type[Any] | None
     datatype_explanation: str | None = None
+    # If not None, fn_matcher matches only this exact typename (this enables a fast lookup by typename)
+    exact_typename: Typename | None = None
 
     def sort_key_by_parent_module_then_name(self) -> tuple[str, str]:
         # a sort key (unused at the moment)
@@ -142,6 +144,19 @@ class GuiFactories:
 
     _factories: List[_GuiFactoryWithMatcher[Any]]
 
+    # Lookup acceleration (the last registered factory that matches a typename wins):
+    #   - _exact_typename_index: exact typename -> index of the last factory registered for it
+    #   - _generic_indexes: indexes of the factories whose matcher is not an exact typename match
+    #   - _resolution_cache: typename -> index of the matching factory (or None), memoized.
+    #     Matchers are pure functions of the typename, so this cache is only invalidated on registration.
+    _exact_typename_index: Dict[Typename, int]
+    _generic_indexes: List[int]
+    _resolution_cache: Dict[Typename, int | None]
+
+    # Loaders that register factories on demand (e.g. by importing a kit),
+    # when a typename that matches their matcher is first encountered (see register_lazy_factories)
+    _lazy_loaders: List[Tuple[FnTypenameMatcher, Callable[[], None]]]
+
     # if _GUI_FACTORIES.can_handle_union_type(union_args):
     # return _GUI_FACTORIES.factor_union_type(union_args, fiat_attributes)
 
@@ -154,6 +169,10 @@ class GuiFactories:
 
     def __init__(self) -> None:
         self._factories = []
+        self._exact_typename_index = {}
+        self._generic_indexes = []
+        self._resolution_cache = {}
+        self._lazy_loaders = []
 
     def _InfoSection(self) -> None:  # dummy method to create a section in the IDE  # noqa
         """
@@ -164,6 +183,7 @@ class GuiFactories:
 
     def info_factories(self, query: str | None = None) -> str:
         """Returns a nice table listing detailed info about the factories in the registry."""
+        self._run_lazy_loaders(None)
         if query is None:
             factories = self._factories
         else:
@@ -186,6 +206,7 @@ class GuiFactories:
 
     def _cli_search_gui_type(self, typename_gui_or_data: str) -> AnyDataWithGui[Any] | _ErrorMessage:
         matching_guis: List[AnyDataWithGui[Any]] = []
+        self._run_lazy_loaders(None)
 
         def add_gui_type(gui_type_: AnyDataWithGui[Any]) -> None:
             # check if already present
@@ -283,13 +304,65 @@ class GuiFactories:
         # ==================================================================================================================
         """
 
+    def _add_factory(self, factory_with_matcher: _GuiFactoryWithMatcher[Any]) -> None:
+        if factory_with_matcher.exact_typename is not None:
+            # A lazy kit that handles this type shall be loaded first, so that this new factory has priority
+            self._run_lazy_loaders(factory_with_matcher.exact_typename)
+        idx = len(self._factories)
+        self._factories.append(factory_with_matcher)
+        if factory_with_matcher.exact_typename is not None:
+            self._exact_typename_index[factory_with_matcher.exact_typename] = idx
+        else:
+            self._generic_indexes.append(idx)
+        self._resolution_cache.clear()
+
+    def register_lazy_factories(self, matcher: FnTypenameMatcher, loader: Callable[[], None]) -> None:
+        """Registers a loader that will register factories (typically by importing a kit),
+        when a typename that matches `matcher` is first encountered.
+        This avoids importing heavy modules (cv2, pandas, matplotlib, ...) when they are not needed.
+        """
+        self._lazy_loaders.append((matcher, loader))
+        self._resolution_cache.clear()
+
+    def _run_lazy_loaders(self, typename: Typename | None) -> None:
+        """Runs (once) the lazy loaders that match the typename (or all of them if typename is None)"""
+        if len(self._lazy_loaders) == 0:
+            return
+        matching_loaders = []
+        remaining_loaders = []
+        for matcher, loader in self._lazy_loaders:
+            if typename is None or matcher(typename):
+                matching_loaders.append(loader)
+            else:
+                remaining_loaders.append((matcher, loader))
+        # The loaders are removed before being run, since they will register factories
+        self._lazy_loaders = remaining_loaders
+        for loader in matching_loaders:
+            loader()
+
+    def _find_factory_index(self, typename: Typename) -> int | None:
+        """Returns the index of the last registered factory that matches the typename (or None)"""
+        if typename in self._resolution_cache:
+            return self._resolution_cache[typename]
+        self._run_lazy_loaders(typename)
+        exact_idx = self._exact_typename_index.get(typename)
+        r = exact_idx
+        # A generic factory registered after the exact one has priority
+        for generic_idx in reversed(self._generic_indexes):
+            if exact_idx is not None and generic_idx < exact_idx:
+                break
+            if self._factories[generic_idx].fn_matcher(typename):
+                r = generic_idx
+                break
+        self._resolution_cache[typename] = r
+        return r
+
     def get_factory(self, typename: Typename) -> GuiFactory[Any]:
         """Returns the factory that can convert a type to a GUI representation."""
-        # We reverse the list to give priority to the last registered factories
-        for factory in reversed(self._factories):
-            if factory.fn_matcher(typename):
-                return factory.gui_factory
-        raise ValueError(f"No factory found for typename {typename}")
+        idx = self._find_factory_index(typename)
+        if idx is None:
+            raise ValueError(f"No factory found for typename {typename}")
+        return self._factories[idx].gui_factory
 
     def register_typing_new_type(self, type_: Any, factory: GuiFactory[Any]) -> None:
         """Registers a factory for a type created with typing.NewType."""
@@ -308,7 +381,9 @@ class GuiFactories:
                 {base_typename}.__doc__ = "MyType is a synonym for ... (NewType)"
             """
             )
-        self.register_matcher_factory(matcher_function, factory, type_, new_type_doc)
+        self._add_factory(
+            _GuiFactoryWithMatcher(matcher_function, factory, type_, new_type_doc, exact_typename=full_typename)
+        )
 
     def register_type(self, type_: Type[Any], factory: GuiFactory[Any]) -> None:
         """Registers a factory for a type (real type or NewType).
@@ -324,7 +399,7 @@ class GuiFactories:
         def matcher_function(tested_typename: Typename) -> bool:
             return full_typename == tested_typename
 
-        self.register_matcher_factory(matcher_function, factory, type_)
+        self._add_factory(_GuiFactoryWithMatcher(matcher_function, factory, type_, exact_typename=full_typename))
 
     def register_factory_name_start_with(self, typename_prefix: Typename, factory: GuiFactory[Any]) -> None:
         """Registers a factory for all types whose name starts with the given prefix."""
@@ -332,7 +407,7 @@ class GuiFactories:
         def matcher_function(tested_typename: Typename) -> bool:
             return tested_typename.startswith(typename_prefix)
 
-        self._factories.append(
+        self._add_factory(
             _GuiFactoryWithMatcher(
                 matcher_function, factory, NoneType, "All types whose name starts with " + typename_prefix
             )
@@ -353,7 +428,7 @@ class GuiFactories:
         datatype_explanation: str | None = None,
     ) -> None:
         """Registers a factory for a type, with a custom matcher function."""
-        self._factories.append(_GuiFactoryWithMatcher(matcher, factory, datatype, datatype_explanation))
+        self._add_factory(_GuiFactoryWithMatcher(matcher, factory, datatype, datatype_explanation))
 
     def register_bound_float(self, type_: Type[Any], interval: FloatInterval) -> None:
         """Registers a float type inside an interval (will use FloatWithGui)"""
@@ -394,10 +469,7 @@ class GuiFactories:
 
     def can_handle_typename(self, typename: Typename) -> bool:
         """Returns True if the registry can handle the given type name."""
-        for matcher in self._factories:
-            if matcher.fn_matcher(typename):
-                return True
-        return False
+        return self._find_factory_index(typename) is not None
 
 
 _GUI_FACTORIES = GuiFactories()
@@ -0,0 +1,27 @@
+from fiatlight.fiat_togui.gui_registry import GuiFactories
+from fiatlight.fiat_togui.primitives_gui import IntWithGui, FloatWithGui, BoolWithGui
+
+
+class Foo:
+    pass
+
+
+def test_factory_priority_and_cache_invalidation() -> None:
+    factories = GuiFactories()
+    foo_typename = "fiatlight.fiat_togui.tests.test_gui_registry.Foo"
+    assert not factories.can_handle_typename(foo_typename)
+
+    # Registration invalidates the cached "no match" result
+    factories.register_type(Foo, IntWithGui)
+    assert factories.can_handle_typename(foo_typename)
+    assert factories.get_factory(foo_typename) is IntWithGui
+
+    # A generic factory registered later has priority over an exact one
+    factories.register_factory_name_start_with("fiatlight.fiat_togui.tests", FloatWithGui)
+    assert factories.get_factory(foo_typename) is FloatWithGui
+    assert factories.get_factory("fiatlight.fiat_togui.tests.Bar") is FloatWithGui
+
+    # And an exact factory registered later has priority over a generic one
+    factories.register_type(Foo, BoolWithGui)
+    assert factories.get_factory(foo_typename) is BoolWithGui
+    assert factories.get_factory("fiatlight.fiat_togui.tests.Bar") is FloatWithGui
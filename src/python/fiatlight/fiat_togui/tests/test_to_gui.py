@@ -307,3 +307,28 @@ def test_annotated_pydantic_type() -> None:
 
     # assert hasattr(x_gui.fiat_attributes, "range")
     # assert x_gui.fiat_attributes["range"] == (0, 10)
+
+
+def test_gui_plan_cache() -> None:
+    from fiatlight.fiat_togui.primitives_gui import IntWithGui
+    from fiatlight.fiat_togui.list_with_gui import ListWithGui
+
+    class Foo:
+        pass
+
+    list_gui_1 = to_gui._any_type_to_gui_impl(typing.List[int], FiatAttributes({"range": (0, 5)}))
+    list_gui_2 = to_gui._any_type_to_gui_impl(typing.List[int], NO_FIAT_ATTRIBUTES)
+    assert (typing.List[int], False) in to_gui._GUI_PLANS_CACHE
+    # The plan is shared, but the GUIs are distinct instances, built with their own fiat attributes
+    assert isinstance(list_gui_1, ListWithGui) and isinstance(list_gui_2, ListWithGui)
+    assert list_gui_1 is not list_gui_2
+    assert list_gui_1.inner_gui is not list_gui_2.inner_gui
+    assert list_gui_1.inner_gui.fiat_attributes["range"] == (0, 5)
+    assert "range" not in list_gui_2.inner_gui.fiat_attributes
+
+    # A factory registered after the plan was created is used
+    foo_gui = to_gui._any_type_to_gui_impl(Foo, NO_FIAT_ATTRIBUTES)
+    assert not isinstance(foo_gui, IntWithGui)
+    gui_registry.register_type(Foo, IntWithGui)
+    foo_gui = to_gui._any_type_to_gui_impl(Foo, NO_FIAT_ATTRIBUTES)
+    assert isinstance(foo_gui, IntWithGui)
@@ -1,3 +1,17 @@
+"""Conversion of types to their GUI representation (AnyDataWithGui)
+
+Analyzing a type (Annotated, Optional, Union, NewType, Enum, List, Tuple, NamedTuple...) requires
+inspecting its typing metadata. This analysis is done once per type: it produces a "GUI plan",
+i.e. a function that instantiates the GUI from the fiat attributes. The plans are cached by type,
+so that building GUIs for the same types again (e.g. for the functions of a palette,
+or for the elements of a ListWithGui) only costs the instantiation.
+
+Notes:
+    - the fiat attributes are passed to the plan at instantiation: they do not need to be part of the cache key
+    - the plans do not cache the registry lookup (which has its own cache, invalidated on registration):
+      registering a factory after a plan was created is taken into account
+"""
+
 from inspect import isclass
 from fiatlight.fiat_types import DataType, FiatAttributes
 from fiatlight.fiat_types import typename_utils
@@ -12,13 +26,23 @@ import types
 from types import NoneType
 from enum import Enum
 
-from typing import Any, List, Type
+from typing import Any, Callable, Dict, List, Tuple, Type
 import typing
 
 
-def call_factor(type_: Type[Any], fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
-    """Central function to convert a type name to a GUI representation."""
-    typename = typename_utils.fully_qualified_typename(type_)
+# A function that instantiates a GUI from fiat attributes
+_GuiPlan = Callable[[FiatAttributes], AnyDataWithGui[Any]]
+
+# Cached plans, keyed by (type, is_artificial_union)
+_GUI_PLANS_CACHE: Dict[Tuple[Any, bool], _GuiPlan] = {}
+
+
+def clear_gui_plans_cache() -> None:
+    """Clear the cache of type analysis results (see module doc)"""
+    _GUI_PLANS_CACHE.clear()
+
+
+def _call_factor_with_typename(type_: Type[Any], typename: str, fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
     if gui_factories().can_handle_typename(typename):
         return gui_factories()._factor(typename, fiat_attributes)
 
@@ -27,25 +51,45 @@ def call_factor(type_: Type[Any], fiat_attributes: FiatAttributes) -> AnyDataWit
     return AnyDataWithGui_UnregisteredType(typename, type_)
 
 
-def _any_annotated_type_to_gui_impl(
-    type_: typing.Annotated[Type[Any], Any], fiat_attributes: FiatAttributes
-) -> AnyDataWithGui[Any]:
+def call_factor(type_: Type[Any], fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
+    """Central function to convert a type name to a GUI representation."""
+    typename = typename_utils.fully_qualified_typename(type_)
+    return _call_factor_with_typename(type_, typename, fiat_attributes)
+
+
+def _factor_plan(type_: Type[Any], typename: str) -> _GuiPlan:
+    def plan(fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
+        return _call_factor_with_typename(type_, typename, fiat_attributes)
+
+    return plan
+
+
+def _annotated_type_plan(type_: typing.Annotated[Type[Any], Any]) -> _GuiPlan:
     base_type, *annotations = typing.get_args(type_)
     assert isinstance(annotations, list)
-    gui_type = call_factor(base_type, fiat_attributes)
-    try_convert_type_annotations_to_fiat_attributes(base_type, annotations, gui_type)
-    return gui_type
+    base_typename = typename_utils.fully_qualified_typename(base_type)
+
+    def plan(fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
+        gui_type = _call_factor_with_typename(base_type, base_typename, fiat_attributes)
+        try_convert_type_annotations_to_fiat_attributes(base_type, annotations, gui_type)
+        return gui_type
+
+    return plan
 
 
-def _any_optional_type_to_gui_impl(
+def _optional_type_plan(
     inner_type: Type[Any] | typing.Union[Type[Any], Any],
-    fiat_attributes: FiatAttributes,
     is_artificial_union: bool = False,
-) -> AnyDataWithGui[Any]:
-    inner_gui = _any_type_to_gui_impl(inner_type, fiat_attributes, is_artificial_union=is_artificial_union)
-    optional_gui = OptionalWithGui(inner_gui)
-    AnyDataWithGui.propagate_label_and_tooltip(inner_gui, optional_gui)
-    return optional_gui
+) -> _GuiPlan:
+    inner_plan = _gui_plan(inner_type, is_artificial_union)
+
+    def plan(fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
+        inner_gui = inner_plan(fiat_attributes)
+        optional_gui = OptionalWithGui(inner_gui)
+        AnyDataWithGui.propagate_label_and_tooltip(inner_gui, optional_gui)
+        return optional_gui
+
+    return plan
 
 
 def _extract_optionals_from_union(union_args: tuple[type[Any], ...]) -> tuple[type[Any], ...] | None:
@@ -61,63 +105,69 @@ def _extract_optionals_from_union(union_args: tuple[type[Any], ...]) -> tuple[ty
     return non_none_types
 
 
-def _any_union_type_to_gui_impl(
-    union_args: tuple[type[Any], ...], fiat_attributes: FiatAttributes
-) -> AnyDataWithGui[Any]:
+def _union_type_plan(union_args: tuple[type[Any], ...]) -> _GuiPlan:
     if len(union_args) == 0:
-        raise RuntimeError(f"_any_union_type_to_gui_impl{union_args} could not extract union args")
+        raise RuntimeError(f"_union_type_plan{union_args} could not extract union args")
     if len(union_args) == 1:
-        raise RuntimeError(f"_any_union_type_to_gui_impl{union_args}: found only one type")
+        raise RuntimeError(f"_union_type_plan{union_args}: found only one type")
 
     inner_optional_types = _extract_optionals_from_union(union_args)
     if inner_optional_types is not None:
         if len(inner_optional_types) == 1:
-            return _any_optional_type_to_gui_impl(inner_optional_types[0], fiat_attributes)
+            return _optional_type_plan(inner_optional_types[0])
         else:
-            return _any_optional_type_to_gui_impl(inner_optional_types, fiat_attributes, is_artificial_union=True)
+            return _optional_type_plan(inner_optional_types, is_artificial_union=True)
 
     union_typename = "UNION_UNION-" + str(union_args)
-    if _GUI_FACTORIES.can_handle_typename(union_typename):
-        return _GUI_FACTORIES._factor(union_typename, fiat_attributes)
 
-    TO_GUI_CONTEXT.add_missing_gui_factory(union_typename)
-    return AnyDataWithGui_UnregisteredType("unimplemented", type(Any))
+    def plan(fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
+        if _GUI_FACTORIES.can_handle_typename(union_typename):
+            return _GUI_FACTORIES._factor(union_typename, fiat_attributes)
+        TO_GUI_CONTEXT.add_missing_gui_factory(union_typename)
+        return AnyDataWithGui_UnregisteredType("unimplemented", type(Any))
+
+    return plan
 
 
 def _any_new_type_to_gui_impl(type_: Type[Any], fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
     """Handle NewType types."""
     assert hasattr(type_, "__supertype__")
-    _supertype = type_.__supertype__  # noqa
-    return call_factor(type_, fiat_attributes)
+    return _any_type_to_gui_impl(type_, fiat_attributes)
 
 
-def _any_enum_type_to_gui_impl(type_: Type[Enum], fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
-    """Handle Enum types."""
+def _enum_type_plan(type_: Type[Enum]) -> _GuiPlan:
     assert issubclass(type_, Enum)
-    return EnumWithGui(type_)
 
+    def plan(fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
+        return EnumWithGui(type_)
+
+    return plan
 
-def _any_list_type_to_gui_impl(type_: Type[List[Any]], fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
-    """Handle list types."""
+
+def _list_type_plan(type_: Type[List[Any]]) -> _GuiPlan:
     element_type = typing.get_args(type_)[0]
-    inner_gui = _any_type_to_gui_impl(element_type, fiat_attributes)
-    list_gui = ListWithGui(inner_gui)
-    AnyDataWithGui.propagate_label_and_tooltip(inner_gui, list_gui)
-    return list_gui
+    inner_plan = _gui_plan(element_type)
 
+    def plan(fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
+        inner_gui = inner_plan(fiat_attributes)
+        list_gui = ListWithGui(inner_gui)
+        AnyDataWithGui.propagate_label_and_tooltip(inner_gui, list_gui)
+        return list_gui
 
-def _any_tuple_type_to_gui_impl(
-    element_types: tuple[type, ...],
-    fiat_attributes: FiatAttributes,
-    field_names: tuple[str, ...] | None = None,
-) -> AnyDataWithGui[Any]:
-    """Handle tuple types."""
+    return plan
+
+
+def _tuple_type_plan(element_types: tuple[type, ...], field_names: tuple[str, ...] | None = None) -> _GuiPlan:
     from fiatlight.fiat_togui.tuple_with_gui import TupleWithGui
 
-    empty_fiat_attrs = FiatAttributes({})
-    element_guis_tuple = tuple(_any_type_to_gui_impl(element_type, empty_fiat_attrs) for element_type in element_types)
-    tuple_gui = TupleWithGui(element_guis_tuple, fiat_attributes, field_names=field_names)
-    return tuple_gui
+    element_plans = [_gui_plan(element_type) for element_type in element_types]
+
+    def plan(fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
+        empty_fiat_attrs = FiatAttributes({})
+        element_guis_tuple = tuple(element_plan(empty_fiat_attrs) for element_plan in element_plans)
+        return TupleWithGui(element_guis_tuple, fiat_attributes, field_names=field_names)
+
+    return plan
 
 
 def _is_typed_named_tuple(type_: Any) -> bool:
@@ -130,47 +180,77 @@ def _is_typed_named_tuple(type_: Any) -> bool:
     )
 
 
-def _any_type_to_gui_impl(
+def _make_gui_plan(
     type_: Type[Any] | typing.Annotated[Type[Any], Any] | typing.Union[Type[Any], Any],
-    fiat_attributes: FiatAttributes,
-    is_artificial_union: bool = False,
-) -> AnyDataWithGui[Any]:
-    """Converts a type to a GUI representation."""
-    typename = typename_utils.fully_qualified_typename(type_)
-    TO_GUI_CONTEXT.enqueue_typename(typename)
-
+    is_artificial_union: bool,
+) -> _GuiPlan:
+    """Analyze a type, and return the plan that instantiates its GUI"""
     if typing.get_origin(type_) is typing.Annotated:
-        return _any_annotated_type_to_gui_impl(type_, fiat_attributes)
+        return _annotated_type_plan(type_)
 
     elif typing.get_origin(type_) is typing.Union or isinstance(type_, types.UnionType):
         union_args = typing.get_args(type_)
         assert isinstance(union_args, tuple)
-        return _any_union_type_to_gui_impl(union_args, fiat_attributes)
+        return _union_type_plan(union_args)
     if is_artificial_union:
         assert isinstance(type_, tuple)
-        return _any_union_type_to_gui_impl(type_, fiat_attributes)
+        return _union_type_plan(type_)
 
     elif typing.get_origin(type_) is list:
-        return _any_list_type_to_gui_impl(type_, fiat_attributes)
+        return _list_type_plan(type_)
 
     elif typing.get_origin(type_) is tuple:
         element_types = typing.get_args(type_)
-        return _any_tuple_type_to_gui_impl(element_types, fiat_attributes)
+        return _tuple_type_plan(element_types)
 
     elif _is_typed_named_tuple(type_):
         field_names = type_._fields
         annotations = type_.__annotations__
         field_types = tuple(annotations[name] for name in field_names)
-        return _any_tuple_type_to_gui_impl(field_types, fiat_attributes, field_names=field_names)
+        return _tuple_type_plan(field_types, field_names=field_names)
 
     elif hasattr(type_, "__supertype__"):  # Check if it's a NewType
-        return _any_new_type_to_gui_impl(type_, fiat_attributes)
+        return _factor_plan(type_, typename_utils.fully_qualified_typename(type_))
 
     elif isclass(type_) and issubclass(type_, Enum):  #
-        return _any_enum_type_to_gui_impl(type_, fiat_attributes)
+        return _enum_type_plan(type_)
 
     else:
-        return call_factor(type_, fiat_attributes)
+        return _factor_plan(type_, typename_utils.fully_qualified_typename(type_))
+
+
+def _gui_plan(
+    type_: Type[Any] | typing.Annotated[Type[Any], Any] | typing.Union[Type[Any], Any],
+    is_artificial_union: bool = False,
+) -> _GuiPlan:
+    """Return the plan that instantiates the GUI for a type (cached by type)"""
+    try:
+        cache_key = (type_, is_artificial_union)
+        cached_plan = _GUI_PLANS_CACHE.get(cache_key)
+    except TypeError:  # unhashable type (e.g. Annotated with unhashable metadata): no caching
+        cache_key = None
+        cached_plan = None
+
+    if cached_plan is None:
+        typename = typename_utils.fully_qualified_typename(type_)
+        inner_plan = _make_gui_plan(type_, is_artificial_union)
+
+        def cached_plan(fiat_attributes: FiatAttributes) -> AnyDataWithGui[Any]:
+            TO_GUI_CONTEXT.enqueue_typename(typename)
+            return inner_plan(fiat_attributes)
+
+        if cache_key is not None:
+            _GUI_PLANS_CACHE[cache_key] = cached_plan
+    return cached_plan
+
+
+def _any_type_to_gui_impl(
+    type_: Type[Any] | typing.Annotated[Type[Any], Any] | typing.Union[Type[Any], Any],
+    fiat_attributes: FiatAttributes,
+    is_artificial_union: bool = False,
+) -> AnyDataWithGui[Any]:
+    """Converts a type to a GUI representation."""
+    return _gui_plan(type_, is_artificial_union)(fiat_attributes)
 
 
 def any_type_to_gui(type_: Type[Any] | typing.Annotated[Type[Any], Any], **fiat_attributes: Any) -> AnyDataWithGui[Any]:
@@ -212,3 +212,32 @@ def test_explain_mentions_both_types() -> None:
     msg = explain_incompatibility(int, str)
     assert "int" in msg
     assert "str" in msg
+
+
+# ---------------------------------------------------------------------------
+#  Memoization and LinkCompatibilityMatrix
+# ---------------------------------------------------------------------------
+def test_results_are_memoized() -> None:
+    from fiatlight.fiat_types import type_compat
+
+    MyFloat = NewType("MyFloat", float)
+    type_compat.clear_link_compatibility_cache()
+    assert is_link_compatible(MyFloat, Optional[float])
+    assert type_compat._LINK_COMPATIBILITY_CACHE[(MyFloat, Optional[float])] is True
+    assert (MyFloat, float) in type_compat._LINK_COMPATIBILITY_CACHE  # inner calls are memoized too
+    assert not is_link_compatible(float, MyFloat)
+    assert type_compat._LINK_COMPATIBILITY_CACHE[(float, MyFloat)] is False
+
+
+def test_link_compatibility_matrix() -> None:
+    from fiatlight.fiat_types.type_compat import LinkCompatibilityMatrix
+
+    MyInt = NewType("MyInt", int)
+    types = [int, MyInt, str, Optional[int], Any, List[int], None]
+    matrix = LinkCompatibilityMatrix(types)
+    assert None not in matrix.types
+    for t1 in matrix.types + [float, Union[int, str]]:
+        for t2 in matrix.types + [float, Union[int, str]]:
+            assert matrix.is_compatible(t1, t2) == is_link_compatible(t1, t2)
+    assert matrix.input_types_accepting(MyInt) == {int, MyInt, Optional[int], Any}
+    assert matrix.output_types_fitting(int) == {int, MyInt, Any}
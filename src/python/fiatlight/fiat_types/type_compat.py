@@ -21,13 +21,18 @@ Rules (in order):
        any image-like NewType (chain ending in `np.ndarray`) on the other side.
        Two NewType image types do NOT auto-match through this rule.
     7. Otherwise reject — the user can add an explicit cast node.
+
+The results are memoized per (output_type, input_type) pair: dragging a pin over a large graph
+or palette calls is_link_compatible many times with the same types.
+LinkCompatibilityMatrix precomputes the compatibility between all the types of a set
+(e.g. all the pin types of the function palette).
 """
 
 from __future__ import annotations
 
 import types
 import typing
-from typing import Any, Iterable
+from typing import Any, Dict, Iterable, List, Tuple
 
 import numpy as np
 
@@ -37,6 +42,8 @@ from fiatlight.fiat_types.typename_utils import TypeLike, fully_qualified_typena
 __all__ = [
     "is_link_compatible",
     "explain_incompatibility",
+    "clear_link_compatibility_cache",
+    "LinkCompatibilityMatrix",
 ]
 
 
@@ -106,10 +113,38 @@ def _reaches_numpy(t: TypeLike) -> bool:
 # ---------------------------------------------------------------------------
 #  Public API
 # ---------------------------------------------------------------------------
+# (output_type, input_type) -> is_link_compatible(output_type, input_type)
+_LINK_COMPATIBILITY_CACHE: Dict[Tuple[TypeLike, TypeLike], bool] = {}
+
+
+def _is_hashable(t: TypeLike) -> bool:
+    try:
+        hash(t)
+        return True
+    except TypeError:  # e.g. Annotated with unhashable metadata
+        return False
+
+
+def clear_link_compatibility_cache() -> None:
+    _LINK_COMPATIBILITY_CACHE.clear()
+
+
 def is_link_compatible(output_type: TypeLike, input_type: TypeLike) -> bool:
     """Return True if a value of `output_type` can be linked into an input
     annotated `input_type`.  See module docstring for the rules.
     """
+    key = (output_type, input_type)
+    try:
+        return _LINK_COMPATIBILITY_CACHE[key]
+    except KeyError:
+        r = _is_link_compatible_impl(output_type, input_type)
+        _LINK_COMPATIBILITY_CACHE[key] = r
+        return r
+    except TypeError:  # unhashable type: no caching
+        return _is_link_compatible_impl(output_type, input_type)
+
+
+def _is_link_compatible_impl(output_type: TypeLike, input_type: TypeLike) -> bool:
     # 1. Any
     if _is_any(input_type) or _is_any(output_type):
         return True
@@ -160,3 +195,57 @@ def explain_incompatibility(output_type: TypeLike, input_type: TypeLike) -> str:
     if is_link_compatible(output_type, input_type):
         return ""
     return f"Cannot link: output is {base_typename(output_type)}, input expects {base_typename(input_type)}"
+
+
+class LinkCompatibilityMatrix:
+    """The link compatibility between all the types of a set (e.g. all the pin types of a palette).
+
+    The compatibility between the types of the set is computed once, at construction.
+    Querying a type that is not in the set computes (and stores) its row or column on first use.
+    After this, is_compatible() is only a few dictionary lookups.
+    """
+
+    types: List[TypeLike]
+    _types_set: frozenset[TypeLike]
+    # output type -> the types of the set that accept it as input
+    _accepting_inputs: Dict[TypeLike, frozenset[TypeLike]]
+    # input type -> the types of the set that can be linked into it
+    _fitting_outputs: Dict[TypeLike, frozenset[TypeLike]]
+
+    def __init__(self, types: Iterable[TypeLike]) -> None:
+        self.types = []
+        for t in types:
+            if t is not None and _is_hashable(t) and t not in self.types:
+                self.types.append(t)
+        self._types_set = frozenset(self.types)
+        self._accepting_inputs = {}
+        self._fitting_outputs = {}
+        for t in self.types:
+            self.input_types_accepting(t)
+            self.output_types_fitting(t)
+
+    def input_types_accepting(self, output_type: TypeLike) -> frozenset[TypeLike]:
+        """The types of the set that accept output_type as input"""
+        r = self._accepting_inputs.get(output_type)
+        if r is None:
+            r = frozenset(t for t in self.types if is_link_compatible(output_type, t))
+            self._accepting_inputs[output_type] = r
+        return r
+
+    def output_types_fitting(self, input_type: TypeLike) -> frozenset[TypeLike]:
+        """The types of the set that can be linked into input_type"""
+        r = self._fitting_outputs.get(input_type)
+        if r is None:
+            r = frozenset(t for t in self.types if is_link_compatible(t, input_type))
+            self._fitting_outputs[input_type] = r
+        return r
+
+    def is_compatible(self, output_type: TypeLike, input_type: TypeLike) -> bool:
+        """Same as is_link_compatible(output_type, input_type)"""
+        if not (_is_hashable(output_type) and _is_hashable(input_type)):
+            return is_link_compatible(output_type, input_type)
+        if input_type in self._types_set:
+            return input_type in self.input_types_accepting(output_type)
+        if output_type in self._types_set:
+            return output_type in self.output_types_fitting(input_type)
+        return is_link_compatible(output_type, input_type)